@@ -0,0 +1,189 @@
+# src/bench/__main__.py
+"""
+Benchmark-Suite über alle Pipeline-Stufen mit synthetischen Stationen.
+
+Je Skala (Anzahl Stationen) entsteht ein temporärer Arbeitsordner mit config/config.yaml und
+synthetischen Rohdaten (src/bench/synthetic.py); darin laufen die Stufen als eigene Prozesse
+(wie im Makefile), damit der Peak-RSS je Stufe nicht vom Vorgänger überdeckt wird. Gemessen wird
+über die Instrumentierung der Stufen (artifacts/perf_<stufe>.json).
+Im globalen Modus prüft die Suite zusätzlich den Peak-RSS des Trainings gegen die Größe der
+Feature-Matrix (--max-train-rss); bei Überschreitung endet sie mit Exit-Code 1.
+
+Beispiele:
+  python -m src.bench --scales 10 100 1000 --steps 2880 --trees 20 --out bench_results.json
+  python -m src.bench --scales 10 --stages load qc features
+  python -m src.bench --compare bench_alt.json bench_neu.json
+  python -m src.bench --scales 100 --quantile-mode residual --out bench_residual.json
+  python -m src.bench.horizons --stations 20             # per_horizon vs. stacked bei 24 Horizonten
+"""
+
+import argparse, json, os, platform, shutil, subprocess, sys, tempfile, time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import yaml
+
+from src.bench.synthetic import synth_stations, write_raw
+
+ROOT = Path(__file__).resolve().parents[2]
+
+STAGES = {
+    "load": ["src.etl.load"],
+    "qc": ["src.etl.qc"],
+    "features": ["src.features.build_features"],
+    "train": ["src.models.train_baseline", "--force"],
+    "hindcast": ["src.eval.hindcast"],
+    "rolling_metrics": ["src.eval.rolling_metrics"],
+    "render": ["src.plots.batch_render"],
+    "publish": ["src.serve.publish"],
+}
+PERF_KEYS = ("seconds", "cpu_seconds", "rows", "rows_per_s", "peak_rss_mb", "steps")
+# von der Datenmenge unabhängiger Anteil über der Baseline: Arrow-Leser, LightGBM-Threads und Histogramm-Pool
+# (gemessen ~45 MiB bei 10 Stationen) plus Spielraum
+RSS_FIXED_MB = 64
+
+def bench_config(mode: str = None, quantile_mode: str = None, horizon_layout: str = None) -> dict:
+    cfg = yaml.safe_load(open(ROOT/'config/config.yaml', encoding='utf-8'))
+    if mode:
+        cfg['training_mode'] = mode
+    if quantile_mode:
+        cfg['quantile_mode'] = quantile_mode
+    if horizon_layout:
+        cfg['horizon_layout'] = horizon_layout
+    for name, fname, tol in (('icon', 'icon_forecast.csv', '1h'), ('soil', 'soil_moisture.csv', '3h')):
+        cfg.setdefault('features_exogenous', {})[name] = {
+            'enabled': True, 'path': f"data/raw/{fname}", 'asof': True, 'tolerance': tol}
+    cfg['mqtt'] = {**cfg.get('mqtt', {}), 'enabled': False}
+    cfg['perf'] = {'dir': 'artifacts', 'tracemalloc': False, 'profile': False, 'prometheus': None}
+    return cfg
+
+def stage_cmd(name: str, args) -> list:
+    cmd = [sys.executable, "-m", *STAGES[name]]
+    if name in ('load', 'train'):
+        cmd += ["--workers", str(args.workers)]
+    if name == 'train':
+        cmd += ["--trees", str(args.trees)]
+    return cmd
+
+def run_scale(n: int, args) -> dict:
+    res = {}
+    ws = Path(tempfile.mkdtemp(prefix=f"rivercast_bench_{n}_"))
+    try:
+        (ws/'config').mkdir()
+        (ws/'config/config.yaml').write_text(yaml.safe_dump(bench_config(args.mode, args.quantile_mode, args.horizon_layout), sort_keys=False), encoding='utf-8')
+        t0 = time.perf_counter()
+        write_raw(synth_stations(n, args.steps, args.seed), ws/'data/raw')
+        res['generate'] = {"seconds": round(time.perf_counter() - t0, 3), "rows": n * args.steps}
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), os.environ.get('PYTHONPATH')])),
+               "MPLBACKEND": "Agg"}
+        for name in args.stages:
+            t0 = time.perf_counter()
+            proc = subprocess.run(stage_cmd(name, args), cwd=ws, env=env, capture_output=True, text=True)
+            wall = time.perf_counter() - t0
+            if proc.returncode != 0:
+                res[name] = {"error": (proc.stderr or proc.stdout).strip().splitlines()[-1:], "process_seconds": round(wall, 3)}
+                print(f"[FAIL] n={n} {name}: {res[name]['error']}", flush=True)
+                continue
+            rec = json.loads((ws/f'artifacts/perf_{name}.json').read_text(encoding='utf-8'))
+            res[name] = {k: rec.get(k) for k in PERF_KEYS}
+            # inkl. Interpreterstart und Imports (Kaltstart je Stufe)
+            res[name]["process_seconds"] = round(wall, 3)
+            if name == 'train':
+                res[name]["rss_check"] = rss_check(rec, args.max_train_rss)
+            print(f"[OK] n={n:<5} {name:<16} {rec['seconds']:8.3f} s  {rec['rows']:>10} rows"
+                  f"  peak {rec['peak_rss_mb']} MiB", flush=True)
+    finally:
+        if args.keep:
+            print(f"Arbeitsordner behalten: {ws}")
+        else:
+            shutil.rmtree(ws, ignore_errors=True)
+    return res
+
+def rss_check(rec: dict, factor: float):
+    """
+    Globales Training: Peak-RSS über der Baseline (vor dem Laden) höchstens ``factor`` × Feature-Matrix
+    (float32, stacked: Paar-Matrix) + RSS_FIXED_MB. None, wenn die Stufe keine Matrixgröße meldet
+    (per_station, übersprungene Jobs).
+    """
+    if not rec.get('feature_matrix_mb') or rec.get('baseline_rss_mb') is None or rec.get('peak_rss_mb') is None:
+        return None
+    over = rec['peak_rss_mb'] - rec['baseline_rss_mb']
+    limit = factor * rec['feature_matrix_mb'] + RSS_FIXED_MB
+    ok = over <= limit
+    print(f"[{'OK' if ok else 'FAIL'}] Training Peak-RSS {over:.1f} MiB über Baseline, "
+          f"Grenze {limit:.1f} MiB ({factor:g} × Matrix {rec['feature_matrix_mb']} MiB + {RSS_FIXED_MB})", flush=True)
+    return {"over_baseline_mb": round(over, 1), "limit_mb": round(limit, 1), "ok": ok}
+
+def environment() -> dict:
+    def git(*cmd):
+        try:
+            return subprocess.run(["git", *cmd], cwd=ROOT, capture_output=True, text=True, timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return None
+    versions = {}
+    for mod in ('numpy', 'pandas', 'pyarrow', 'lightgbm', 'matplotlib'):
+        try:
+            versions[mod] = __import__(mod).__version__
+        except ImportError:
+            versions[mod] = None
+    return {"created": datetime.now(timezone.utc).isoformat(), "commit": git("rev-parse", "HEAD") or None,
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+            "python": platform.python_version(), "platform": platform.platform(),
+            "cpu_count": os.cpu_count(), "versions": versions}
+
+def compare(old_path: Path, new_path: Path):
+    old = json.loads(Path(old_path).read_text(encoding='utf-8'))
+    new = json.loads(Path(new_path).read_text(encoding='utf-8'))
+    print(f"alt: {old['env'].get('commit')}  neu: {new['env'].get('commit')}")
+    print(f"{'n':>6} {'stage':<16} {'alt s':>9} {'neu s':>9} {'x':>6} {'alt MiB':>9} {'neu MiB':>9}")
+    for n, stages in new['results'].items():
+        for name, r in stages.items():
+            o = old['results'].get(n, {}).get(name, {})
+            a, b = o.get('seconds'), r.get('seconds')
+            ratio = f"{a / b:6.2f}" if a and b else f"{'-':>6}"
+            fmt = lambda v: f"{v:9.3f}" if isinstance(v, (int, float)) else f"{'-':>9}"
+            print(f"{n:>6} {name:<16} {fmt(a)} {fmt(b)} {ratio} {fmt(o.get('peak_rss_mb'))} {fmt(r.get('peak_rss_mb'))}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scales", nargs="+", type=int, default=[10, 100, 1000], help="Anzahl Stationen je Lauf")
+    ap.add_argument("--steps", type=int, default=2880, help="Zeitschritte je Station (15 min; 2880 = 30 Tage)")
+    ap.add_argument("--stages", nargs="+", default=list(STAGES), choices=list(STAGES),
+                    help="Stufen (laufen in Pipeline-Reihenfolge und brauchen die Ausgaben ihrer Vorgänger)")
+    ap.add_argument("--trees", type=int, default=20, help="Bäume je Modell (reduziert)")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--mode", choices=['per_station', 'global'], default=None, help="training_mode überschreiben")
+    ap.add_argument("--quantile-mode", choices=['independent', 'residual'], default=None, help="quantile_mode überschreiben")
+    ap.add_argument("--horizon-layout", choices=['per_horizon', 'stacked'], default=None, help="horizon_layout überschreiben")
+    ap.add_argument("--max-train-rss", type=float, default=1.5, metavar="FAKTOR",
+                    help=f"global: Peak-RSS des Trainings über der Baseline höchstens FAKTOR × Feature-Matrix + {RSS_FIXED_MB} MiB")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=str, default="bench_results.json")
+    ap.add_argument("--keep", action="store_true", help="Arbeitsordner nicht löschen")
+    ap.add_argument("--compare", nargs=2, metavar=("ALT", "NEU"), help="Zwei Ergebnisdateien vergleichen")
+    args = ap.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        raise SystemExit(0)
+
+    stages = [s for s in STAGES if s in args.stages]  # Reihenfolge der Pipeline
+    args.stages = stages
+    out = {"env": environment(),
+           "params": {"steps": args.steps, "trees": args.trees, "workers": args.workers, "seed": args.seed,
+                      "mode": args.mode or bench_config()['training_mode'],
+                      "quantile_mode": args.quantile_mode or bench_config().get('quantile_mode', 'independent'),
+                      "horizon_layout": args.horizon_layout or bench_config().get('horizon_layout', 'per_horizon'),
+                      "stages": stages},
+           "results": {}}
+    for n in args.scales:
+        out['results'][str(n)] = run_scale(n, args)
+        # nach jeder Skala schreiben, damit lange Läufe Zwischenergebnisse hinterlassen
+        Path(args.out).write_text(json.dumps(out, indent=2), encoding='utf-8')
+    print(f"Ergebnisse -> {args.out}")
+    failed = [n for n, r in out['results'].items() if (r.get('train', {}).get('rss_check') or {}).get('ok') is False]
+    if failed:
+        raise SystemExit(f"Peak-RSS des Trainings über der Grenze bei n={', '.join(failed)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# src/bench/exogenous.py
+"""
+Benchmark: exogene Quellen per merge-Kette (merge_exogenous) gegen den Join-Index
+(join_exogenous, ein Durchlauf, eine Verkettung). Gemessen werden Laufzeit und Peak-Speicher (tracemalloc).
+
+Beispiel:
+  python -m src.bench.exogenous --archive rivercast_100stations_raw.zip
+"""
+
+import argparse, tempfile, time, tracemalloc, zipfile
+from pathlib import Path
+
+import pandas as pd
+
+from src.etl.load import EXO_FILES, join_exogenous, list_sources, load_raw_fast, merge_exogenous, source_name
+import src.etl.load as load
+
+def measure(fn, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn(*args)
+    dt = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return out, dt, peak
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--archive", type=str, default="rivercast_100stations_raw.zip")
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args()
+
+    sources = list_sources(Path(args.archive))
+    exo = [s for s in sources if source_name(s) in EXO_FILES]
+    base = load_raw_fast([s for s in sources if source_name(s) not in EXO_FILES], args.workers)
+    with tempfile.TemporaryDirectory() as tmp:
+        with zipfile.ZipFile(args.archive) as z:
+            z.extractall(tmp)
+        # merge-Kette liest entpackte Dateien, der Join-Index direkt aus dem Archiv
+        load.CFG['features_exogenous'] = {source_name(s): {'enabled': True, 'path': str(Path(tmp)/source_name(s))} for s in exo}
+        old, t_old, m_old = measure(merge_exogenous, base)
+        cfg = {source_name(s): {'enabled': True, 'path': s} for s in exo}
+        new, t_new, m_new = measure(join_exogenous, base, cfg, args.workers)
+
+    try:
+        pd.testing.assert_frame_equal(old, new)
+        same = True
+    except AssertionError:
+        same = False
+    print(f"Basis: {len(base)} Zeilen, {base['station_id'].nunique()} Stationen, {len(exo)} exogene Quelle(n)")
+    print(f"  merge-Kette:  {t_old:7.3f} s  Peak {m_old:8.1f} MB")
+    print(f"  Join-Index:   {t_new:7.3f} s  Peak {m_new:8.1f} MB  (Speedup x{t_old/max(t_new, 1e-9):.1f}, Ergebnis gleich: {same})")
@@ -0,0 +1,55 @@
+# src/bench/features.py
+"""
+Benchmark: vektorisierter Feature-Aufbau (engine.build_features) gegen groupby().apply(make_features).
+
+Beispiel:
+  python -m src.bench.features --input data/processed/clean --replicate 10
+
+--replicate k vervielfacht die Stationen (neue IDs), um das Skalierungsverhalten zu sehen.
+Ausgabe: Laufzeit, Peak-Speicher (tracemalloc) und max. Abweichung der Feature-Spalten.
+"""
+
+import argparse, time, tracemalloc
+import numpy as np
+import pandas as pd
+import yaml
+
+from src.features.build_features import make_features
+from src.features.engine import build_features, feature_spec
+from src.utils import store
+
+def replicate(df: pd.DataFrame, k: int) -> pd.DataFrame:
+    if k <= 1:
+        return df
+    parts = [df.assign(station_id=df['station_id'].astype(str) + f"_r{i}") for i in range(k)]
+    return pd.concat(parts, ignore_index=True)
+
+def measure(fn, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn(*args)
+    dt = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, dt, peak / 2**20
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--input", type=str, default="data/processed/clean")
+    ap.add_argument("--replicate", type=int, default=1, help="Stationen k-fach vervielfachen")
+    args = ap.parse_args()
+
+    cfg = yaml.safe_load(open('config/config.yaml'))
+    df = replicate(store.read_dataset(args.input), args.replicate)
+    spec = feature_spec(cfg)
+
+    old, t_old, m_old = measure(lambda d: d.groupby('station_id', group_keys=False).apply(make_features), df)
+    new, t_new, m_new = measure(build_features, df, spec)
+
+    num = [c for c in new.columns if c in old.columns and new[c].dtype.kind == 'f']
+    same_cols = list(old.columns) == list(new.columns)
+    diff = float(np.nanmax(np.abs(old[num].to_numpy() - new[num].to_numpy()))) if num else 0.0
+    print(f"rows={len(df)} stations={df['station_id'].nunique()}")
+    print(f"groupby.apply: {t_old:8.3f} s  peak {m_old:8.1f} MiB")
+    print(f"engine:        {t_new:8.3f} s  peak {m_new:8.1f} MiB  (Speedup x{t_old/max(t_new, 1e-9):.1f})")
+    print(f"Spalten gleich: {same_cols}  max|Δ|={diff:.3e}")
@@ -0,0 +1,74 @@
+# src/bench/hindcast_store.py
+"""
+Benchmark: Hindcasts als Einzeldateien (hindcast_{station}_{H}.parquet) gegen den konsolidierten
+Speicher (eine Datei je Horizont, Row Group je Station). Gemessen werden Schreiben, Auflisten,
+Lesen aller Reihen und ein einzelner Stations-/Horizont-Ausschnitt.
+
+Beispiel:
+  python -m src.bench.hindcast_store --stations 1000 --steps 2880
+"""
+
+import argparse, shutil, tempfile, time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils import hindcast_store as hs
+
+def synth_hindcast(n_stations: int, steps: int, horizons, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range('2025-01-01', periods=steps, freq='15min', tz='UTC')
+    parts = []
+    for H in horizons:
+        p50 = rng.gamma(2.0, 2.0, (n_stations, steps))
+        parts.append(pd.DataFrame({
+            'ts': np.tile(ts, n_stations),
+            'station_id': np.repeat([f"SYN_{i:04d}" for i in range(n_stations)], steps),
+            'horizon_steps': H, 'horizon_minutes': H * 15,
+            'p10': (p50 * 0.8).ravel(), 'p50': p50.ravel(), 'p90': (p50 * 1.2).ravel(),
+            'y_true': (p50 + rng.normal(0, 0.5, p50.shape)).ravel(),
+        }))
+    return pd.concat(parts, ignore_index=True)
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+def write_files(df: pd.DataFrame, outdir: Path):
+    outdir.mkdir(parents=True, exist_ok=True)
+    for (sid, H), g in df.groupby(['station_id', 'horizon_steps'], sort=False):
+        g.to_parquet(outdir / f"hindcast_{sid}_{H}.parquet")
+
+def read_all(root: Path) -> int:
+    return sum(hs.read_series(s).num_rows for s in hs.series_index(root))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--stations", type=int, default=1000)
+    ap.add_argument("--steps", type=int, default=2880)
+    ap.add_argument("--horizons", nargs="+", type=int, default=[24, 48, 96])
+    args = ap.parse_args()
+
+    df = synth_hindcast(args.stations, args.steps, args.horizons)
+    one = "SYN_0001"
+    tmp = Path(tempfile.mkdtemp(prefix="rivercast_hindcast_"))
+    try:
+        files, store = tmp/'files', tmp/'store'
+        res = {}
+        for name, root, write in (('Einzeldateien', files, write_files), ('Speicher', store, hs.write_hindcast)):
+            _, t_write = timed(write, df, root)
+            idx, t_list = timed(hs.series_index, root)
+            rows, t_all = timed(read_all, root)
+            sl, t_one = timed(hs.read_frame, root, [one], [args.horizons[0]])
+            size = sum(f.stat().st_size for f in root.rglob('*.parquet')) / 2**20
+            res[name] = (t_write, t_list, t_all, t_one)
+            print(f"  {name:<13} schreiben {t_write:7.3f} s  auflisten {t_list:7.3f} s  alle lesen {t_all:7.3f} s"
+                  f"  Ausschnitt {t_one*1e3:7.1f} ms  ({len(idx)} Reihen, {rows} Zeilen, {size:.1f} MiB)")
+        same = hs.read_frame(files, [one]).reset_index(drop=True).equals(hs.read_frame(store, [one]).reset_index(drop=True))
+        a, b = res['Einzeldateien'], res['Speicher']
+        print(f"Speedup schreiben x{a[0]/b[0]:.1f}, auflisten x{a[1]/b[1]:.1f}, alle lesen x{a[2]/b[2]:.1f}, "
+              f"Ausschnitt x{a[3]/b[3]:.1f} (Ergebnis gleich: {same})")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
@@ -0,0 +1,148 @@
+# src/bench/horizons.py
+"""
+Benchmark: horizon_layout 'per_horizon' (Modellset je Horizont) gegen 'stacked' (Horizont als
+Feature, ein Modellset für alle Horizonte) bei vielen Horizonten (Default: stündlich 1–24 h).
+
+In einem temporären Arbeitsordner mit synthetischen Stationen (wie src/bench/__main__.py) laufen
+load → qc → features einmal, danach je Layout train und publish als eigene Prozesse. Gemessen:
+  Training   Laufzeit und Peak-RSS (perf_train.json), CV-NSE-Median über Stationen × Horizonte
+  Artefakte  Ordner, Dateien und Bytes der Modelle
+  Serving    publish-Vorhersage inkl. Laden der Modelle (kalt, perf_publish.json) und ein
+             Server-Zyklus mit geladener ModelRegistry (warm, Median über --repeat Läufe)
+
+Beispiel:
+  python -m src.bench.horizons --stations 20 --steps 2880 --trees 20
+  python -m src.bench.horizons --mode global --horizons 4 8 12 24 48 96 --out bench_horizons.json
+"""
+
+import argparse, json, os, shutil, subprocess, sys, tempfile, time
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+from src.bench.__main__ import ROOT, bench_config
+from src.bench.synthetic import synth_stations, write_raw
+
+LAYOUTS = ('per_horizon', 'stacked')
+
+def layout_dirs(art: Path, layout: str) -> list:
+    return [p.parent for p in art.rglob('meta.json') if (p.parent.name == 'stacked') == (layout == 'stacked')]
+
+def artifact_size(art: Path, layout: str) -> dict:
+    dirs = layout_dirs(art, layout)
+    files = [f for d in dirs for f in d.iterdir() if f.is_file()]
+    return {"dirs": len(dirs), "files": len(files), "bytes": sum(f.stat().st_size for f in files)}
+
+def cv_nse(report: dict) -> float:
+    vals = []
+    for v in report.values():
+        if 'by_horizon' in v:
+            vals += [s['NSE'] for s in v['by_horizon'].values()]
+        else:
+            vals.append(v['NSE'])
+    return float(np.nanmedian(vals)) if vals else float('nan')
+
+def serve_latency(repeat: int) -> dict:
+    """Im Arbeitsordner: Modelle einmal in eine ModelRegistry laden, dann Zyklen wie im Server messen."""
+    from src.serve.publish import ART, FEAT, build_messages, latest_rows
+    from src.serve.registry import ModelRegistry
+    from src.utils import store
+    latest = latest_rows(store.read_latest(FEAT))
+    t0 = time.perf_counter()
+    reg = ModelRegistry(ART)
+    reg.refresh()
+    load_s = time.perf_counter() - t0
+    msgs = build_messages(latest, load=reg)  # Aufwärmen
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        build_messages(latest, load=reg)
+        times.append(time.perf_counter() - t0)
+    return {"load_seconds": round(load_s, 4), "cycle_seconds": round(float(np.median(times)), 5),
+            "stations": int(len(latest)), "messages": len(msgs)}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--stations", type=int, default=20)
+    ap.add_argument("--steps", type=int, default=2880, help="Zeitschritte je Station (15 min; 2880 = 30 Tage)")
+    ap.add_argument("--horizons", nargs="+", type=int, default=list(range(4, 97, 4)),
+                    help="Horizonte in 15-min Schritten (Default: 24 Horizonte, stündlich bis 24 h)")
+    ap.add_argument("--trees", type=int, default=20, help="Bäume je Modell (reduziert)")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--mode", choices=['per_station', 'global'], default=None, help="training_mode überschreiben")
+    ap.add_argument("--repeat", type=int, default=20, help="Server-Zyklen für die warme Latenz")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=str, default=None, help="Ergebnisse als JSON")
+    ap.add_argument("--keep", action="store_true", help="Arbeitsordner nicht löschen")
+    ap.add_argument("--serve-latency", action="store_true", help=argparse.SUPPRESS)  # intern: Messung im Arbeitsordner
+    args = ap.parse_args(argv)
+
+    if args.serve_latency:
+        print(json.dumps(serve_latency(args.repeat)))
+        return
+
+    ws = Path(tempfile.mkdtemp(prefix="rivercast_bench_horizons_"))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), os.environ.get('PYTHONPATH')])),
+           "MPLBACKEND": "Agg"}
+
+    def run(*cmd):
+        proc = subprocess.run([sys.executable, "-m", *cmd], cwd=ws, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise SystemExit(f"[FAIL] {' '.join(cmd)}: {(proc.stderr or proc.stdout).strip().splitlines()[-1:]}")
+        return proc.stdout
+
+    def perf(stage: str) -> dict:
+        return json.loads((ws/f'artifacts/perf_{stage}.json').read_text(encoding='utf-8'))
+
+    def configure(layout: str):
+        cfg = {**bench_config(args.mode), 'horizon_steps_list': args.horizons, 'horizon_layout': layout}
+        (ws/'config/config.yaml').write_text(yaml.safe_dump(cfg, sort_keys=False), encoding='utf-8')
+
+    res = {"params": {"stations": args.stations, "steps": args.steps, "horizons": args.horizons, "trees": args.trees,
+                      "mode": args.mode or bench_config()['training_mode']}, "results": {}}
+    try:
+        (ws/'config').mkdir()
+        configure(LAYOUTS[0])
+        write_raw(synth_stations(args.stations, args.steps, args.seed), ws/'data/raw')
+        run("src.etl.load", "--workers", str(args.workers))
+        run("src.etl.qc")
+        run("src.features.build_features")
+        print(f"{args.stations} Stationen × {args.steps} Schritte, {len(args.horizons)} Horizonte, "
+              f"{res['params']['mode']}, {args.trees} Bäume")
+        for layout in LAYOUTS:
+            configure(layout)
+            run("src.models.train_baseline", "--force", "--trees", str(args.trees), "--workers", str(args.workers))
+            train = perf('train')
+            report = json.loads((ws/'artifacts/report.json').read_text(encoding='utf-8'))
+            size = artifact_size(ws/'artifacts', layout)
+            run("src.serve.publish")
+            cold = perf('publish')['steps']['predict']['seconds']
+            warm = json.loads(run("src.bench.horizons", "--serve-latency", "--repeat", str(args.repeat)).splitlines()[-1])
+            if layout != LAYOUTS[-1]:  # die Registry des nächsten Layouts soll nur dessen Ordner laden
+                for d in layout_dirs(ws/'artifacts', layout):
+                    shutil.rmtree(d)
+            r = res['results'][layout] = {"train_seconds": train['seconds'], "train_peak_rss_mb": train['peak_rss_mb'],
+                                          "cv_nse_median": round(cv_nse(report), 4),
+                                          "artifacts": size,
+                                          "publish_predict_seconds": cold, "serve": warm}
+            print(f"  {layout:<12} Training {r['train_seconds']:8.2f} s (peak {r['train_peak_rss_mb']} MiB, "
+                  f"CV-NSE {r['cv_nse_median']:.3f}) | Artefakte {r['artifacts']['dirs']} Ordner, "
+                  f"{r['artifacts']['bytes'] / 2**20:.2f} MiB | publish {cold*1e3:.1f} ms, "
+                  f"Server-Zyklus {warm['cycle_seconds']*1e3:.2f} ms ({warm['messages']} Nachrichten, "
+                  f"Laden {warm['load_seconds']*1e3:.0f} ms)", flush=True)
+        a, b = (res['results'][l] for l in LAYOUTS)
+        print(f"  stacked/per_horizon: Training x{b['train_seconds'] / a['train_seconds']:.2f}, "
+              f"Artefakte x{b['artifacts']['bytes'] / a['artifacts']['bytes']:.2f}, "
+              f"publish x{b['publish_predict_seconds'] / a['publish_predict_seconds']:.2f}, "
+              f"Server-Zyklus x{b['serve']['cycle_seconds'] / a['serve']['cycle_seconds']:.2f}")
+    finally:
+        if args.keep:
+            print(f"Arbeitsordner behalten: {ws}")
+        else:
+            shutil.rmtree(ws, ignore_errors=True)
+    if args.out:
+        Path(args.out).write_text(json.dumps(res, indent=2), encoding='utf-8')
+
+if __name__ == "__main__":
+    main()
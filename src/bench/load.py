@@ -0,0 +1,51 @@
+# src/bench/load.py
+"""
+Benchmark: CSV-Ingestion (pandas + groupby().asfreq) gegen die parallele pyarrow-Variante
+(load_raw_fast, liest direkt aus dem Zip-Archiv).
+
+Beispiel:
+  python -m src.bench.load --archive rivercast_100stations_raw.zip --workers 4
+
+Die alte Variante bekommt die Dateien entpackt in ein temporäres Verzeichnis (Entpacken nicht gemessen).
+"""
+
+import argparse, tempfile, time, zipfile
+from pathlib import Path
+
+import pandas as pd
+
+from src.etl.load import EXO_FILES, list_sources, load_raw, load_raw_fast, read_sources, source_name
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--archive", type=str, default="rivercast_100stations_raw.zip")
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args()
+
+    sources = list_sources(Path(args.archive))
+    base = [s for s in sources if source_name(s) not in EXO_FILES]
+    with tempfile.TemporaryDirectory() as tmp:
+        with zipfile.ZipFile(args.archive) as z:
+            z.extractall(tmp)
+        base_files = [Path(tmp)/source_name(s) for s in base]
+        all_files = [Path(tmp)/source_name(s) for s in sources]
+
+        old, t_old = timed(load_raw, base_files)
+        new, t_new = timed(load_raw_fast, base, args.workers)
+        _, t_read_old = timed(lambda fs: [pd.read_csv(f, parse_dates=['ts']) for f in fs], all_files)
+        _, t_read_new = timed(read_sources, sources, args.workers)
+
+    # alte Variante lässt station_id in Lückenzeilen leer; Werte werden zeilenweise verglichen
+    same = len(old) == len(new) and all(
+        old[c].reset_index(drop=True).equals(new[c]) for c in old.columns if c != 'station_id')
+    print(f"Basisreihen ({len(base)} Datei(en), {len(new)} Zeilen, {new['station_id'].nunique()} Stationen)")
+    print(f"  pandas + groupby.asfreq: {t_old:7.3f} s")
+    print(f"  pyarrow + Raster-Index:  {t_new:7.3f} s  (Speedup x{t_old/max(t_new, 1e-9):.1f}, Werte gleich: {same})")
+    print(f"Alle {len(sources)} CSV-Dateien lesen")
+    print(f"  pandas sequentiell:      {t_read_old:7.3f} s")
+    print(f"  pyarrow parallel (zip):  {t_read_new:7.3f} s  (Speedup x{t_read_old/max(t_read_new, 1e-9):.1f})")
@@ -0,0 +1,85 @@
+# src/bench/mqtt.py
+"""
+Benchmark: MQTT-Publishing gegen den lokalen Stand-in-Broker (src/bench/mqtt_broker.py).
+
+  bisher      neuer Client je Lauf, publish-Schleife ohne Netzwerk-Loop, sofort disconnect
+  persistent  MqttPublisher, eine Nachricht je Station × Horizont, Ack-Fenster
+  station     MqttPublisher mit batch='station' (alle Horizonte einer Station in einer Nachricht)
+  reconnect   wie persistent, der Broker trennt die Verbindung einmal mitten im Lauf
+
+Gemessen: Laufzeit, beim Broker angekommene (eindeutige) Nachrichten, Ack-Latenz.
+
+Beispiel:
+  python -m src.bench.mqtt --stations 500 --horizons 24 48 96 --ack-delay 0.002 --cycles 3
+"""
+
+import argparse, json, time
+
+from src.bench.mqtt_broker import StandInBroker
+from src.serve.mqtt_publisher import MqttPublisher, _client, topic_payloads
+
+BASE, TARGET = '/rivercast', 'h_cm'
+
+def synth_messages(n_stations: int, horizons) -> list:
+    return [{"ts": "2025-09-25 12:00:00+00:00", "station_id": f"SYN_{i:04d}", "target": TARGET,
+             "horizon_steps": H, "horizon_minutes": H * 15, "p10": 118.4, "p50": 123.7, "p90": 129.1}
+            for i in range(n_stations) for H in horizons]
+
+def publish_legacy(msgs: list, port: int):
+    """Referenz: das bisherige publish_mqtt aus src/serve/publish.py."""
+    client = _client("rivercast-legacy")
+    client.connect('127.0.0.1', port, 60)
+    for topic, payload in topic_payloads(msgs, BASE, TARGET):
+        client.publish(topic, payload, qos=1, retain=False)
+    client.disconnect()
+
+def unique(broker) -> int:
+    return len({(t, p) for t, p, _ in broker.messages})
+
+def run(label: str, msgs: list, cycles: int, ack_delay: float, window: int, batch=None, drop_after=None):
+    with StandInBroker(ack_delay=ack_delay, drop_after=drop_after) as b:
+        expected = len(topic_payloads(msgs, BASE, TARGET, batch or 'message'))
+        t0 = time.perf_counter()
+        stats = []
+        if batch is None:
+            for _ in range(cycles):
+                publish_legacy(msgs, b.port)
+        else:
+            pub = MqttPublisher('127.0.0.1', b.port, BASE, TARGET, qos=1, window=window, batch=batch,
+                                reconnect_min_s=1, reconnect_max_s=2, timeout_s=60)
+            for _ in range(cycles):
+                stats.append(pub.publish(msgs))
+            pub.close()
+        dt = (time.perf_counter() - t0) / cycles
+        time.sleep(0.2)  # Nachzügler beim Broker
+        got = unique(b)
+    lat = f"  Ack p50 {stats[-1]['latency_ms_p50']} ms p95 {stats[-1]['latency_ms_p95']} ms" if stats else ""
+    rc = f"  Reconnects {stats[-1]['reconnects']}" if stats and drop_after else ""
+    print(f"  {label:<11} {dt*1e3:9.1f} ms/Zyklus  angekommen {got}/{expected}{lat}{rc}", flush=True)
+    return {"seconds": dt, "received": got, "expected": expected, "stats": stats}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--stations", type=int, default=500)
+    ap.add_argument("--horizons", nargs="+", type=int, default=[24, 48, 96])
+    ap.add_argument("--ack-delay", type=float, default=0.002, help="simulierte Latenz bis PUBACK (s)")
+    ap.add_argument("--window", type=int, default=100, help="max. unbestätigte Nachrichten")
+    ap.add_argument("--cycles", type=int, default=3)
+    ap.add_argument("--out", type=str, default=None, help="Ergebnisse als JSON")
+    args = ap.parse_args(argv)
+
+    msgs = synth_messages(args.stations, args.horizons)
+    print(f"{len(msgs)} Nachrichten je Zyklus, Ack-Verzögerung {args.ack_delay*1e3:.1f} ms, Fenster {args.window}")
+    res = {
+        "bisher": run("bisher", msgs, 1, args.ack_delay, args.window),
+        "persistent": run("persistent", msgs, args.cycles, args.ack_delay, args.window, batch='message'),
+        "station": run("station", msgs, args.cycles, args.ack_delay, args.window, batch='station'),
+        "reconnect": run("reconnect", msgs, 1, args.ack_delay, args.window, batch='message',
+                         drop_after=len(msgs) // 2),
+    }
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(res, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# src/bench/mqtt_broker.py
+"""
+Lokaler Stand-in-Broker (MQTT 3.1.1, asyncio) für Tests und Benchmarks des Publishers.
+
+Unterstützt CONNECT, PUBLISH mit QoS 0/1/2, SUBSCRIBE/UNSUBSCRIBE (Weiterleitung mit QoS 0,
+Wildcards + und #), PINGREQ und DISCONNECT – keine Sessions, Retain oder Authentifizierung.
+Zum Testen von Ack-Fenstern und Reconnect lassen sich eine Ack-Verzögerung und ein
+Verbindungsabbruch nach N Nachrichten einstellen. Empfangene Nachrichten werden gezählt
+(``stats``) und optional mitgeschrieben (``messages``).
+
+Beispiele:
+  python -m src.bench.mqtt_broker --port 1883                      # Broker im Vordergrund
+  from src.bench.mqtt_broker import StandInBroker
+  with StandInBroker(ack_delay=0.002) as b: ...  b.port, b.stats, b.messages
+"""
+
+import argparse, asyncio, threading, time
+
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = 8, 9, 10, 11, 12, 13, 14
+
+def _length(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        n, b = divmod(n, 128)
+        out.append(b | (0x80 if n else 0))
+        if not n:
+            return bytes(out)
+
+def packet(kind: int, flags: int, body: bytes) -> bytes:
+    return bytes([kind << 4 | flags]) + _length(len(body)) + body
+
+def _string(b: bytes, i: int):
+    n = int.from_bytes(b[i:i + 2], 'big')
+    return b[i + 2:i + 2 + n].decode('utf-8'), i + 2 + n
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    p, t = pattern.split('/'), topic.split('/')
+    for i, part in enumerate(p):
+        if part == '#':
+            return True
+        if i >= len(t) or (part != '+' and part != t[i]):
+            return False
+    return len(p) == len(t)
+
+class StandInBroker:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, ack_delay: float = 0.0,
+                 drop_after: int = None, keep_messages: bool = True):
+        self.host, self.port = host, port
+        self.ack_delay = ack_delay          # Sekunden bis PUBACK/PUBREC (simulierte Netzlatenz)
+        self.drop_after = drop_after        # Verbindung nach so vielen PUBLISH einmal trennen
+        self.keep_messages = keep_messages
+        self.messages = []                  # (topic, payload, qos)
+        self.stats = {"connects": 0, "publish": 0, "bytes": 0, "drops": 0}
+        self._subs = {}                     # writer -> [Filter]
+        self._loop = self._server = self._thread = None
+
+    # -------------------------------------------------------------- Protokoll
+    async def _read(self, reader):
+        head = await reader.readexactly(1)
+        n, shift = 0, 0
+        while True:
+            b = (await reader.readexactly(1))[0]
+            n |= (b & 0x7F) << shift
+            shift += 7
+            if not b & 0x80:
+                break
+        return head[0] >> 4, head[0] & 0x0F, await reader.readexactly(n) if n else b''
+
+    async def _ack(self, writer, kind, pid: bytes):
+        if self.ack_delay:
+            await asyncio.sleep(self.ack_delay)
+        if not writer.is_closing():
+            writer.write(packet(kind, 0, pid))
+
+    def _forward(self, topic: str, payload: bytes):
+        body = len(topic.encode()).to_bytes(2, 'big') + topic.encode() + payload
+        for w, filters in list(self._subs.items()):
+            if any(topic_matches(f, topic) for f in filters) and not w.is_closing():
+                w.write(packet(PUBLISH, 0, body))
+
+    async def _client(self, reader, writer):
+        tasks = set()
+        try:
+            while True:
+                kind, flags, body = await self._read(reader)
+                if kind == CONNECT:
+                    self.stats["connects"] += 1
+                    writer.write(packet(CONNACK, 0, b'\x00\x00'))
+                elif kind == PUBLISH:
+                    qos = (flags >> 1) & 3
+                    topic, i = _string(body, 0)
+                    pid = body[i:i + 2] if qos else b''
+                    payload = body[i + len(pid):]
+                    self.stats["publish"] += 1
+                    self.stats["bytes"] += len(payload)
+                    if self.keep_messages:
+                        self.messages.append((topic, payload, qos))
+                    self._forward(topic, payload)
+                    if self.drop_after and self.stats["publish"] >= self.drop_after and not self.stats["drops"]:
+                        # einmaliger Abbruch ohne Ack: Client muss neu verbinden und erneut senden
+                        self.stats["drops"] += 1
+                        break
+                    if qos:
+                        t = asyncio.ensure_future(self._ack(writer, PUBACK if qos == 1 else PUBREC, pid))
+                        tasks.add(t)
+                        t.add_done_callback(tasks.discard)
+                elif kind == PUBREL:
+                    writer.write(packet(PUBCOMP, 0, body[:2]))
+                elif kind == SUBSCRIBE:
+                    pid, i, granted = body[:2], 2, []
+                    while i < len(body):
+                        f, i = _string(body, i)
+                        self._subs.setdefault(writer, []).append(f)
+                        granted.append(0)
+                        i += 1
+                    writer.write(packet(SUBACK, 0, pid + bytes(granted)))
+                elif kind == UNSUBSCRIBE:
+                    i, gone = 2, set()
+                    while i < len(body):
+                        f, i = _string(body, i)
+                        gone.add(f)
+                    self._subs[writer] = [f for f in self._subs.get(writer, []) if f not in gone]
+                    writer.write(packet(UNSUBACK, 0, body[:2]))
+                elif kind == PINGREQ:
+                    writer.write(packet(PINGRESP, 0, b''))
+                elif kind == DISCONNECT:
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._subs.pop(writer, None)
+            for t in tasks:
+                t.cancel()
+            writer.close()
+
+    # -------------------------------------------------------------- Betrieb
+    def start(self) -> 'StandInBroker':
+        """Startet den Broker in einem Hintergrund-Thread; ``port`` ist danach der gebundene Port."""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._server = self._loop.run_until_complete(asyncio.start_server(self._client, self.host, self.port))
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name='mqtt-stand-in', daemon=True)
+        self._thread.start()
+        ready.wait(10)
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        async def shutdown():
+            self._server.close()
+            await self._server.wait_closed()
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(10)
+        self._loop = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Lokaler MQTT-Stand-in-Broker (Tests/Benchmarks)")
+    ap.add_argument("--host", type=str, default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=1883)
+    ap.add_argument("--ack-delay", type=float, default=0.0, help="Verzögerung bis PUBACK in Sekunden")
+    args = ap.parse_args(argv)
+    b = StandInBroker(args.host, args.port, args.ack_delay, keep_messages=False).start()
+    print(f"[OK] Stand-in-Broker auf {b.host}:{b.port} (Strg+C beendet)")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"  {b.stats}", flush=True)
+    except KeyboardInterrupt:
+        b.stop()
+
+if __name__ == "__main__":
+    main()
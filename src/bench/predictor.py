@@ -0,0 +1,92 @@
+# src/bench/predictor.py
+"""
+Benchmark: Inferenz-Backends für die drei Quantilmodelle einer Station.
+
+  sklearn   LGBMRegressor.predict auf einem DataFrame je Quantil (bisheriger Pfad)
+  lightgbm  Booster.predict auf einer float64-Matrix je Quantil (artifacts.predict_array)
+  compiled  eine NumPy-Traversierung für alle drei Quantile (src/models/compiled.py)
+
+Gemessen wird die Latenz je Station für eine Zeile (publish) und für eine Hindcast-Reihe
+(--rows Zeilen), dazu die max. Abweichung gegen LightGBM (0 = bitgleich) und mit --artifacts die
+Ladezeit eines Artefakt-Ordners je Backend. Die Modelle werden mit
+den Hyperparametern aus train_baseline auf synthetischen Features trainiert (inkl. NaN-Lücken)
+oder mit --artifacts aus einem vorhandenen Artefakt-Ordner geladen.
+
+Beispiel:
+  python -m src.bench.predictor --trees 700 --rows 2880
+  python -m src.bench.predictor --artifacts artifacts/ERFT_001/48
+"""
+
+import argparse, time
+
+import numpy as np
+import pandas as pd
+
+from src.models.artifacts import load_artifact, predict_array
+from src.models.compiled import TreeEnsemble
+
+def synth_models(n_features: int, trees: int, rows: int = 5000, seed: int = 0) -> dict:
+    from src.models.train_baseline import QUANTILE_ALPHAS, qmodel
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, n_features))
+    y = X[:, 0] * 3 + np.sin(X[:, 1]) + rng.normal(0, 0.3, rows)
+    X[rng.random(X.shape) < 0.05] = np.nan
+    Xd = pd.DataFrame(X, columns=[f"f{i}" for i in range(n_features)])
+    models = {q: qmodel(a, 1).set_params(n_estimators=trees, verbose=-1).fit(Xd, y) for q, a in QUANTILE_ALPHAS}
+    return {"features": list(Xd.columns), "models": models, "compiled": None}
+
+def per_call(fn, repeat: int) -> float:
+    fn()  # Aufwärmen
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--artifacts", type=str, default=None, help="Artefakt-Ordner statt synthetischer Modelle")
+    ap.add_argument("--trees", type=int, default=700, help="Bäume je Quantilmodell (synthetisch)")
+    ap.add_argument("--features", type=int, default=30)
+    ap.add_argument("--rows", type=int, default=2880, help="Zeilen einer Hindcast-Reihe (2880 = 30 Tage)")
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    art = load_artifact(args.artifacts, backend='lightgbm') if args.artifacts else synth_models(args.features, args.trees)
+    print(f"Modelle: {time.perf_counter() - t0:.1f} s")
+    if args.artifacts:
+        load_artifact(args.artifacts, backend='compiled')  # compiled.npz anlegen
+        for backend in ('lightgbm', 'compiled'):
+            dt = per_call(lambda: load_artifact(args.artifacts, backend=backend), 10)
+            print(f"  Laden        {backend:<9} {dt*1e3:9.3f} ms/Station")
+    t0 = time.perf_counter()
+    ens = TreeEnsemble.from_models(art['models'])
+    print(f"Kompilieren: {time.perf_counter() - t0:.3f} s ({len(ens.roots)} Bäume, {len(ens.feature)} Knoten inkl. Blätter)")
+    fast = {**art, "compiled": ens}
+
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(args.rows, len(art['features'])))
+    X[rng.random(X.shape) < 0.05] = np.nan
+    X[rng.random(X.shape) < 0.02] = 0.0
+    Xd = pd.DataFrame(X, columns=art['features'])
+
+    backends = {
+        "sklearn": lambda x, xd: {q: m.predict(xd) for q, m in art['models'].items()},
+        "lightgbm": lambda x, xd: predict_array(art, x),
+        "compiled": lambda x, xd: predict_array(fast, x),
+    }
+    ref = predict_array(art, X)
+    for label, n in (("1 Zeile", 1), (f"{args.rows} Zeilen", args.rows)):
+        x, xd = np.ascontiguousarray(X[:n]), Xd.iloc[:n]
+        base = None
+        for name, fn in backends.items():
+            if name == 'sklearn' and not hasattr(art['models']['p50'], 'booster_'):
+                continue
+            dt = per_call(lambda: fn(x, xd), max(1, args.repeat if n == 1 else args.repeat // 10))
+            out = fn(x, xd)
+            d = max(float(np.max(np.abs(out[q] - ref[q][:n]))) for q in out)
+            base = base or dt
+            print(f"  {label:<12} {name:<9} {dt*1e3:9.3f} ms/Station  x{base/dt:5.1f}  max|Δ|={d:.3g}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# src/bench/qc.py
+"""
+Benchmark: QC per groupby().apply(qc_group) gegen die vektorisierte Variante (run_qc).
+
+Beispiel:
+  python -m src.bench.qc --archive rivercast_100stations_raw.zip --missing 0.05
+
+In die Rohdaten werden reproduzierbar Lücken und negative Werte gestreut, damit beide
+Varianten tatsächlich maskieren und interpolieren müssen.
+"""
+
+import argparse, time
+
+import numpy as np
+import pandas as pd
+
+from src.etl.load import EXO_FILES, list_sources, load_raw_fast, source_name
+from src.etl.qc import qc_group, qc_spec, run_qc, DEFAULT_QC
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+def apply_qc(df):
+    return (df.groupby('station_id', group_keys=False)
+              .apply(qc_group)
+              .dropna(subset=['q_cms']))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--archive", type=str, default="rivercast_100stations_raw.zip")
+    ap.add_argument("--missing", type=float, default=0.05, help="Anteil fehlender Werte")
+    ap.add_argument("--negative", type=float, default=0.02, help="Anteil negativer Werte")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    df = load_raw_fast([s for s in list_sources(args.archive) if source_name(s) not in EXO_FILES])
+    rng = np.random.default_rng(args.seed)
+    for c in DEFAULT_QC['columns']:
+        if c in df.columns:
+            df.loc[rng.random(len(df)) < args.missing, c] = np.nan
+            df.loc[rng.random(len(df)) < args.negative, c] = -1.0
+
+    old, t_old = timed(apply_qc, df.copy())
+    (new, summary), t_new = timed(run_qc, df, qc_spec({}))
+    try:
+        pd.testing.assert_frame_equal(old.reset_index(drop=True), new.reset_index(drop=True)[old.columns],
+                                      check_exact=False, rtol=1e-12)
+        same = True
+    except AssertionError:
+        same = False
+    print(f"{len(df)} Zeilen, {df['station_id'].nunique()} Stationen")
+    print(f"  groupby.apply(qc_group): {t_old:7.3f} s")
+    print(f"  run_qc (vektorisiert):   {t_new:7.3f} s  (Speedup x{t_old/max(t_new, 1e-9):.1f}, Ergebnis gleich: {same})")
+    print(summary.groupby(['column', 'rule'])['n'].sum().to_string())
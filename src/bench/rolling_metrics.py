@@ -0,0 +1,72 @@
+# src/bench/rolling_metrics.py
+"""
+Benchmark: vektorisierte rollende Metriken (``rolling_skill``) gegen die bisherige
+Fenster-Schleife (mae/nse/kge/coverage je Fenster neu berechnet).
+
+Beispiel:
+  python -m src.bench.rolling_metrics --n 35040 --window 96
+  python -m src.bench.rolling_metrics --hindcast data/processed/hindcast/hindcast_ERFT_001_48.parquet
+
+Ausgabe: Laufzeiten beider Varianten, Speedup und max. Abweichung je Metrik.
+"""
+
+import argparse, time
+import numpy as np
+import pandas as pd
+
+from src.eval.rolling_metrics import mae, nse, kge, coverage, rolling_skill
+
+def rolling_skill_loop(y, yhat, p10, p90, window):
+    """Referenz: die bisherige Schleife aus dem __main__ von rolling_metrics."""
+    n, w = len(y), window
+    out = {k: np.full(n, np.nan) for k in ('mae', 'nse', 'kge', 'coverage')}
+    for i in range(w, n+1):
+        sl = slice(i-w, i)
+        out['mae'][i-1] = mae(y[sl], yhat[sl])
+        out['nse'][i-1] = nse(y[sl], yhat[sl])
+        out['kge'][i-1] = kge(y[sl], yhat[sl])
+        out['coverage'][i-1] = coverage(y[sl], p10[sl], p90[sl])
+    return out
+
+def synthetic_series(n: int, seed: int = 42):
+    """Pegelähnliche Reihe (Tagesgang + Random Walk) mit p10/p50/p90 um eine verrauschte Vorhersage."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    y = 130 + 10*np.sin(2*np.pi*t/96) + np.cumsum(rng.normal(0, 0.3, n))
+    p50 = y + rng.normal(0, 2.0, n)
+    return y, p50, p50 - 2.5, p50 + 2.5
+
+def compare(y, p50, p10, p90, window):
+    t0 = time.perf_counter()
+    ref = rolling_skill_loop(y, p50, p10, p90, window)
+    t_loop = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    vec = rolling_skill(y, p50, p10, p90, window=window)
+    t_vec = time.perf_counter() - t0
+    diffs = {}
+    for k in ref:
+        a, b = ref[k], vec[k]
+        same_nan = bool(np.array_equal(np.isnan(a), np.isnan(b)))
+        m = ~np.isnan(a) & ~np.isnan(b)
+        diffs[k] = (float(np.max(np.abs(a[m] - b[m]))) if m.any() else 0.0, same_nan)
+    return t_loop, t_vec, diffs
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=35040, help="Anzahl Punkte (35040 = 1 Jahr à 15 min)")
+    ap.add_argument("--window", type=int, default=96, help="Fenstergröße (Anzahl Punkte)")
+    ap.add_argument("--hindcast", type=str, default=None, help="Optional: echte Hindcast-Datei statt synthetischer Reihe")
+    args = ap.parse_args()
+
+    if args.hindcast:
+        df = pd.read_parquet(args.hindcast).sort_values('ts')
+        y, p50, p10, p90 = (df[c].to_numpy(dtype=float) for c in ('y_true', 'p50', 'p10', 'p90'))
+    else:
+        y, p50, p10, p90 = synthetic_series(args.n)
+
+    t_loop, t_vec, diffs = compare(y, p50, p10, p90, args.window)
+    print(f"n={len(y)} window={args.window}")
+    print(f"loop:       {t_loop:8.3f} s")
+    print(f"vectorized: {t_vec:8.3f} s  (Speedup x{t_loop/max(t_vec, 1e-9):.0f})")
+    for k, (d, same_nan) in diffs.items():
+        print(f"  {k:<9} max|Δ|={d:.3e}  NaN-Muster gleich: {same_nan}")
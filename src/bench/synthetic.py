@@ -0,0 +1,95 @@
+# src/bench/synthetic.py
+"""
+Synthetische Stationsdaten im Format der Rohdaten (15-min Raster, UTC).
+
+Je Station: Niederschlag als zufällige Ereignisse, Abfluss q_cms als linearer Speicher über den
+Niederschlag, Pegel h_cm über eine Potenz-Schlüsselkurve, dazu Temperatur mit Tagesgang.
+Exogen: ICON-Vorhersage (stündlich, verrauschter Niederschlag + Temperatur) und Bodenfeuchte
+(dreistündlich). Einzelne Zeilen fehlen bzw. sind negativ, damit QC und Raster etwas zu tun haben.
+
+Beispiel:
+  python -m src.bench.synthetic --stations 100 --steps 2880 --out data/raw_synth
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+def synth_stations(n_stations: int, steps: int, seed: int = 0, start: str = '2025-01-01',
+                   freq: str = '15min', missing: float = 0.005) -> dict:
+    """Frames 'base' (ts, station_id, q_cms, h_cm, rain_mm, temp_c), 'icon' und 'soil'."""
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range(start, periods=steps, freq=freq, tz='UTC')
+    sids = np.array([f"SYN_{i:04d}" for i in range(n_stations)])
+
+    # Niederschlag: Ereignisse mit Gamma-verteilter Menge, als (steps, n_stations)-Matrix
+    event = rng.random((steps, n_stations)) < 0.02
+    rain = np.where(event, rng.gamma(0.6, 2.0, (steps, n_stations)), 0.0)
+    base_q = rng.uniform(0.5, 20.0, n_stations)
+    k = rng.uniform(0.97, 0.995, n_stations)
+    gain = base_q * rng.uniform(0.02, 0.1, n_stations)
+    q = np.empty((steps, n_stations))
+    state = np.zeros(n_stations)
+    for t in range(steps):
+        state = k * state + gain * rain[t]
+        q[t] = base_q + state
+    q *= rng.lognormal(0.0, 0.02, q.shape)
+    h = 40.0 * q ** 0.45 + rng.normal(0.0, 0.5, q.shape)
+    hod = (ts.hour + ts.minute / 60).to_numpy()[:, None]
+    doy = ts.dayofyear.to_numpy()[:, None]
+    temp = (10 + 8 * np.sin(2*np.pi*(doy - 110) / 365) + 4 * np.sin(2*np.pi*(hod - 9) / 24)
+            + rng.normal(0.0, 0.7, (steps, n_stations)))
+
+    def frame(cols: dict, every: int = 1) -> pd.DataFrame:
+        sel = np.arange(0, steps, every)
+        return pd.DataFrame({
+            'ts': ts[sel][np.tile(np.arange(len(sel)), n_stations)],
+            'station_id': np.repeat(sids, len(sel)),
+            **{c: np.round(v[sel].T.ravel(), 3) for c, v in cols.items()},
+        })
+
+    base = frame({'q_cms': q, 'h_cm': h, 'rain_mm': rain, 'temp_c': temp})
+    drop = rng.random(len(base)) < missing
+    neg = rng.random(len(base)) < missing
+    base.loc[neg, 'q_cms'] = -base.loc[neg, 'q_cms']
+    base = base[~drop].reset_index(drop=True)
+
+    icon_rr = np.maximum(rain + rng.normal(0.0, 0.3, rain.shape), 0.0)
+    icon = frame({'icon_rr_mm': icon_rr, 'icon_t2m_c': temp + rng.normal(0.0, 1.0, temp.shape)}, every=4)
+    sm = np.clip(25 + np.cumsum(rain - 0.01, axis=0) * 0.05 + rng.normal(0.0, 0.5, rain.shape), 5, 60)
+    soil = frame({'sm_pct': sm}, every=12)
+    return {'base': base, 'icon': icon, 'soil': soil}
+
+def write_raw(frames: dict, raw_dir: Path, stations_per_file: int = 50) -> list:
+    """Basisreihen in CSV-Dateien zu je ``stations_per_file`` Stationen, exogene Quellen wie in data/raw."""
+    raw_dir = Path(raw_dir)
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    base = frames['base']
+    sids = base['station_id'].unique()
+    written = []
+    for i in range(0, len(sids), stations_per_file):
+        part = base[base['station_id'].isin(sids[i:i + stations_per_file])]
+        p = raw_dir / f"stations_{i // stations_per_file:04d}.csv"
+        part.to_csv(p, index=False, date_format='%Y-%m-%dT%H:%M:%SZ')
+        written.append(p)
+    for name, fname in (('icon', 'icon_forecast.csv'), ('soil', 'soil_moisture.csv')):
+        p = raw_dir / fname
+        frames[name].to_csv(p, index=False, date_format='%Y-%m-%dT%H:%M:%SZ')
+        written.append(p)
+    return written
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--stations", type=int, default=100)
+    ap.add_argument("--steps", type=int, default=2880, help="Zeitschritte je Station (2880 = 30 Tage)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=str, default="data/raw_synth")
+    args = ap.parse_args(argv)
+
+    files = write_raw(synth_stations(args.stations, args.steps, args.seed), Path(args.out))
+    print(f"[OK] {args.stations} Stationen × {args.steps} Schritte -> {args.out} ({len(files)} Dateien)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# src/cli.py
+"""
+Einheitlicher Einstiegspunkt: python -m src <befehl> [optionen]
+
+Jeder Befehl importiert erst beim Aufruf sein Modul (und damit pandas/LightGBM/matplotlib nur,
+wenn er sie braucht) und ruft dessen ``main(argv)`` auf; ``python -m src <befehl> --help``
+zeigt die Optionen des jeweiligen Moduls.
+"""
+
+import importlib, sys
+
+COMMANDS = {
+    "etl":      ("src.etl.load", "Rohdaten laden, auf Raster bringen, exogene Quellen anfügen"),
+    "qc":       ("src.etl.qc", "Plausibilitätsprüfung & Lückenfüllung"),
+    "features": ("src.features.build_features", "Features berechnen (voll oder --incremental)"),
+    "train":    ("src.models.train_baseline", "Quantilmodelle trainieren"),
+    "compile":  ("src.models.compiled", "Quantilmodelle für das NumPy-Backend übersetzen (compiled.npz)"),
+    "forecast": ("src.serve.publish", "Aktuelle Vorhersagen schreiben (JSON, optional MQTT)"),
+    "serve":    ("src.serve.server", "Residenter Forecast-Server (HTTP + Zyklen)"),
+    "cycle":    ("src.pipeline", "Operativer Zyklus load → qc → features → forecast in einem Prozess"),
+    "hindcast": ("src.eval.hindcast", "Historische p10/p50/p90-Reihen erzeugen"),
+    "metrics":  ("src.eval.rolling_metrics", "Rollende Skill-Metriken aus Hindcasts"),
+    "render":   ("src.plots.batch_render", "Fan-Charts aller Stationen × Horizonte"),
+    "plot":     ("src.plots.plot_fanchart", "Fan-Chart einer Station & eines Horizonts"),
+    "bench":    ("src.bench.__main__", "Benchmark-Suite mit synthetischen Stationen"),
+}
+
+def usage() -> str:
+    lines = ["Nutzung: python -m src <befehl> [optionen]", "", "Befehle:"]
+    lines += [f"  {name:<9} {text}" for name, (_, text) in COMMANDS.items()]
+    return "\n".join(lines)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return
+    cmd, rest = argv[0], argv[1:]
+    if cmd not in COMMANDS:
+        raise SystemExit(f"Unbekannter Befehl {cmd!r}\n\n{usage()}")
+    # argparse der Module zeigt so "rivercast <befehl>" in --help
+    sys.argv = [f"rivercast {cmd}", *rest]
+    return importlib.import_module(COMMANDS[cmd][0]).main(rest)
@@ -0,0 +1,13 @@
+# src/config.py
+"""Zentrale Konfiguration: config/config.yaml wird je Prozess genau einmal gelesen."""
+
+from functools import lru_cache
+from pathlib import Path
+
+CONFIG_PATH = Path('config/config.yaml')
+
+@lru_cache(maxsize=None)
+def load_config(path=CONFIG_PATH) -> dict:
+    import yaml
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
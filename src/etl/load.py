@@ -1,13 +1,30 @@
+import io
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
-import yaml
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from pathlib import Path
 
-CFG = yaml.safe_load(open('config/config.yaml'))
+from src.config import load_config
+from src.utils import perf, store
+
+CFG = load_config()
 
 RAW = Path('data/raw')
 OUT = Path('data/interim')
 OUT.mkdir(parents=True, exist_ok=True)
 
+EXO_FILES = {'icon_forecast.csv', 'soil_moisture.csv'}
+# explizite Typen der bekannten Spalten; weitere Spalten werden von pyarrow erkannt
+COLUMN_TYPES = {
+    'ts': pa.timestamp('ns', tz='UTC'), 'station_id': pa.string(),
+    'q_cms': pa.float64(), 'h_cm': pa.float64(), 'rain_mm': pa.float64(), 'temp_c': pa.float64(),
+    'icon_rr_mm': pa.float64(), 'icon_t2m_c': pa.float64(), 'sm_pct': pa.float64(),
+}
+
 def load_raw(paths):
     dfs = []
     for p in paths:
@@ -22,6 +39,71 @@ def load_raw(paths):
     df = df.groupby('station_id', group_keys=False).apply(to_raster).reset_index()
     return df
 
+def list_sources(path: Path) -> list:
+    """CSV-Quellen eines Verzeichnisses oder Zip-Archivs; Zip-Einträge als 'archiv.zip::datei.csv'."""
+    path = Path(path)
+    if path.suffix == '.zip':
+        with zipfile.ZipFile(path) as z:
+            return [f"{path}::{n}" for n in z.namelist() if n.endswith('.csv')]
+    return [str(p) for p in sorted(path.glob('*.csv'))]
+
+def source_name(src: str) -> str:
+    return Path(src.split('::', 1)[-1]).name
+
+def read_csv_fast(src: str) -> pa.Table:
+    """Liest eine CSV-Datei oder einen Zip-Eintrag (ohne Entpacken) mit pyarrow und festen Typen."""
+    opts = pacsv.ConvertOptions(column_types=COLUMN_TYPES)
+    if '::' in src:
+        archive, member = src.split('::', 1)
+        with zipfile.ZipFile(archive) as z:
+            return pacsv.read_csv(io.BytesIO(z.read(member)), convert_options=opts)
+    return pacsv.read_csv(src, convert_options=opts)
+
+def read_sources(sources, workers: int = 4) -> pd.DataFrame:
+    """Liest alle Quellen parallel (pyarrow gibt den GIL frei) und hängt sie als eine Tabelle an."""
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        tables = list(ex.map(read_csv_fast, sources))
+    return pa.concat_tables(tables, promote_options='default').to_pandas()
+
+def rasterize(df: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """
+    Bringt jede Station auf ein lückenloses Raster vom ersten bis zum letzten Zeitstempel
+    (wie groupby().asfreq, aber vektorisiert): Zeitpunkte außerhalb des Rasters entfallen,
+    doppelte Zeitstempel -> letzter Wert, Lückenzeilen behalten ihre station_id.
+    """
+    df = df[df['station_id'].notna() & df['ts'].notna()]
+    step = pd.Timedelta(freq).value
+    codes, stations = pd.factorize(df['station_id'], sort=True)
+    ts = df['ts'].values.view('i8')
+    t0 = np.full(len(stations), np.iinfo(np.int64).max)
+    t1 = np.full(len(stations), np.iinfo(np.int64).min)
+    np.minimum.at(t0, codes, ts)
+    np.maximum.at(t1, codes, ts)
+    sizes = (t1 - t0) // step + 1
+    offsets = np.r_[0, np.cumsum(sizes)[:-1]]
+
+    rel = ts - t0[codes]
+    on_grid = rel % step == 0
+    pos = (offsets[codes] + rel // step)[on_grid]
+
+    total = int(sizes.sum())
+    grid_codes = np.repeat(np.arange(len(stations)), sizes)
+    grid_ts = t0[grid_codes] + (np.arange(total) - offsets[grid_codes]) * step
+    out = {'ts': pd.DatetimeIndex(grid_ts.view('datetime64[ns]')).tz_localize(df['ts'].dt.tz),
+           'station_id': stations.to_numpy()[grid_codes]}
+    for c in df.columns:
+        if c in out:
+            continue
+        vals = df[c].to_numpy()[on_grid]
+        col = np.full(total, np.nan, dtype=np.float64 if vals.dtype.kind in 'fiub' else object)
+        col[pos] = vals  # bei Duplikaten gewinnt der letzte Wert
+        out[c] = col
+    return pd.DataFrame(out)
+
+def load_raw_fast(sources, workers: int = 4) -> pd.DataFrame:
+    """Parallel lesen (Verzeichnis- oder Zip-Quellen) und vektorisiert auf CFG['raster'] bringen."""
+    return rasterize(read_sources(sources, workers), CFG['raster'])
+
 def merge_exogenous(df):
     exo_cfg = CFG.get('features_exogenous', {})
     for name, opt in exo_cfg.items():
@@ -35,12 +117,101 @@ def merge_exogenous(df):
         df = df.merge(x, on=['ts','station_id'], how='left')
     return df
 
-if __name__ == "__main__":
+def _station_codes(col, stations: pd.Index) -> np.ndarray:
+    # über das Dictionary abbilden statt Objekt-Arrays je Zeile zu erzeugen
+    enc = col.dictionary_encode().combine_chunks()
+    lut = stations.get_indexer(enc.dictionary.to_pandas())
+    return lut[enc.indices.to_numpy(zero_copy_only=False)]
+
+def join_exogenous(df: pd.DataFrame, exo_cfg=None, workers: int = 4) -> pd.DataFrame:
+    """
+    Richtet alle aktivierten exogenen Quellen in einem Durchlauf auf den (station_id, ts)-Index
+    des Basis-Frames aus und hängt alle neuen Spalten mit einer einzigen Verkettung an.
+
+    Pro Quelle (``features_exogenous.<name>``): ``asof: true`` nimmt den letzten Wert mit
+    ts_quelle <= ts (für gröbere ICON-/Bodenfeuchte-Raster), begrenzt durch ``tolerance``
+    (z. B. "1h"); sonst nur exakte Treffer wie beim bisherigen merge.
+    """
+    exo_cfg = CFG.get('features_exogenous', {}) if exo_cfg is None else exo_cfg
+    active = {}
+    for name, opt in exo_cfg.items():
+        if not opt.get('enabled', False):
+            continue
+        p = Path(opt['path'].split('::', 1)[0])
+        if not p.exists():
+            print(f"[WARN] Exogenous file not found: {p}")
+            continue
+        active[name] = opt
+    if not active:
+        return df
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        tables = dict(zip(active, ex.map(lambda o: read_csv_fast(o['path']), active.values())))
+
+    # gemeinsamer Integer-Schlüssel: Stationscode * Spannweite + Sekunden seit t_min
+    codes, stations = pd.factorize(df['station_id'], sort=True)
+    base_ts = df['ts'].values.view('i8') // 10**9
+    src_ts = {n: t.column('ts').to_numpy().view('i8') // 10**9 for n, t in tables.items()}
+    all_ts = [base_ts, *src_ts.values()]
+    t_min = min(int(a.min()) for a in all_ts if len(a))
+    span = max(int(a.max()) for a in all_ts if len(a)) - t_min + 1
+    base_key = np.where(codes >= 0, codes * span + (base_ts - t_min), -1)
+
+    new_cols = {}
+    for name, t in tables.items():
+        opt = active[name]
+        src_codes = _station_codes(t.column('station_id'), stations)
+        keep = np.flatnonzero(src_codes >= 0)
+        if not len(keep):
+            print(f"[WARN] {name}: keine passenden Stationen")
+            continue
+        src_key = src_codes[keep] * span + (src_ts[name][keep] - t_min)
+        order = np.argsort(src_key, kind='stable')
+        src_key, rows = src_key[order], keep[order]
+        if opt.get('asof', False):
+            idx = np.searchsorted(src_key, base_key, side='right') - 1
+            ok = idx >= 0
+            idx = np.where(ok, idx, 0)
+            ok &= (src_codes[rows[idx]] == codes) & (base_key >= 0)
+            if opt.get('tolerance'):
+                ok &= (base_ts - src_ts[name][rows[idx]]) <= pd.Timedelta(opt['tolerance']).total_seconds()
+        else:
+            # exakte Treffer; bei doppelten Schlüsseln gilt der letzte Eintrag
+            idx = np.searchsorted(src_key, base_key, side='right') - 1
+            ok = idx >= 0
+            idx = np.where(ok, idx, 0)
+            ok &= (src_key[idx] == base_key) & (base_key >= 0)
+        for c in t.column_names:
+            if c in ('ts', 'station_id'):
+                continue
+            if c in df.columns or c in new_cols:
+                print(f"[WARN] Spalte {c} aus {name} existiert bereits – übersprungen")
+                continue
+            vals = t.column(c).to_numpy()[rows[idx]]
+            col = np.full(len(df), np.nan, dtype=np.float64 if vals.dtype.kind in 'fiub' else object)
+            col[ok] = vals[ok]
+            new_cols[c] = col
+    return pd.concat([df, pd.DataFrame(new_cols, index=df.index)], axis=1)
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--source", type=str, default=str(RAW), help="Rohdaten-Verzeichnis oder Zip-Archiv")
+    ap.add_argument("--workers", type=int, default=4, help="Parallele Leser")
+    args = ap.parse_args(argv)
+
     # base series (must include at least 'ts','station_id' and either 'q_cms' or 'h_cm')
-    base_paths = [p for p in RAW.glob('*.csv') if p.name != 'icon_forecast.csv' and p.name != 'soil_moisture.csv']
-    if not base_paths:
-        raise SystemExit("No CSV files found in data/raw. Add raw data CSVs first.")
-    df = load_raw(base_paths)
-    df = merge_exogenous(df)
-    df.to_parquet(OUT/'all.parquet')
-    print(f"Loaded & merged: {len(df)} rows -> {OUT/'all.parquet'}")
+    base_sources = [s for s in list_sources(Path(args.source)) if source_name(s) not in EXO_FILES]
+    if not base_sources:
+        raise SystemExit(f"No CSV files found in {args.source}. Add raw data CSVs first.")
+    with perf.stage('load') as st:
+        with st.step('read'):
+            df = load_raw_fast(base_sources, args.workers)
+        with st.step('exogenous'):
+            df = join_exogenous(df, workers=args.workers)
+        with st.step('write', rows=len(df)):
+            store.write_dataset(df, OUT/'all')
+        st.add_rows(len(df))
+    print(f"Loaded & merged: {len(df)} rows -> {OUT/'all'}")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,38 @@
-import pandas as pd
+"""
+QC: Plausibilitätsregeln und Lückenfüllung in einem vektorisierten Durchlauf über alle Stationen.
+
+Regeln je Spalte stehen unter ``qc:`` in config/config.yaml (Default = bisheriges ``qc_group``):
+  nonneg         negative Werte -> NaN
+  min / max      Werte außerhalb des Bereichs -> NaN
+  max_step       Spike: Sprung > max_step hinein und wieder heraus (entgegengesetzte Richtung) -> NaN
+  flatline_steps >= n identische Werte in Folge -> NaN
+Danach werden Lücken je Station linear über höchstens ``max_gap`` Schritte gefüllt (wie
+``Series.interpolate(limit=max_gap)``). Je Station/Spalte/Regel wird gezählt, was markiert,
+interpoliert oder verworfen wurde (data/processed/qc_summary.csv).
+"""
+
+import argparse
+
 import numpy as np
+import pandas as pd
 from pathlib import Path
 
-INP = Path('data/interim/all.parquet')
+from src.config import load_config
+from src.utils import perf, store
+
+CFG = load_config()
+INP = Path('data/interim/all')
 OUT = Path('data/processed')
 OUT.mkdir(parents=True, exist_ok=True)
 
+DEFAULT_QC = {
+    "max_gap": 8,
+    "drop_missing": ["q_cms"],
+    "columns": {c: {"nonneg": True} for c in ['q_cms', 'rain_mm', 'temp_c']},
+}
+
 def qc_group(g, max_gap=8):
+    # Referenz (bisherige apply-Variante), siehe src/bench/qc.py
     # hard plausibility
     for c in ['q_cms','rain_mm','temp_c']:
         if c in g.columns:
@@ -18,10 +44,119 @@ def qc_group(g, max_gap=8):
             g[c] = g[c].interpolate(limit=max_gap)
     return g.reset_index()
 
+def qc_spec(cfg: dict) -> dict:
+    spec = {**DEFAULT_QC, **(cfg.get('qc') or {})}
+    drop = spec.get('drop_missing') or []
+    return {"max_gap": int(spec['max_gap']),
+            "drop_missing": [drop] if isinstance(drop, str) else list(drop),
+            "columns": {c: dict(r or {}) for c, r in spec['columns'].items()}}
+
+def _run_lengths(v: np.ndarray, start: np.ndarray) -> np.ndarray:
+    """Länge der Folge identischer (nicht-NaN) Werte, zu der jede Zeile gehört."""
+    if not len(v):
+        return np.zeros(0, dtype=np.int64)
+    new = start.copy()
+    new[1:] |= ~(v[1:] == v[:-1])
+    new |= np.isnan(v)
+    run = np.cumsum(new) - 1
+    return np.bincount(run)[run]
+
+def interpolate_limited(v: np.ndarray, gid: np.ndarray, limit: int) -> np.ndarray:
+    """
+    Lineare Interpolation je Gruppe (gid sortiert), höchstens ``limit`` Schritte ab dem letzten
+    gültigen Wert; nach dem letzten gültigen Wert wird dieser fortgeschrieben (wie pandas).
+    """
+    n = len(v)
+    pos = np.arange(n)
+    valid = ~np.isnan(v)
+    prev = np.maximum.accumulate(np.where(valid, pos, -1))
+    nxt = np.minimum.accumulate(np.where(valid, pos, n)[::-1])[::-1]
+    prev_c, nxt_c = np.clip(prev, 0, n - 1), np.clip(nxt, 0, n - 1)
+    has_prev = (prev >= 0) & (gid[prev_c] == gid)
+    has_next = (nxt < n) & (gid[nxt_c] == gid)
+    fill = ~valid & has_prev & (pos - prev <= limit)
+    out = v.copy()
+    lo, hi = v[prev_c], v[nxt_c]
+    frac = (pos - prev) / np.maximum(nxt - prev, 1)
+    out[fill] = np.where(has_next, lo + (hi - lo) * frac, lo)[fill]
+    return out
+
+def run_qc(df: pd.DataFrame, spec: dict = None):
+    """
+    Wendet alle Regeln und die Lückenfüllung an. Rückgabe: (bereinigter Frame, Zusammenfassung)
+    mit einer Zeile je Station/Spalte/Regel (station_id, column, rule, n).
+    """
+    spec = qc_spec(CFG) if spec is None else spec
+    df = df.reset_index(drop=True)
+    codes, stations = pd.factorize(df['station_id'], sort=True)
+    order = np.lexsort((df['ts'].values, codes))
+    gid = codes[order]
+    start = np.ones(len(gid), dtype=bool)
+    start[1:] = gid[1:] != gid[:-1]
+
+    counts, cols = {}, {}
+    def count(col, rule, mask):
+        counts[(col, rule)] = np.bincount(gid[mask & (gid >= 0)], minlength=len(stations))
+
+    for c, rules in spec['columns'].items():
+        if c not in df.columns:
+            continue
+        v = df[c].to_numpy(dtype=np.float64)[order]
+        bad = np.zeros(len(v), dtype=bool)
+        if rules.get('nonneg'):
+            m = v < 0
+            count(c, 'nonneg', m); bad |= m
+        if rules.get('min') is not None or rules.get('max') is not None:
+            m = (v < rules.get('min', -np.inf)) | (v > rules.get('max', np.inf))
+            count(c, 'range', m & ~bad); bad |= m
+        v[bad] = np.nan
+        if rules.get('max_step') is not None:
+            d = np.diff(v, prepend=np.nan)
+            d[start] = np.nan
+            d_out = np.append(d[1:], np.nan)
+            m = (np.abs(d) > rules['max_step']) & (np.abs(d_out) > rules['max_step']) & (np.sign(d) != np.sign(d_out))
+            count(c, 'spike', m); v[m] = np.nan
+        if rules.get('flatline_steps'):
+            m = _run_lengths(v, start) >= int(rules['flatline_steps'])
+            m &= ~np.isnan(v)
+            count(c, 'flatline', m); v[m] = np.nan
+        gaps = np.isnan(v)
+        v = interpolate_limited(v, gid, spec['max_gap'])
+        count(c, 'interpolated', gaps & ~np.isnan(v))
+        out = np.empty_like(v)
+        out[order] = v
+        cols[c] = out
+
+    df = df.assign(**cols)
+    keep = np.ones(len(df), dtype=bool)
+    for c in spec['drop_missing']:
+        if c in df.columns:
+            m = df[c].isna().to_numpy()
+            counts[(c, 'dropped')] = np.bincount(codes[m & keep & (codes >= 0)], minlength=len(stations))
+            keep &= ~m
+    df = df[keep]
+
+    summary = pd.DataFrame(
+        [(sid, c, rule, int(n[i])) for (c, rule), n in counts.items() for i, sid in enumerate(stations) if n[i]],
+        columns=['station_id', 'column', 'rule', 'n'])
+    return df, summary.sort_values(['station_id', 'column', 'rule'], ignore_index=True)
+
+def main(argv=None):
+    argparse.ArgumentParser(description="QC: Plausibilitätsregeln und Lückenfüllung (Regeln unter qc: in config.yaml)").parse_args(argv)
+    with perf.stage('qc') as st:
+        with st.step('read'):
+            df = store.read_dataset(INP)
+        st.add_rows(len(df))
+        with st.step('rules', rows=len(df)):
+            df, summary = run_qc(df)
+        with st.step('write', rows=len(df)):
+            store.write_dataset(df, OUT/'clean')
+            summary.to_csv(OUT/'qc_summary.csv', index=False)
+        st.extra['flagged'] = int(summary['n'].sum()) if len(summary) else 0
+    if len(summary):
+        print(summary.groupby(['column', 'rule'])['n'].agg(['sum', 'count'])
+              .rename(columns={'sum': 'rows', 'count': 'stations'}).to_string())
+    print(f"QC done -> {OUT/'clean'} (Flags: {OUT/'qc_summary.csv'})")
+
 if __name__ == "__main__":
-    df = pd.read_parquet(INP)
-    df = (df.groupby('station_id', group_keys=False)
-            .apply(qc_group)
-            .dropna(subset=['q_cms']))
-    df.to_parquet(OUT/'clean.parquet')
-    print(f"QC done -> {OUT/'clean.parquet'}")
+    main()
@@ -1,81 +1,249 @@
 # src/eval/hindcast.py
 """
-Hindcast für den 'per_station'-Modus:
-Erzeugt historische p10/p50/p90-Zeitreihen je Station & Horizont, um Fan-Charts zu plotten.
+Hindcast: historische p10/p50/p90-Zeitreihen je Station & Horizont, um Fan-Charts zu plotten.
 
 Beispiel:
   python -m src.eval.hindcast --horizons 24 48 96 --out data/processed/hindcast
+  python -m src.eval.hindcast --stations ERFT_001 ERFT_002 --workers 4
+  python -m src.eval.hindcast --export-files              # zusätzlich hindcast_{station}_{H}.parquet
+
+Ausgabe ist der konsolidierte Speicher (src/utils/hindcast_store.py): eine Datei je Horizont
+unter <out>/horizon=<H>/part-0.parquet, eine Row Group je Station.
+
+Die Features werden einmal als float64-Matrix (nach station_id, ts sortiert) gehalten; Stationen
+sind Zeilenbereiche darin und werden als Views ohne Kopie vorhergesagt.
+  per_station: Prozesspool über Stationen (--workers); jeder Worker erbt die Matrix (fork) und hält
+               geladene Modelle in einer ModelRegistry.
+  global:      ein Modell je Horizont für alle Stationen, blockweise vorhergesagt (LightGBM-Threads).
+Mit ``inference.backend`` compiled bzw. auto (Default, sobald compiled.npz aktuell ist) laufen die
+Vorhersagen über src/models/compiled.py.
+Mit ``horizon_layout: stacked`` kommt ein Modellset für alle Horizonte aus artifacts/[{station}/]stacked/;
+per_station rechnet dann alle Horizonte einer Station in einem Modellaufruf je Quantil.
 
 Voraussetzungen:
-- config/config.yaml: training_mode: 'per_station'
-- train_baseline.py wurde ausgeführt (Modelle unter artifacts/{station}/{H}/)
-- data/processed/feat.parquet existiert
+- train_baseline.py wurde ausgeführt (Modelle unter artifacts/{station}/{H}/ bzw. artifacts/{H}/,
+  stacked: artifacts/{station}/stacked/ bzw. artifacts/stacked/)
+- Feature-Store data/processed/feat existiert
 """
 
-import argparse, json
+import argparse, os, time, warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+
+import numpy as np
 import pandas as pd
-import joblib
-import yaml
 
-CFG = yaml.safe_load(open('config/config.yaml', 'r', encoding='utf-8'))
+from src.config import load_config
+from src.models.artifacts import artifact_dir, predict_array, predict_horizons
+from src.serve.registry import ModelRegistry
+from src.utils import hindcast_store, perf, store
+from src.utils.metrics import grouped_scores
+
+CFG = load_config()
 ART = Path('artifacts')
+FEAT = Path('data/processed/feat')
+TARGET = CFG.get('target_col', 'q_cms')
+MODE = CFG.get('training_mode', 'global')
+LAYOUT = CFG.get('horizon_layout', 'per_horizon')
+CHUNK = 1 << 16
 
-def load_features_df() -> pd.DataFrame:
-    df = pd.read_parquet('data/processed/feat.parquet').sort_values(['station_id','ts'])
-    return df
+# Zustand je Worker-Prozess (per fork aus dem Elternprozess geerbt bzw. einmal geladen)
+_M = None
+_REG = None
+_THREADS = None
 
-def run_hindcast(df: pd.DataFrame, horizons, outdir: Path):
-    outdir.mkdir(parents=True, exist_ok=True)
-    stations = df['station_id'].dropna().unique().tolist()
-    written = []
+def load_features_df(stations=None) -> pd.DataFrame:
+    return store.read_dataset(FEAT, stations=stations)
 
-    for sid in stations:
-        g = df[df['station_id'] == sid].copy()
-        for H in horizons:
+def feature_matrix(df: pd.DataFrame) -> dict:
+    """float64-Featurematrix, Ziel und Zeilenbereich je Station aus einem nach (station_id, ts) sortierten Frame."""
+    from src.models.train_baseline import features_from
+    features = features_from(df)
+    sid = df['station_id'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, sid[1:] != sid[:-1]]) if len(df) else np.zeros(0, dtype=int)
+    stops = np.r_[starts[1:], len(df)]
+    return {"X": np.ascontiguousarray(df[features].to_numpy(dtype=np.float64)), "features": features,
+            "target": df[TARGET].to_numpy(dtype=np.float64),
+            "spans": {sid[a]: (int(a), int(b)) for a, b in zip(starts, stops) if pd.notna(sid[a])}}
+
+def _columns(m: dict, features) -> list:
+    """Spaltenindizes der Modell-Features in der Matrix (None = gleiche Reihenfolge, View genügt)."""
+    return None if list(features) == m['features'] else [m['features'].index(f) for f in features]
+
+def _predict(art: dict, X: np.ndarray, cols) -> dict:
+    parts = [predict_array(art, X[i:i + CHUNK] if cols is None else X[i:i + CHUNK][:, cols], _THREADS)
+             for i in range(0, len(X), CHUNK)]
+    return {q: np.concatenate([p[q] for p in parts]) if parts else np.zeros(0) for q in ('p10', 'p50', 'p90')}
+
+def _predict_stacked(art: dict, X: np.ndarray, horizons) -> dict:
+    """Stacked-Artefakt: alle Horizonte je Zeile gebündelt, blockweise; Arrays (Zeilen × Horizonte)."""
+    cols = _columns(_M, art['features'][:-1])
+    step = max(1, CHUNK // len(horizons))
+    parts = [predict_horizons(art, X[i:i + step] if cols is None else X[i:i + step][:, cols], horizons, _THREADS)
+             for i in range(0, len(X), step)]
+    return {q: np.concatenate([p[q] for p in parts]) if parts else np.zeros((0, len(horizons)))
+            for q in ('p10', 'p50', 'p90')}
+
+def _init_worker(stations, horizons, threads):
+    global _M, _REG, _THREADS
+    if _M is None:  # bei fork bereits aus dem Elternprozess vorhanden
+        _M = {**feature_matrix(load_features_df(stations)), "horizons": list(horizons)}
+    if _REG is None:
+        _REG = ModelRegistry(ART)
+    _THREADS = threads
+
+def station_job(sid):
+    """Alle Horizonte einer Station; liefert (sid, {H: (Zeilen, p10, p50, p90, y_true)}, Meldungen)."""
+    a, b = _M['spans'][sid]
+    out, notes = {}, []
+    if LAYOUT == 'stacked':
+        mdir = artifact_dir(ART, sid=sid, layout='stacked')
+        if not mdir.exists():
+            return sid, out, [f"[SKIP] {sid}: kein Modellordner {mdir}"]
+        stacked = _predict_stacked(_REG.get(mdir), _M['X'][a:b], _M['horizons'])
+    for j, H in enumerate(_M['horizons']):
+        n = max(b - a - H, 0)
+        y = _M['target'][a + H:b]
+        if LAYOUT == 'stacked':
+            pq = {q: v[:n, j] for q, v in stacked.items()}
+        else:
             mdir = ART / sid / str(H)
             if not mdir.exists():
-                print(f"[SKIP] {sid} H={H}: kein Modellordner {mdir}")
+                notes.append(f"[SKIP] {sid} H={H}: kein Modellordner {mdir}")
                 continue
+            art = _REG.get(mdir)
+            pq = _predict(art, _M['X'][a:a + n], _columns(_M, art['features']))
+        keep = ~np.isnan(y)
+        rows = np.arange(a, a + n)[keep]
+        out[H] = (rows, pq['p10'][keep], pq['p50'][keep], pq['p90'][keep], y[keep])
+    return sid, out, notes
 
-            meta = json.loads((mdir/'meta.json').read_text(encoding='utf-8'))
-            feats = meta['features']
-            m10 = joblib.load(mdir/'model_p10.lgb')
-            m50 = joblib.load(mdir/'model_p50.lgb')
-            m90 = joblib.load(mdir/'model_p90.lgb')
-
-            X = g[feats].copy()
-            g['y_true'] = g[CFG.get('target_col','q_cms')].shift(-H)
-
-            p10 = m10.predict(X)
-            p50 = m50.predict(X)
-            p90 = m90.predict(X)
-
-            out = pd.DataFrame({
-                'ts': g['ts'],
-                'station_id': sid,
-                'horizon_steps': H,
-                'horizon_minutes': H * 15,
-                'p10': p10,
-                'p50': p50,
-                'p90': p90,
-                'y_true': g['y_true']
-            }).dropna(subset=['y_true'])
-
-            fout = outdir / f"hindcast_{sid}_{H}.parquet"
-            out.to_parquet(fout)
-            written.append(str(fout))
-            print(f"[OK] {sid} H={H} -> {fout}")
+def global_job(H):
+    """Globales Modell eines Horizonts für alle Stationen (Ziel je Station um H verschoben)."""
+    mdir = artifact_dir(ART, H, layout=LAYOUT)
+    if not mdir.exists():
+        return H, None, [f"[SKIP] H={H}: kein Modellordner {mdir}"]
+    art = _REG.get(mdir)
+    if LAYOUT == 'stacked':
+        pq = {q: v[:, 0] for q, v in _predict_stacked(art, _M['X'], [H]).items()}
+    else:
+        pq = _predict(art, _M['X'], _columns(_M, art['features']))
+    rows, parts = [], {q: [] for q in ('p10', 'p50', 'p90', 'y_true')}
+    for a, b in _M['spans'].values():
+        n = max(b - a - H, 0)
+        y = _M['target'][a + H:b]
+        keep = ~np.isnan(y)
+        rows.append(np.arange(a, a + n)[keep])
+        for q in ('p10', 'p50', 'p90'):
+            parts[q].append(pq[q][a:a + n][keep])
+        parts['y_true'].append(y[keep])
+    cat = lambda v: np.concatenate(v) if v else np.zeros(0)
+    return H, (cat(rows), *(cat(parts[q]) for q in ('p10', 'p50', 'p90', 'y_true'))), []
+
+def hindcast_frame(df: pd.DataFrame, H: int, res) -> pd.DataFrame:
+    rows, p10, p50, p90, y = res
+    return pd.DataFrame({
+        'ts': df['ts'].array.take(rows),
+        'station_id': df['station_id'].to_numpy()[rows],
+        'horizon_steps': H,
+        'horizon_minutes': H * 15,
+        'p10': p10, 'p50': p50, 'p90': p90,
+        'y_true': y,
+    })
+
+def run_hindcast(df: pd.DataFrame, horizons, outdir: Path, workers: int = 1, threads: int = None, st=None) -> list:
+    """Hindcasts aller Stationen in ``df`` (nach station_id, ts sortiert) in den Speicher unter ``outdir``."""
+    global _M, _REG, _THREADS
+    outdir.mkdir(parents=True, exist_ok=True)
+    _M = {**feature_matrix(df), "horizons": list(horizons)}
+    _REG = _REG or ModelRegistry(ART)
+    _THREADS = threads
+    results = {H: [] for H in horizons}
+    t0, done, rows = time.perf_counter(), 0, 0
+
+    def collect(label, res, notes, total):
+        nonlocal done, rows
+        for msg in notes:
+            print(msg, flush=True)
+        for H, r in res.items():
+            results[H].append(r)
+        done += 1
+        n = sum(len(r[0]) for r in res.values())
+        rows += n
+        print(f"[OK] {label} ({done}/{total}) {n} Zeilen | {rows / (time.perf_counter() - t0):,.0f} Zeilen/s", flush=True)
+
+    if MODE == 'global':
+        # ein Prozess; LightGBM parallelisiert die Vorhersage selbst
+        for H in horizons:
+            H, res, notes = global_job(H)
+            collect(f"H={H}", {} if res is None else {H: res}, notes, len(horizons))
+    elif MODE == 'per_station':
+        stations = list(_M['spans'])
+        workers = max(1, min(workers, len(stations)))
+        if workers == 1:
+            for sid in stations:
+                collect(*station_job(sid), len(stations))
+        else:
+            # Matrix wird je Worker geerbt (fork) bzw. einmal geladen (spawn), nicht je Job gepickelt
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(stations, list(horizons), threads)) as ex:
+                for f in as_completed([ex.submit(station_job, sid) for sid in stations]):
+                    collect(*f.result(), len(stations))
+    else:
+        raise SystemExit(f"Unknown training_mode {MODE}")
+
+    written, series = [], 0
+    for H, parts in results.items():
+        if not parts:
+            continue
+        frame = hindcast_frame(df, H, tuple(np.concatenate([p[i] for p in parts]) for i in range(5)))
+        series += frame['station_id'].nunique()
+        fout = hindcast_store.write_horizon(frame, outdir, H)
+        written.append(str(fout))
+        # alle Stationen des Horizonts in einem Aufruf bewerten
+        sk = grouped_scores(frame['station_id'].to_numpy(), frame['y_true'].to_numpy(), frame['p50'].to_numpy(),
+                            frame['p10'].to_numpy(), frame['p90'].to_numpy())
+        with warnings.catch_warnings():  # Horizont ohne bewertbare Station: NaN statt Warnung
+            warnings.simplefilter('ignore', RuntimeWarning)
+            print(f"[OK] H={H} -> {fout} | NSE Median {np.nanmedian(sk['NSE']):.3f}, "
+                  f"Coverage {np.nanmean(sk['coverage']):.2f}, Pinball p50 {np.nanmean(sk['pinball_p50']):.3f}")
+    dt = time.perf_counter() - t0
+    print(f"Hindcast: {len(_M['spans'])} Stationen, {series} Reihen, {rows} Zeilen in {dt:.1f} s "
+          f"({rows / max(dt, 1e-9):,.0f} Zeilen/s, {series / max(dt, 1e-9):.1f} Reihen/s)")
+    if st is not None:
+        st.extra.update(series=series, predicted_rows=rows, workers=workers if MODE == 'per_station' else 1)
     return written
 
-if __name__ == "__main__":
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--horizons", nargs="+", type=int, default=None, help="Horizonte in 15-min Schritten, z. B. 24 48 96")
     ap.add_argument("--out", type=str, default="data/processed/hindcast", help="Ausgabeordner")
-    args = ap.parse_args()
+    ap.add_argument("--stations", nargs="+", default=None, help="Nur diese Stationen (übrige bleiben im Speicher erhalten)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parallele Prozesse (per_station)")
+    ap.add_argument("--threads", type=int, default=None, help="LightGBM-Threads je Vorhersage (Default: Kerne / workers)")
+    ap.add_argument("--export-files", nargs="?", const="", default=None, metavar="DIR",
+                    help="Zusätzlich altes Layout hindcast_{station}_{H}.parquet schreiben (Default: --out)")
+    args = ap.parse_args(argv)
 
     horizons = args.horizons or (CFG.get('horizon_steps_list') or [24, 48, 96])
     outdir = Path(args.out)
+    workers = max(1, args.workers) if MODE == 'per_station' else 1
+    threads = args.threads or (max(1, (os.cpu_count() or 1) // workers) if workers > 1 else None)
 
-    df = load_features_df()
-    run_hindcast(df, horizons, outdir)
+    with perf.stage('hindcast') as st:
+        with st.step('read'):
+            df = load_features_df(args.stations)
+        if not len(df):
+            raise SystemExit(f"Keine Features für {args.stations or 'alle Stationen'} in {FEAT}")
+        st.add_rows(len(df))
+        with st.step('predict'):
+            written = run_hindcast(df, horizons, outdir, workers, threads, st)
+        st.extra['files'] = len(written)
+        if args.export_files is not None:
+            with st.step('export'):
+                exported = hindcast_store.export_files(outdir, Path(args.export_files or outdir),
+                                                       stations=args.stations, horizons=horizons)
+            print(f"[OK] {len(exported)} Einzeldateien -> {args.export_files or outdir}")
+
+if __name__ == "__main__":
+    main()
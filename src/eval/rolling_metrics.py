@@ -1,6 +1,7 @@
 # src/eval/rolling_metrics.py
 """
-Berechnet rollende Skill-Metriken (MAE, NSE, KGE) und Coverage (y_true in [p10,p90]) aus Hindcast-Dateien.
+Berechnet rollende Skill-Metriken (MAE, NSE, KGE) und Coverage (y_true in [p10,p90]) aus dem
+Hindcast-Speicher (src/utils/hindcast_store.py; Einzeldateien im alten Layout werden ebenfalls gelesen).
 
 Nutzung:
   python -m src.eval.rolling_metrics --hindcast data/processed/hindcast --window 96 --out data/processed/metrics
@@ -8,34 +9,148 @@ Nutzung:
 - window = Anzahl Punkte im Rollfenster (z. B. 96 bei 24h auf 15-min Raster)
 Ergebnisse:
   - Parquet/CSV pro Station/Horizont mit Spalten: ts, station_id, horizon_steps, mae, nse, kge, coverage
+  - skill_summary.csv: Gesamtwerte je Station/Horizont (MAE, RMSE, NSE, KGE, Coverage, Anteil gekreuzter
+    Quantile, Pinball-Loss p10/p50/p90), in einem Aufruf von src.utils.metrics.score_frame über alle Hindcasts;
+    dazu je Horizont die Coverage gegen das Soll 0.80 (--coverage-tol)
   - Optional: einfache Plot-Ausgabe (je Metrik) via --plot-out artifacts/metrics_plots
+
+Die Rollfenster werden mit ``rolling_skill`` in einem Durchlauf über blockweise Präfixsummen
+(Σy, Σŷ, Σy², Σŷ², Σyŷ, Σ|y-ŷ|, Treffer) berechnet – O(n) statt O(n·window).
+Die Einzelfenster-Funktionen ``mae``/``nse``/``kge``/``coverage`` (Referenz) kommen aus src.utils.metrics.
+
+Import:
+  from src.eval.rolling_metrics import rolling_skill, rolling_metrics_frame
 """
 
 import argparse
 from pathlib import Path
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-
-def mae(y, yhat): return np.mean(np.abs(y - yhat)) if len(y)>0 else np.nan
-def nse(y, yhat):
-    if len(y)==0: return np.nan
-    denom = np.sum((y - np.mean(y))**2)
-    if denom == 0: return np.nan
-    return 1 - np.sum((y - yhat)**2) / denom
-def kge(y, yhat):
-    if len(y)==0: return np.nan
-    r = np.corrcoef(y, yhat)[0,1] if len(y)>1 else np.nan
-    alpha = np.std(yhat)/np.std(y) if np.std(y)>0 else np.nan
-    beta = np.mean(yhat)/np.mean(y) if np.mean(y)!=0 else np.nan
-    if np.isnan(r) or np.isnan(alpha) or np.isnan(beta):
-        return np.nan
-    return 1 - np.sqrt((r-1)**2 + (alpha-1)**2 + (beta-1)**2)
-
-def coverage(y, p10, p90):
-    return np.mean((y >= p10) & (y <= p90)) if len(y)>0 else np.nan
+
+from src.utils import hindcast_store, perf
+# Einzelfenster-Metriken (Referenz) aus den gemeinsamen Kerneln
+from src.utils.metrics import NOMINAL_COVERAGE, ZERO_VAR_RTOL, coverage, kge, mae, nse, score_frame
+
+def _window_parts(a: np.ndarray, w: int):
+    """
+    Fenstersummen (Fensterenden w-1..n-1) aus Präfix-/Suffixsummen je Block der Länge w: jedes
+    Fenster ist Suffix eines Blocks (Kopf) plus Präfix des nächsten (Rest, 0 bei Blockanfang). Der
+    Rundungsfehler bleibt so in der Größenordnung des Fensters statt der ganzen Reihe wie bei
+    Differenzen von cumsum. Liefert (Kopf, Rest).
+    """
+    n = len(a)
+    b = np.zeros(-(-n // w) * w)
+    b[:n] = a
+    b = b.reshape(-1, w)
+    pre = np.cumsum(b, axis=1).ravel()
+    suf = np.cumsum(b[:, ::-1], axis=1)[:, ::-1].ravel()
+    start = np.arange(n - w + 1)
+    return suf[start], np.where(start % w == 0, 0.0, pre[start + w - 1])
+
+def _window_sums(a: np.ndarray, w: int) -> np.ndarray:
+    head, rest = _window_parts(a, w)
+    return head + rest
+
+def rolling_skill(y, yhat, p10=None, p90=None, window: int = 96, min_periods: int | None = None) -> dict:
+    """
+    Rollende MAE/NSE/KGE/Coverage über alle Fenster [i-window+1, i] in einem Durchlauf.
+
+    Liefert ein Dict mit Arrays der Länge n (Wert am Fensterende, davor NaN), die den
+    Einzelfenster-Funktionen ``mae``/``nse``/``kge``/``coverage`` entsprechen.
+    NaN-Paare (y oder ŷ fehlt) werden übersprungen; ein Fenster braucht mindestens
+    ``min_periods`` gültige Paare (Default: window, d. h. Fenster mit Lücken -> NaN).
+    """
+    y = np.asarray(y, dtype=float)
+    yhat = np.asarray(yhat, dtype=float)
+    n, w = len(y), int(window)
+    min_periods = w if min_periods is None else max(int(min_periods), 1)
+    out = {k: np.full(n, np.nan) for k in ('mae', 'nse', 'kge', 'coverage')}
+    if n < w or w < 1:
+        return out
+
+    valid = ~(np.isnan(y) | np.isnan(yhat))
+    # Zentrieren gegen Auslöschung in Σy²-(Σy)²/n, je Block der Länge w auf dessen Mittelwert; die
+    # Summen des Rests werden auf das Zentrum des Kopf-Blocks umgerechnet (Verschiebung d)
+    blk = np.arange(n) // w
+    nb = int(blk[-1]) + 1
+    cnt_b = np.bincount(blk, valid, nb)
+    with np.errstate(invalid='ignore'):
+        cen_b = np.bincount(blk, np.where(valid, y, 0.0), nb) / cnt_b
+    cen_b[cnt_b == 0] = float(np.mean(y[valid])) if valid.any() else 0.0
+    yc = np.where(valid, y - cen_b[blk], 0.0)
+    fc = np.where(valid, yhat - cen_b[blk], 0.0)
+    err = np.where(valid, y - yhat, 0.0)
+
+    P = {k: _window_parts(v, w) for k, v in {
+        'n': valid.astype(float), 'y': yc, 'f': fc, 'yy': yc * yc, 'ff': fc * fc, 'yf': yc * fc}.items()}
+    first = np.arange(n - w + 1) // w
+    c = cen_b[first]
+    d = cen_b[np.minimum(first + 1, nb - 1)] - c
+    m, ry, rf = P['n'][1], P['y'][1], P['f'][1]
+    S = {'n': P['n'][0] + m,
+         'y': P['y'][0] + ry + m * d, 'f': P['f'][0] + rf + m * d,
+         'yy': P['yy'][0] + P['yy'][1] + 2 * d * ry + m * d * d,
+         'ff': P['ff'][0] + P['ff'][1] + 2 * d * rf + m * d * d,
+         'yf': P['yf'][0] + P['yf'][1] + d * (ry + rf) + m * d * d,
+         'ae': _window_sums(np.abs(err), w), 'se': _window_sums(err * err, w)}
+    # Größenordnung der Summanden von S['yy']/S['ff'] (Maßstab der Null-Varianz-Toleranz)
+    scale_y = P['yy'][0] + P['yy'][1] + m * d * d
+    scale_f = P['ff'][0] + P['ff'][1] + m * d * d
+    cnt = np.rint(S['n'])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        my, mf = S['y'] / cnt, S['f'] / cnt
+        vy = np.maximum(S['yy'] - S['y'] * my, 0.0)   # n·Var(y)
+        vf = np.maximum(S['ff'] - S['f'] * mf, 0.0)   # n·Var(ŷ)
+        cov = S['yf'] - S['y'] * mf
+        # Toleranz relativ zu den Quadratsummen des Fensters selbst, nicht der Reihe bis dahin
+        zero_y = vy <= ZERO_VAR_RTOL * scale_y
+        zero_f = vf <= ZERO_VAR_RTOL * scale_f
+
+        mae_w = S['ae'] / cnt
+        nse_w = np.where(zero_y, np.nan, 1 - S['se'] / vy)
+
+        r = np.where(zero_y | zero_f | (cnt < 2), np.nan, cov / np.sqrt(vy * vf))
+        r = np.clip(r, -1.0, 1.0)
+        alpha = np.where(zero_y, np.nan, np.sqrt(vf / vy))
+        mean_y = my + c
+        beta = np.where(mean_y == 0, np.nan, (mf + c) / mean_y)
+        kge_w = 1 - np.sqrt((r - 1) ** 2 + (alpha - 1) ** 2 + (beta - 1) ** 2)
+
+        if p10 is not None and p90 is not None:
+            p10 = np.asarray(p10, dtype=float)
+            p90 = np.asarray(p90, dtype=float)
+            hit = valid & (y >= p10) & (y <= p90)
+            cov_w = np.rint(_window_sums(hit.astype(float), w)) / cnt
+        else:
+            cov_w = np.full(n - w + 1, np.nan)
+
+    enough = cnt >= min_periods
+    for key, vals in (('mae', mae_w), ('nse', nse_w), ('kge', kge_w), ('coverage', cov_w)):
+        out[key][w - 1:] = np.where(enough, vals, np.nan)
+    return out
+
+def rolling_metrics_frame(df: pd.DataFrame, window: int = 96, min_periods: int | None = None) -> pd.DataFrame:
+    """Rollende Metriken für einen Hindcast-Frame (eine Station, ein Horizont), nach ts sortiert."""
+    df = df.sort_values('ts').reset_index(drop=True)
+    sid = df['station_id'].iloc[0]
+    H = int(df['horizon_steps'].iloc[0]) if 'horizon_steps' in df.columns else int(df['horizon_minutes'].iloc[0])//15
+    roll = rolling_skill(df['y_true'].to_numpy(), df['p50'].to_numpy(),
+                         df['p10'].to_numpy(), df['p90'].to_numpy(),
+                         window=window, min_periods=min_periods)
+    return pd.DataFrame({
+        "ts": df["ts"],
+        "station_id": sid,
+        "horizon_steps": H,
+        "window": window,
+        "mae": roll['mae'],
+        "nse": roll['nse'],
+        "kge": roll['kge'],
+        "coverage": roll['coverage']
+    })
 
 def plot_metric(df, col, outpath: Path, title: str):
+    import matplotlib.pyplot as plt  # nur mit --plot-out
     fig, ax = plt.subplots()
     ax.plot(pd.to_datetime(df['ts']), df[col])
     ax.set_title(title)
@@ -45,67 +160,65 @@ def plot_metric(df, col, outpath: Path, title: str):
     fig.savefig(outpath, dpi=120)
     plt.close(fig)
 
-if __name__ == "__main__":
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--hindcast", type=str, default="data/processed/hindcast")
+    ap.add_argument("--stations", nargs="*", default=None, help="Filter: Stations-IDs")
+    ap.add_argument("--horizons", nargs="*", type=int, default=None, help="Filter: Horizonte (15-min Schritte)")
     ap.add_argument("--window", type=int, default=96, help="Fenstergröße (Anzahl Punkte)")
     ap.add_argument("--out", type=str, default="data/processed/metrics")
     ap.add_argument("--plot-out", type=str, default=None, help="Optionales Plot-Verzeichnis")
-    args = ap.parse_args()
+    ap.add_argument("--coverage-tol", type=float, default=0.05, help="Toleranz der p10–p90-Coverage um das Soll (0.80)")
+    args = ap.parse_args(argv)
 
     hindir = Path(args.hindcast)
     outdir = Path(args.out); outdir.mkdir(parents=True, exist_ok=True)
     plotdir = Path(args.plot_out) if args.plot_out else None
     if plotdir: plotdir.mkdir(parents=True, exist_ok=True)
 
-    files = list(hindir.glob("hindcast_*.parquet"))
-    if not files:
-        raise SystemExit(f"Keine Hindcast-Dateien in {hindir} gefunden.")
-
-    for f in files:
-        df = pd.read_parquet(f).sort_values('ts').reset_index(drop=True)
-        sid = df['station_id'].iloc[0]
-        H = int(df['horizon_steps'].iloc[0]) if 'horizon_steps' in df.columns else int(df['horizon_minutes'].iloc[0])//15
-
-        y = df['y_true'].to_numpy()
-        yhat = df['p50'].to_numpy()
-        p10 = df['p10'].to_numpy()
-        p90 = df['p90'].to_numpy()
-
-        # Rolling arrays
-        n = len(y)
-        w = args.window
-        roll_mae = [np.nan]*n
-        roll_nse = [np.nan]*n
-        roll_kge = [np.nan]*n
-        roll_cov = [np.nan]*n
-
-        for i in range(w, n+1):
-            sl = slice(i-w, i)
-            roll_mae[i-1] = mae(y[sl], yhat[sl])
-            roll_nse[i-1] = nse(y[sl], yhat[sl])
-            roll_kge[i-1] = kge(y[sl], yhat[sl])
-            roll_cov[i-1] = coverage(y[sl], p10[sl], p90[sl])
-
-        out = pd.DataFrame({
-            "ts": df["ts"],
-            "station_id": sid,
-            "horizon_steps": H,
-            "window": w,
-            "mae": roll_mae,
-            "nse": roll_nse,
-            "kge": roll_kge,
-            "coverage": roll_cov
-        })
-
-        out_parquet = outdir / f"metrics_{sid}_{H}_w{w}.parquet"
-        out_csv = outdir / f"metrics_{sid}_{H}_w{w}.csv"
-        out.to_parquet(out_parquet)
-        out.to_csv(out_csv, index=False)
-        print(f"[OK] Saved metrics -> {out_parquet.name}, {out_csv.name}")
-
-        if plotdir:
-            plot_metric(out, "mae", plotdir / f"mae_{sid}_{H}_w{w}.png", f"MAE – {sid} – H={H}")
-            plot_metric(out, "nse", plotdir / f"nse_{sid}_{H}_w{w}.png", f"NSE – {sid} – H={H}")
-            plot_metric(out, "kge", plotdir / f"kge_{sid}_{H}_w{w}.png", f"KGE – {sid} – H={H}")
-            plot_metric(out, "coverage", plotdir / f"coverage_{sid}_{H}_w{w}.png", f"Coverage(p10–p90) – {sid} – H={H}")
+    series = hindcast_store.series_index(hindir, args.stations, args.horizons)
+    if not series:
+        raise SystemExit(f"Keine Hindcasts in {hindir} gefunden.")
+
+    with perf.stage('rolling_metrics') as st:
+        frames = []
+        for s in series:
+            with st.step('read'):
+                hc = hindcast_store.read_series(s).to_pandas()
+            frames.append(hc)
+            with st.step('metrics', rows=len(hc)):
+                out = rolling_metrics_frame(hc, window=args.window)
+            st.add_rows(len(hc))
+            sid = out['station_id'].iloc[0]
+            H = int(out['horizon_steps'].iloc[0])
+            w = args.window
+
+            out_parquet = outdir / f"metrics_{sid}_{H}_w{w}.parquet"
+            out_csv = outdir / f"metrics_{sid}_{H}_w{w}.csv"
+            with st.step('write'):
+                out.to_parquet(out_parquet)
+                out.to_csv(out_csv, index=False)
+            print(f"[OK] Saved metrics -> {out_parquet.name}, {out_csv.name}")
+
+            if plotdir:
+                with st.step('plot'):
+                    plot_metric(out, "mae", plotdir / f"mae_{sid}_{H}_w{w}.png", f"MAE – {sid} – H={H}")
+                    plot_metric(out, "nse", plotdir / f"nse_{sid}_{H}_w{w}.png", f"NSE – {sid} – H={H}")
+                    plot_metric(out, "kge", plotdir / f"kge_{sid}_{H}_w{w}.png", f"KGE – {sid} – H={H}")
+                    plot_metric(out, "coverage", plotdir / f"coverage_{sid}_{H}_w{w}.png", f"Coverage(p10–p90) – {sid} – H={H}")
+        with st.step('summary'):
+            skill = score_frame(pd.concat(frames, ignore_index=True))
+            skill.to_csv(outdir / 'skill_summary.csv', index=False)
+        print(f"[OK] Gesamtwerte je Station/Horizont -> {outdir / 'skill_summary.csv'}")
+        if 'coverage' in skill:
+            # Kalibrierung p10–p90 (z. B. nach quantile_mode: residual) je Horizont gegen das Soll
+            for H, g in skill.groupby('horizon_steps'):
+                off = (g['coverage'] - NOMINAL_COVERAGE).abs() > args.coverage_tol
+                print(f"  H={H}: Coverage Median {g['coverage'].median():.3f} (Soll {NOMINAL_COVERAGE:.2f}), "
+                      f"{int(off.sum())}/{len(g)} Reihen außerhalb ±{args.coverage_tol:.2f}, "
+                      f"Kreuzungen {g['crossing'].mean():.2%}")
+            st.extra['coverage_median'] = float(skill['coverage'].median())
+        st.extra['series'] = len(series)
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,24 @@
+import argparse
 import pandas as pd
 from pathlib import Path
-import yaml
 
-CFG = yaml.safe_load(open('config/config.yaml'))
+from src.config import load_config
+from src.features.engine import build_features, feature_spec, history_length
+from src.utils import perf, store
 
-INP = Path('data/processed/clean.parquet')
-OUT = Path('data/processed/feat.parquet')
+CFG = load_config()
+
+INP = Path('data/processed/clean')
+OUT = Path('data/processed/feat')
+# Zustand für den inkrementellen Modus: je Station die letzten HISTORY bereinigten Zeilen
+STATE = Path('data/processed/feat_state.parquet')
 
 TARGET = CFG.get('target_col', 'q_cms')
+SPEC = feature_spec(CFG)
+HISTORY = history_length(SPEC)
 
 def make_features(g, lags=(1,2,4,8,12,24,48), rolls=(4,8,24)):
+    # Referenz-Implementierung je Station (groupby().apply); die Pipeline nutzt engine.build_features
     g = g.sort_values('ts').copy()
     # Basic lags/rolls for target and common exogenous
     for L in lags:
@@ -26,9 +35,101 @@ def make_features(g, lags=(1,2,4,8,12,24,48), rolls=(4,8,24)):
     g['hod'] = g['ts'].dt.hour
     return g
 
+def history_state(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ringpuffer je Station: die letzten HISTORY Zeilen mit allen bereinigten Spalten (nicht nur denen
+    der Lags/Rollen), damit ``stale_stations`` jede spätere QC-Änderung im Fenster erkennt.
+    """
+    cols = ['ts','station_id'] + [c for c in df.columns if c not in ('ts','station_id')]
+    return df.sort_values(['station_id','ts']).groupby('station_id', group_keys=False).tail(HISTORY)[cols].reset_index(drop=True)
+
+def new_rows_since(df: pd.DataFrame, state: pd.DataFrame) -> pd.DataFrame:
+    """Zeilen, die nach dem letzten Zeitstempel der Station im Zustand liegen (neue Stationen komplett)."""
+    last = state.groupby('station_id')['ts'].max()
+    cutoff = df['station_id'].map(last)
+    return df[cutoff.isna() | (df['ts'] > cutoff)]
+
+def read_window(state: pd.DataFrame) -> pd.DataFrame:
+    """Liest aus dem Clean-Store nur den Zeitbereich ab dem ältesten Zustands-Zeitstempel, neue Stationen komplett."""
+    known = set(state['station_id'])
+    parts = [store.read_dataset(INP, stations=sorted(known), start=state['ts'].min())]
+    fresh = [s for s in store.list_stations(INP) if s not in known]
+    if fresh:
+        parts.append(store.read_dataset(INP, stations=fresh))
+    return pd.concat(parts, ignore_index=True)
+
+def stale_stations(df: pd.DataFrame, state: pd.DataFrame) -> list:
+    """
+    Stationen, deren bereinigte Zeilen im Zeitfenster des Zustands nicht mehr dem Zustand entsprechen:
+    QC wertet den Rand bei jedem Lauf neu aus (Randlücken werden erst mit dem Folgewert interpoliert,
+    Spitzen erst mit ihm erkannt), dabei können Zeilen auch wegfallen.
+    """
+    span = state.groupby('station_id')['ts'].agg(['min', 'max'])
+    sid = df['station_id']
+    win = df[(df['ts'] >= sid.map(span['min'])) & (df['ts'] <= sid.map(span['max']))][list(state.columns)]
+    both = state.merge(win, on=['station_id', 'ts'], how='outer', suffixes=('', '_now'), indicator=True)
+    diff = (both['_merge'] != 'both').to_numpy()
+    for c in state.columns.drop(['station_id', 'ts']):
+        a, b = both[c], both[f'{c}_now']
+        diff |= ~((a == b) | (a.isna() & b.isna())).to_numpy()
+    return sorted(both.loc[diff, 'station_id'].unique())
+
+def update_features(new: pd.DataFrame, state: pd.DataFrame):
+    """
+    Features nur für neue Zeitschritte: je Station wird der Ringpuffer (max(lag, roll) Zeilen)
+    vor die neuen Zeilen gesetzt, sodass alle Lags/Rollen exakt wie im Vollaufbau sind.
+    Liefert (Features der neuen Zeilen, neuer Zustand).
+    """
+    cols = list(new.columns)
+    buf = pd.concat([state.assign(_new=False), new.assign(_new=True)], ignore_index=True)[cols + ['_new']]
+    feat = build_features(buf, SPEC)
+    feat = feat[feat['_new'].astype(bool)].drop(columns='_new')
+    return feat, history_state(buf[cols])
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--incremental", action="store_true",
+                    help="Nur neue Zeitschritte je Station berechnen und an den Feature-Store anhängen")
+    args = ap.parse_args(argv)
+
+    with perf.stage('features') as st:
+        if args.incremental and STATE.exists() and store.is_partitioned(OUT):
+            state = pd.read_parquet(STATE)
+            with st.step('read'):
+                window = read_window(state)
+                new, stale = new_rows_since(window, state), stale_stations(window, state)
+            if new.empty and not stale:  # kein Fehler: Zyklus vor dem nächsten Zeitschritt
+                print("Keine neuen Zeitschritte – Features unverändert.")
+                return 0
+            if stale:
+                # QC hat Zeilen vor dem Stichtag geändert: diese Stationen vollständig neu aufbauen
+                with st.step('rebuild') as s:
+                    df = store.read_dataset(INP, stations=stale)
+                    store.replace_stations(build_features(df, SPEC), OUT, stale)
+                    s['rows'] += len(df)
+                new = new[~new['station_id'].isin(stale)]
+                state = pd.concat([state[~state['station_id'].isin(stale)], history_state(df)], ignore_index=True)
+                st.extra['rebuilt_stations'] = len(stale)
+            with st.step('features', rows=len(new)):
+                feat_new, state = update_features(new, state)
+            # nur die betroffenen Station-Monats-Partitionen werden neu geschrieben
+            with st.step('write', rows=len(feat_new)):
+                store.append_dataset(feat_new, OUT)
+                state.to_parquet(STATE)
+            st.add_rows(len(feat_new))
+            print(f"Features updated: +{len(feat_new)} rows -> {OUT}"
+                  + (f" ({len(stale)} Stationen nach QC-Änderung neu aufgebaut)" if stale else ""))
+        else:
+            with st.step('read'):
+                df = store.read_dataset(INP)
+            with st.step('features', rows=len(df)):
+                feat = build_features(df, SPEC)
+            # shift target by each horizon later during training/serving
+            with st.step('write', rows=len(feat)):
+                store.write_dataset(feat, OUT)
+                history_state(df).to_parquet(STATE)
+            st.add_rows(len(feat))
+            print(f"Features built -> {OUT}")
+
 if __name__ == "__main__":
-    df = pd.read_parquet(INP)
-    feat = df.groupby('station_id', group_keys=False).apply(make_features)
-    # shift target by each horizon later during training/serving
-    feat.to_parquet(OUT)
-    print(f"Features built -> {OUT}")
+    main()
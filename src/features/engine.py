@@ -0,0 +1,125 @@
+# src/features/engine.py
+"""
+Vektorisierte Feature-Berechnung ohne groupby().apply.
+
+Alle Stationen werden einmal nach (station_id, ts) sortiert; Lags und Rollfenster werden als
+verschobene Spalten eines zusammenhängenden NumPy-Blocks berechnet und an den Stationsgrenzen
+maskiert. Welche Spalten, Lags, Fenster und Aggregationen entstehen, steht deklarativ unter
+``features:`` in config/config.yaml (Default = bisheriges ``make_features``).
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SPEC = {
+    "lags": [1, 2, 4, 8, 12, 24, 48],
+    "rolls": [4, 8, 24],
+    "columns": [
+        {"col": "{target}", "prefix": "{target}", "agg": "mean"},
+        {"col": "rain_mm", "prefix": "rain", "agg": "sum"},
+        {"col": "icon_rr_mm", "prefix": "icon_rr", "agg": "sum"},
+        {"col": "sm_pct", "prefix": "sm", "agg": "mean"},
+    ],
+    "calendar": ["doy", "hod"],
+}
+
+CALENDAR = {
+    "doy": lambda ts: ts.dt.dayofyear,
+    "hod": lambda ts: ts.dt.hour,
+}
+
+def feature_spec(cfg: dict) -> dict:
+    """Feature-Spezifikation aus der Config; ``{target}`` wird durch target_col ersetzt."""
+    target = cfg.get('target_col', 'q_cms')
+    spec = {**DEFAULT_SPEC, **(cfg.get('features') or {})}
+    cols = []
+    for c in spec['columns']:
+        c = dict(c)
+        c['col'] = c['col'].format(target=target)
+        c['prefix'] = c.get('prefix', c['col']).format(target=target)
+        c.setdefault('agg', 'mean')
+        if c['agg'] not in ('mean', 'sum'):
+            raise ValueError(f"Unbekannte Aggregation {c['agg']!r} für {c['col']}")
+        cols.append(c)
+    return {"lags": [int(L) for L in spec['lags']], "rolls": [int(R) for R in spec['rolls']],
+            "columns": cols, "calendar": list(spec.get('calendar') or [])}
+
+def _col_lags(spec, c):
+    return [int(L) for L in c.get('lags', spec['lags'])]
+
+def _col_rolls(spec, c):
+    return [int(R) for R in c.get('rolls', spec['rolls'])]
+
+def history_length(spec: dict) -> int:
+    """Anzahl Vorgängerzeilen je Station, die für exakte Lags/Rollen nötig sind."""
+    n = [1]
+    for c in spec['columns']:
+        n += _col_lags(spec, c) + _col_rolls(spec, c)
+    return max(n)
+
+def feature_plan(spec: dict, columns) -> list:
+    """
+    (Name, Quellspalte, Art, Parameter, Aggregation) in der Spaltenreihenfolge von ``make_features``:
+    erst alle Lags (je Lag alle Quellspalten), dann alle Rollfenster, nur für vorhandene Quellspalten.
+    """
+    present = [c for c in spec['columns'] if c['col'] in columns]
+    lags = list(dict.fromkeys(L for c in present for L in _col_lags(spec, c)))
+    rolls = list(dict.fromkeys(R for c in present for R in _col_rolls(spec, c)))
+    plan = []
+    for L in lags:
+        plan += [(f"{c['prefix']}_lag{L}", c['col'], 'lag', L, None) for c in present if L in _col_lags(spec, c)]
+    for R in rolls:
+        plan += [(f"{c['prefix']}_roll{R}", c['col'], 'roll', R, c['agg']) for c in present if R in _col_rolls(spec, c)]
+    return plan
+
+def _lag(v: np.ndarray, pos: np.ndarray, L: int) -> np.ndarray:
+    out = np.empty_like(v)
+    out[:L] = np.nan
+    out[L:] = v[:len(v)-L]
+    out[pos < L] = np.nan
+    return out
+
+def _roll(v: np.ndarray, pos: np.ndarray, R: int, agg: str) -> np.ndarray:
+    # rolling(R, min_periods=1) je Station: NaN werden übersprungen, leeres Fenster -> NaN
+    ok = ~np.isnan(v)
+    v0 = np.where(ok, v, 0.0)
+    s = v0.copy()
+    cnt = ok.astype(np.float64)
+    for k in range(1, R):
+        m = pos[k:] >= k
+        s[k:] += np.where(m, v0[:len(v)-k], 0.0)
+        cnt[k:] += m & ok[:len(v)-k]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = s / cnt if agg == 'mean' else s
+    out[cnt == 0] = np.nan
+    return out
+
+def build_features(df: pd.DataFrame, spec: dict) -> pd.DataFrame:
+    """
+    Alle Lag-/Roll-/Kalender-Features für alle Stationen in einem Durchlauf.
+    Werte wie ``groupby('station_id').apply(make_features)``, Zeilen ohne station_id entfallen. Anders als
+    dort (nach Station und ts sortiert) bleiben Zeilenreihenfolge und Index der Eingabe erhalten;
+    Originalspalten zuerst, Feature-Spalten in derselben Reihenfolge.
+    """
+    base = df[df['station_id'].notna()]
+    codes = pd.factorize(base['station_id'], sort=True)[0]
+    order = np.lexsort((base['ts'].values.view('i8'), codes))
+    n = len(base)
+
+    codes = codes[order]
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = codes[1:] != codes[:-1]
+    starts = np.flatnonzero(new_group)
+    pos = np.arange(n) - np.repeat(starts, np.diff(np.append(starts, n)))
+
+    plan = feature_plan(spec, base.columns)
+    # Berechnung im sortierten Raum, Rückschreiben in Eingabereihenfolge
+    block = np.empty((n, len(plan)), dtype=np.float64, order='F')
+    src = {c: base[c].to_numpy(dtype=np.float64)[order] for c in dict.fromkeys(p[1] for p in plan)}
+    for j, (name, col, kind, param, agg) in enumerate(plan):
+        block[order, j] = _lag(src[col], pos, param) if kind == 'lag' else _roll(src[col], pos, param, agg)
+
+    feats = pd.DataFrame(block, index=base.index, columns=[p[0] for p in plan], copy=False)
+    cal = pd.DataFrame({c: CALENDAR[c](base['ts']) for c in spec['calendar']}, index=base.index)
+    keep = [c for c in base.columns if c not in set(feats.columns) | set(cal.columns)]
+    return pd.concat([base[keep], feats, cal], axis=1)
@@ -0,0 +1,124 @@
+# src/models/artifacts.py
+"""
+Laden von Modell-Artefakten (meta.json + model_p10/p50/p90.lgb) und gebündelte Quantil-Vorhersage.
+
+Ein Artefakt-Ordner ist ``artifacts/{H}/`` (global) bzw. ``artifacts/{station}/{H}/`` (per_station).
+Mit ``"quantile_mode": "residual"`` in meta.json gibt es nur model_p50.lgb; p10/p90 sind p50 plus
+die Residuen-Offsets ``residual_offsets`` des p50-Modells (src/models/train_baseline.py).
+
+Mit ``horizon_layout: stacked`` (config.yaml) deckt ein Ordner ``artifacts/stacked/`` bzw.
+``artifacts/{station}/stacked/`` alle Horizonte ab: der Horizont ist das letzte Feature
+(``horizon_steps``), meta.json listet die trainierten ``horizons``. ``predict_horizons`` rechnet
+alle Horizonte einer Feature-Matrix in einem Modellaufruf je Quantil.
+
+Backend (config.yaml ``inference.backend``):
+  auto      compiled.npz, falls vorhanden und aktuell (das Training schreibt es mit), sonst lightgbm;
+            spart beim Kaltstart den Import von LightGBM (Default)
+  lightgbm  Booster.predict je Quantil
+  compiled  alle drei Quantile in einer NumPy-Traversierung aus compiled.npz (src/models/compiled.py);
+            wird beim ersten Laden erzeugt und bei geänderten Modellen neu kompiliert
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+QUANTILES = ('p10', 'p50', 'p90')
+BACKENDS = ('auto', 'lightgbm', 'compiled')
+
+QUANTILE_MODES = ('independent', 'residual')
+HORIZON_LAYOUTS = ('per_horizon', 'stacked')
+HORIZON_FEATURE = 'horizon_steps'
+STACKED_DIR = 'stacked'
+
+def model_quantiles(quantile_mode: str = 'independent') -> tuple:
+    """Quantile mit eigenem Modell: residual = nur p50."""
+    if quantile_mode not in QUANTILE_MODES:
+        raise ValueError(f"Unbekannter quantile_mode {quantile_mode!r} (erlaubt: {', '.join(QUANTILE_MODES)})")
+    return ('p50',) if quantile_mode == 'residual' else QUANTILES
+
+def artifact_dir(root: Path, H: int = None, sid: str = None, layout: str = 'per_horizon') -> Path:
+    """Artefakt-Ordner: ``{root}[/{sid}]/{H}`` bzw. ``{root}[/{sid}]/stacked`` für alle Horizonte."""
+    if layout not in HORIZON_LAYOUTS:
+        raise ValueError(f"Unbekanntes horizon_layout {layout!r} (erlaubt: {', '.join(HORIZON_LAYOUTS)})")
+    base = Path(root) if sid is None else Path(root)/sid
+    return base/(STACKED_DIR if layout == 'stacked' else str(H))
+
+def load_meta(mdir: Path) -> dict:
+    return json.loads((Path(mdir)/'meta.json').read_text(encoding='utf-8'))
+
+def default_backend() -> str:
+    from src.config import load_config
+    return (load_config().get('inference') or {}).get('backend', 'auto')
+
+def load_artifact(mdir: Path, backend: str = None) -> dict:
+    """Liest meta.json und alle Quantil-Modelle eines Artefakt-Ordners."""
+    mdir = Path(mdir)
+    backend = backend or default_backend()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unbekanntes inference.backend {backend!r} (erlaubt: {', '.join(BACKENDS)})")
+    meta = load_meta(mdir)
+    art = {"dir": mdir, "meta": meta, "features": meta['features'], "models": None, "compiled": None}
+    if backend != 'lightgbm':
+        from src.models.compiled import load_compiled
+        # aktuelles compiled.npz: weder LightGBM noch joblib laden
+        art['compiled'] = load_compiled(mdir)
+        if art['compiled'] is not None:
+            return art
+    import joblib
+    art['models'] = {q: joblib.load(mdir/f'model_{q}.lgb')
+                     for q in model_quantiles(meta.get('quantile_mode', 'independent'))}
+    if backend == 'compiled':
+        art['compiled'] = load_compiled(mdir, art['models'])
+    return art
+
+def predict_quantiles(art: dict, X) -> dict:
+    """
+    p10/p50/p90 für alle Zeilen von X (DataFrame mit ``art['features']``) in je einem
+    Modellaufruf pro Quantil. Liefert {'p10': ndarray, 'p50': ndarray, 'p90': ndarray}.
+    """
+    # einmal nach float64 wandeln (wie LightGBMs pandas-Pfad) und direkt den Booster rufen:
+    # spart die pandas-Validierung je Modellaufruf, Ergebnisse sind bitgleich
+    Xv = np.ascontiguousarray(X[art['features']].to_numpy(dtype=np.float64))
+    return predict_array(art, Xv)
+
+def predict_array(art: dict, Xv: np.ndarray, threads: int = None) -> dict:
+    """Wie ``predict_quantiles`` für eine float64-Matrix, deren Spalten ``art['features']`` entsprechen."""
+    if art.get('compiled') is not None:
+        out = art['compiled'].predict(Xv)
+    else:
+        kw = {"num_threads": threads} if threads else {}
+        out = {q: np.asarray(_booster(m).predict(Xv, **kw), dtype=float) for q, m in art['models'].items()}
+    off = art['meta'].get('residual_offsets')
+    if off:
+        lo, hi = off['p10'], off['p90']
+        if isinstance(lo, list):
+            # stacked: Offsets je trainiertem Horizont, über die Horizont-Spalte nachgeschlagen (dazwischen linear)
+            hs = art['meta']['horizons']
+            lo, hi = np.interp(Xv[:, -1], hs, lo), np.interp(Xv[:, -1], hs, hi)
+        # Offsets sind auf p10 ≤ 0 ≤ p90 begrenzt: monotone Quantile ohne Kreuzungen
+        out = {'p10': out['p50'] + lo, 'p50': out['p50'], 'p90': out['p50'] + hi}
+    return out
+
+def _booster(model):
+    return getattr(model, 'booster_', model)
+
+def stacked_rows(Xv: np.ndarray, horizons) -> np.ndarray:
+    """Je Zeile von Xv ein Block mit einer Zeile je Horizont und angehängter Horizont-Spalte (Zeile, Horizont)."""
+    hs = np.asarray(horizons, dtype=Xv.dtype)
+    out = np.empty((len(Xv), len(hs), Xv.shape[1] + 1), dtype=Xv.dtype)
+    out[:, :, :-1] = Xv[:, None, :]
+    out[:, :, -1] = hs
+    return out.reshape(len(Xv) * len(hs), -1)
+
+def predict_horizons(art: dict, Xv: np.ndarray, horizons, threads: int = None) -> dict:
+    """
+    p10/p50/p90 als (Zeilen × Horizonte)-Arrays aus einem Artefakt mit ``horizon_layout`` 'stacked':
+    ``Xv`` enthält die Basis-Features (``art['features']`` ohne ``horizon_steps``), alle Horizonte
+    laufen gebündelt durch einen Modellaufruf je Quantil.
+    """
+    if art['meta'].get('horizon_layout') != 'stacked':
+        raise ValueError(f"{art['dir']}: kein Artefakt mit horizon_layout 'stacked'")
+    out = predict_array(art, stacked_rows(np.asarray(Xv, dtype=np.float64), horizons), threads)
+    return {q: v.reshape(len(Xv), len(horizons)) for q, v in out.items()}
@@ -0,0 +1,240 @@
+# src/models/compiled.py
+"""
+Kompilierte Quantilmodelle: die p10/p50/p90-Booster eines Artefakt-Ordners als flache NumPy-Arrays
+(im quantile_mode 'residual' nur p50; die Offsets ergänzt artifacts.predict_array).
+
+Alle Bäume der drei Modelle liegen in gemeinsamen Knoten-Arrays (Feature, Schwelle, erstes Kind,
+NaN-/Null-Richtung) in Breitenordnung und werden für alle Zeilen in einer gebündelten Traversierung
+ausgewertet – Ebene für Ebene über alle (Zeile, Baum)-Paare, fertige Paare fallen laufend heraus.
+Die Blattwerte werden je Quantil in Baumreihenfolge aufsummiert wie in LightGBM: bitgleich.
+Zum Laden wird weder LightGBM noch joblib gebraucht (compiled.npz neben den Modellen).
+
+Unterstützt: numerische Splits, Missing-Typen None/Zero/NaN, Zielfunktionen ohne
+Ausgabetransformation (quantile, regression, …). Kategorische und lineare Bäume -> Fehler.
+
+Beispiel:
+  python -m src.models.compiled --artifacts artifacts --check   # alle Ordner kompilieren und prüfen
+"""
+
+import argparse, json
+from pathlib import Path
+
+import numpy as np
+
+QUANTILES = ('p10', 'p50', 'p90')
+COMPILED_FILE = 'compiled.npz'
+_ZERO = 1e-35                 # kZeroThreshold in LightGBM
+_CELLS = 1 << 22              # (Zeilen × Bäume) je Block der Traversierung
+_IDENTITY = ('quantile', 'regression', 'regression_l1', 'huber', 'fair', 'mape')
+_ARRAYS = ('feature', 'threshold', 'first', 'value', 'nan_right', 'zero_missing', 'default_right', 'roots')
+
+def _booster(model):
+    return getattr(model, 'booster_', model)
+
+def parse_model(text: str) -> dict:
+    """Kopf und Bäume aus ``Booster.model_to_string()`` (Textformat v3/v4)."""
+    head, _, body = text.partition('\nTree=')
+    info = dict(l.split('=', 1) for l in head.splitlines() if '=' in l)
+    trees = []
+    for block in ('Tree=' + body).split('\nTree='):
+        block = block.split('end of trees', 1)[0]
+        kv = dict(l.split('=', 1) for l in block.splitlines() if '=' in l)
+        if 'num_leaves' in kv:
+            trees.append(kv)
+    return {"info": info, "trees": trees}
+
+def _layout(t: dict, cols: dict):
+    """
+    Hängt einen Baum in Breitenordnung an ``cols`` an: die beiden Kinder eines Knotens liegen
+    nebeneinander (rechts = links + 1), Blätter zeigen auf sich selbst (Schwelle +inf).
+    """
+    leaves = [float(v) for v in t['leaf_value'].split()]
+    if int(t['num_leaves']) == 1:
+        split = None
+    else:
+        split = [t[k].split() for k in ('split_feature', 'threshold', 'decision_type', 'left_child', 'right_child')]
+    base = len(cols['feature'])
+    queue, k = [0 if split else ~0], 0
+    while k < len(queue):
+        n, me = queue[k], base + k
+        k += 1
+        if n >= 0:
+            f, thr, dt = int(split[0][n]), float(split[1][n]), int(split[2][n])
+            if dt & 1:
+                raise NotImplementedError("kategorische Splits werden nicht unterstützt")
+            missing, default_left = (dt >> 2) & 3, bool(dt & 2)
+            first = base + len(queue)
+            queue += [int(split[3][n]), int(split[4][n])]
+            # NaN: bei Missing-Typ None wie 0.0 vergleichen, sonst Default-Richtung
+            row = (f, thr, first, 0.0, (thr < 0) if missing == 0 else not default_left,
+                   missing == 1, not default_left)
+        else:
+            row = (0, np.inf, me, leaves[~n], False, False, False)
+        for c, v in zip(_ARRAYS, row):
+            cols[c].append(v)
+    cols['roots'].append(base)
+
+class TreeEnsemble:
+    """Flache Baum-Arrays der drei Quantilmodelle; ``predict(X)`` -> {'p10', 'p50', 'p90'}."""
+
+    def __init__(self, arrays: dict, features: list, ranges: dict, source=None):
+        for k in _ARRAYS:
+            setattr(self, k, arrays[k])
+        self.feature, self.first, self.roots = (np.asarray(a, dtype=np.intp) for a in (self.feature, self.first, self.roots))
+        self.has_zero_missing = bool(self.zero_missing.any())
+        self.features = list(features)
+        self.ranges = {q: tuple(r) for q, r in ranges.items()}
+        self.source = source
+
+    @classmethod
+    def from_models(cls, models: dict, source=None) -> 'TreeEnsemble':
+        cols = {k: [] for k in _ARRAYS}
+        ranges, features = {}, None
+        for q in [q for q in QUANTILES if q in models]:
+            m = parse_model(_booster(models[q]).model_to_string())
+            info = m['info']
+            obj = info.get('objective', '').split()[0]
+            if obj not in _IDENTITY or 'average_output' in info or int(info.get('num_class', 1)) != 1:
+                raise NotImplementedError(f"{q}: Zielfunktion {info.get('objective')!r} wird nicht unterstützt")
+            names = info['feature_names'].split()
+            if features is not None and names != features:
+                raise ValueError(f"{q}: abweichende Feature-Reihenfolge")
+            features = names
+            start = len(cols['roots'])
+            for t in m['trees']:
+                if int(t.get('num_cat', 0)) or int(t.get('is_linear', 0)):
+                    raise NotImplementedError("kategorische bzw. lineare Bäume werden nicht unterstützt")
+                _layout(t, cols)
+            ranges[q] = (start, len(cols['roots']))
+        dtypes = {'feature': np.int32, 'threshold': np.float64, 'first': np.int32, 'value': np.float64,
+                  'nan_right': bool, 'zero_missing': bool, 'default_right': bool, 'roots': np.int32}
+        return cls({k: np.array(cols[k], dtype=dtypes[k]) for k in _ARRAYS}, features, ranges, source)
+
+    def save(self, path: Path):
+        head = json.dumps({"features": self.features, "ranges": self.ranges, "source": self.source})
+        tmp = Path(path).with_suffix('.tmp.npz')
+        np.savez(tmp, head=np.array(head), **{k: getattr(self, k) for k in _ARRAYS})
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'TreeEnsemble':
+        with np.load(path) as z:
+            head = json.loads(str(z['head']))
+            return cls({k: z[k] for k in _ARRAYS}, head['features'], head['ranges'], head['source'])
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Blatt-Slot je (Zeile, Baum) für einen Block von Zeilen (zeilenweise, Bäume innen)."""
+        n, F = X.shape
+        T = len(self.roots)
+        Xf = X.ravel()
+        has_nan = bool(np.isnan(Xf).any())
+        feature, threshold, first = self.feature, self.threshold, self.first
+        cur = np.tile(self.roots, n)
+        base = np.repeat(np.arange(n) * F, T)
+        out, pos = None, None
+        while True:
+            # einige Ebenen ohne Verdichten (Blätter laufen auf sich selbst weiter), dann fertige Paare entfernen
+            for _ in range(3):
+                x = Xf[base + feature[cur]]
+                right = x > threshold[cur]
+                if has_nan:
+                    m = np.isnan(x)
+                    if m.any():
+                        right[m] = self.nan_right[cur[m]]
+                if self.has_zero_missing:
+                    m = (np.abs(x) <= _ZERO) & self.zero_missing[cur]
+                    right[m] = self.default_right[cur[m]]
+                cur = first[cur] + right
+            done = first[cur] == cur
+            if out is None:
+                out = cur.copy()
+                pos = np.arange(len(cur))
+            else:
+                out[pos] = cur
+            if done.all():
+                return out.reshape(n, T)
+            keep = ~done
+            pos, cur, base = pos[keep], cur[keep], base[keep]
+
+    def predict(self, X: np.ndarray) -> dict:
+        """p10/p50/p90 für eine float64-Matrix mit Spalten in ``self.features``."""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        out = {q: np.empty(len(X)) for q in self.ranges}
+        step = max(1, _CELLS // max(len(self.roots), 1))
+        for i in range(0, len(X), step):
+            vals = self.value[self._leaves(X[i:i + step])]
+            for q, (a, b) in self.ranges.items():
+                # kumulativ in Baumreihenfolge summieren (wie LightGBM), nicht paarweise
+                out[q][i:i + step] = np.cumsum(vals[:, a:b], axis=1)[:, -1] if b > a else 0.0
+        return out
+
+def source_signature(mdir: Path) -> list:
+    """(Datei, Größe, mtime_ns) der Quantilmodelle – compiled.npz ist veraltet, sobald sie sich ändern."""
+    files = [mdir/f'model_{q}.lgb' for q in QUANTILES]
+    return [[f.name, f.stat().st_size, f.stat().st_mtime_ns] for f in files if f.exists()]
+
+def load_compiled(mdir: Path, models: dict = None):
+    """compiled.npz des Ordners, falls aktuell; sonst (mit ``models``) neu kompilieren und speichern."""
+    mdir = Path(mdir)
+    sig = source_signature(mdir)
+    path = mdir / COMPILED_FILE
+    if path.exists():
+        ens = TreeEnsemble.load(path)
+        if ens.source == sig:
+            return ens
+    if models is None:
+        return None
+    ens = TreeEnsemble.from_models(models, source=sig)
+    try:
+        ens.save(path)
+    except OSError as e:
+        print(f"[WARN] {path} nicht geschrieben: {e}")
+    return ens
+
+def parity(art: dict, X: np.ndarray) -> float:
+    """Max. absolute Abweichung kompiliert vs. LightGBM über alle Quantilmodelle (0.0 = bitgleich)."""
+    ens = art.get('compiled') or TreeEnsemble.from_models(art['models'])
+    fast = ens.predict(X)
+    return max(float(np.max(np.abs(fast[q] - _booster(m).predict(X)), initial=0.0)) for q, m in art['models'].items())
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Quantilmodelle in compiled.npz übersetzen (NumPy-Inferenz)")
+    ap.add_argument("--artifacts", type=str, default="artifacts")
+    ap.add_argument("--check", action="store_true", help="Parität gegen LightGBM auf den Feature-Daten prüfen")
+    args = ap.parse_args(argv)
+
+    from src.models.artifacts import load_artifact
+    dirs = sorted(p.parent for p in Path(args.artifacts).rglob('meta.json'))
+    if not dirs:
+        raise SystemExit(f"Keine Artefakte unter {args.artifacts}")
+    worst = 0.0
+    feats = {}  # station_id -> Features (None = alle Stationen: global/stacked); nur der letzte Schlüssel bleibt
+    for mdir in dirs:
+        art = load_artifact(mdir, backend='lightgbm')
+        ens = load_compiled(mdir, art['models'])
+        if args.check:
+            from src.utils import store
+            meta = art['meta']
+            sid = meta.get('station_id')
+            if sid not in feats:
+                feats.clear()
+                feats[sid] = store.read_dataset('data/processed/feat', stations=[sid] if sid else None)
+            feat = feats[sid]
+            if meta.get('horizon_layout') == 'stacked':
+                # je Zeile ein trainierter Horizont reihum statt aller Horizonte (gleiche Zeilenzahl)
+                X = feat[art['features'][:-1]].to_numpy(dtype=np.float64)
+                X = np.column_stack([X, np.resize(np.asarray(meta['horizons'], dtype=np.float64), len(X))])
+            else:
+                X = np.ascontiguousarray(feat[art['features']].to_numpy(dtype=np.float64))
+            d = parity({**art, 'compiled': ens}, X)
+            worst = max(worst, d)
+            print(f"[OK] {mdir} {len(ens.roots)} Bäume, Parität max|Δ| = {d:.3g} ({len(X)} Zeilen)")
+        else:
+            print(f"[OK] {mdir} -> {mdir/COMPILED_FILE} ({len(ens.roots)} Bäume)")
+    if args.check:
+        print(f"{len(dirs)} Artefakte, max|Δ| = {worst:.3g}")
+        if worst != 0.0:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
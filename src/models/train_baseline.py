@@ -1,97 +1,671 @@
 # src/models/train_baseline.py (mode-aware)
+import argparse
+import ctypes
+import hashlib
 import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from urllib.parse import unquote
 
 import joblib
+import lightgbm as lgb
 import numpy as np
 import pandas as pd
-import yaml
+import pyarrow as pa
+import pyarrow.parquet as pq
 from lightgbm import LGBMRegressor
 from sklearn.model_selection import TimeSeriesSplit
-from sklearn.metrics import mean_absolute_error
 
-from src.utils.metrics import nse, kge, rmse as rmse_fn
+from src.config import load_config
+from src.models.artifacts import HORIZON_FEATURE, HORIZON_LAYOUTS, QUANTILE_MODES, artifact_dir, model_quantiles
+from src.models.compiled import load_compiled
+from src.utils.metrics import grouped_scores, scores as skill_scores
+from src.utils import store
+from src.utils import perf
+from src.utils.perf import current_rss_mb, peak_rss_mb
 
-CFG = yaml.safe_load(open('config/config.yaml', 'r', encoding='utf-8'))
-INP = Path('data/processed/feat.parquet')
+CFG = load_config()
+INP = Path('data/processed/feat')
 ART = Path('artifacts'); ART.mkdir(parents=True, exist_ok=True)
 
 TARGET = CFG.get('target_col', 'q_cms')
 H_LIST = CFG.get('horizon_steps_list', [24, 48, 96])
 MODE = CFG.get('training_mode', 'global')
+# independent: je Quantil ein Modell; residual: nur p50, p10/p90 als Offsets aus seinen Residuen
+QUANTILE_MODE = CFG.get('quantile_mode', 'independent')
+# per_horizon: Modellset je Horizont; stacked: Horizont als Feature, ein Modellset für alle Horizonte
+HORIZON_LAYOUT = CFG.get('horizon_layout', 'per_horizon')
 
-def qmodel(alpha: float) -> LGBMRegressor:
+# Zustand je Worker-Prozess: Feature-Frame (einmal geladen bzw. per fork geerbt) und Threads je Fit
+_DF = None
+_SPANS = None
+_THREADS = None
+_OPTS = {}
+N_TREES = 700
+# Binning-Stichprobe im globalen Modus: genügt für max_bin=255; LightGBMs Default (200 000 Zeilen)
+# belegt beim Binning ~12 Byte je Stichprobenwert, mehr als das gebinnte Dataset selbst
+GLOBAL_BIN_SAMPLE = 50000
+
+def qmodel(alpha: float, n_jobs=None) -> LGBMRegressor:
     return LGBMRegressor(
         objective='quantile', alpha=alpha,
-        n_estimators=700, learning_rate=0.03,
+        n_estimators=N_TREES, learning_rate=0.03,
         num_leaves=96, subsample=0.8, colsample_bytree=0.8,
-        random_state=42
+        random_state=42, n_jobs=n_jobs
     )
 
+QUANTILE_ALPHAS = (('p10',0.10),('p50',0.50),('p90',0.90))
+
+def residual_offsets(y, pred) -> dict:
+    """
+    p10/p90 als feste Offsets auf p50: Quantile der Residuen y - p50 des finalen p50-Modells auf seinen
+    Trainingszeilen, also auf derselben Grundlage, auf der die Quantilmodelle im Modus independent angepasst
+    werden. Out-of-fold-Residuen der CV sind breiter (Hindcast-Coverage 0.94–0.96 statt 0.80).
+    Begrenzt auf p10 ≤ 0 ≤ p90, damit die Quantile auch bei verzerrtem p50 nicht kreuzen.
+    """
+    r = np.asarray(y, dtype=np.float64) - np.asarray(pred, dtype=np.float64)
+    r = r[~np.isnan(r)]
+    out = {}
+    for q, a in QUANTILE_ALPHAS:
+        if q != 'p50':
+            v = float(np.quantile(r, a)) if len(r) else 0.0
+            out[q] = min(v, 0.0) if a < 0.5 else max(v, 0.0)
+    return out
+
+def save_models(outdir: Path, models: dict):
+    """
+    Schreibt die Quantilmodelle; Modelle anderer Quantile (nach Wechsel des quantile_mode) werden entfernt.
+    Dazu compiled.npz, damit das Serving (inference.backend auto) ohne LightGBM-Import auskommt.
+    """
+    outdir.mkdir(parents=True, exist_ok=True)
+    for q, _ in QUANTILE_ALPHAS:
+        f = outdir/f'model_{q}.lgb'
+        if q in models:
+            joblib.dump(models[q], f)
+        elif f.exists():
+            f.unlink()
+    try:
+        load_compiled(outdir, models)
+    except NotImplementedError as e:  # Serving fällt auf LightGBM zurück
+        print(f"[WARN] {outdir}: nicht kompiliert ({e})")
+
+def booster_params(alpha: float, n_jobs=None):
+    """qmodel-Hyperparameter für lgb.train (sklearn-Namen sind LightGBM-Aliase) und Anzahl Runden."""
+    params = {k: v for k, v in qmodel(alpha, n_jobs).get_params().items()
+              if v is not None and k not in ('class_weight', 'importance_type')}
+    return params, params.pop('n_estimators')
+
 def features_from(df: pd.DataFrame):
+    return features_from_names(df.columns)
+
+def features_from_names(names):
     base_exclude = {'ts','station_id','q_cms','h_cm','y'}
-    return [c for c in df.columns if c not in base_exclude]
+    return [c for c in names if c not in base_exclude and not c.startswith('__index_level_')]
 
-if __name__ == "__main__":
-    df = pd.read_parquet(INP).sort_values(['station_id','ts'])
-    features = features_from(df)
+def load_frame(path: Path = INP) -> pd.DataFrame:
+    return store.read_dataset(path)
+
+def station_spans(df: pd.DataFrame) -> dict:
+    """Zeilenbereich [start, stop) je Station im nach (station_id, ts) sortierten Frame."""
+    sid = df['station_id']
+    starts = np.flatnonzero(np.r_[True, sid.to_numpy()[1:] != sid.to_numpy()[:-1]])
+    stops = np.r_[starts[1:], len(df)]
+    return {sid.iat[a]: (int(a), int(b)) for a, b in zip(starts, stops) if pd.notna(sid.iat[a])}
+
+def _init_worker(path, threads, opts=None):
+    global _DF, _SPANS, _THREADS, _OPTS, N_TREES
+    if _DF is None:  # bei fork bereits aus dem Elternprozess vorhanden
+        _DF = load_frame(path)
+        _SPANS = station_spans(_DF)
+    _THREADS = threads
+    _OPTS = opts or {}
+    N_TREES = _OPTS.get('trees', N_TREES)
+
+def row_hashes(cols, h: np.ndarray = None) -> np.ndarray:
+    """
+    64-bit-Hash je Trainingszeile aus einer Liste gleich langer Spalten (ts, Features, Label), Spalte für
+    Spalte; ``h`` setzt einen laufenden Hash fort. Zeilenweise: ``row_hashes(cols)[idx]`` ist gleich
+    ``row_hashes([c[idx] for c in cols])``, ohne die Spalten per Fancy-Index zu kopieren.
+    """
+    h = np.zeros(len(cols[0]), dtype=np.uint64) if h is None else h
+    for c in cols:
+        h = (h * np.uint64(1000003)) ^ pd.util.hash_array(np.asarray(c))
+    return h
+
+def fingerprint(rows: np.ndarray, features, H: int, sid, quantile_mode: str = 'independent') -> str:
+    """Fingerprint aller Eingaben eines Jobs: Daten, Featureliste, Hyperparameter, Horizont, Station."""
+    params = {q: {k: v for k, v in qmodel(a).get_params().items() if k != 'n_jobs'}
+              for q, a in QUANTILE_ALPHAS}
+    head = {"station_id": sid, "horizon_steps": H, "target_col": TARGET, "features": features,
+            "params": params, "rows": int(len(rows))}
+    if quantile_mode != 'independent':  # bestehende Fingerprints bleiben gültig
+        head["quantile_mode"] = quantile_mode
+    if quantile_mode == 'residual':  # Offsets früher aus CV-Residuen: solche Artefakte neu trainieren
+        head["residual_offsets"] = "p50_fit"
+    h = hashlib.sha256(json.dumps(head, sort_keys=True, default=str).encode('utf-8'))
+    h.update(rows.tobytes())
+    return h.hexdigest()
+
+def data_hash(rows: np.ndarray) -> str:
+    return hashlib.sha256(rows.tobytes()).hexdigest()
+
+def read_meta(outdir: Path):
+    f = outdir/'meta.json'
+    if not f.exists():
+        return None
+    meta = json.loads(f.read_text(encoding='utf-8'))
+    if not all((outdir/f'model_{q}.lgb').exists() for q in model_quantiles(meta.get('quantile_mode', 'independent'))):
+        return None
+    return meta
+
+def appended_only(prev: dict, rows: np.ndarray) -> bool:
+    """True, wenn die bisherigen Trainingszeilen unverändert sind und nur neue angehängt wurden."""
+    n_old = prev.get('rows')
+    if not n_old or n_old >= len(rows) or 'data_hash' not in prev:
+        return False
+    return data_hash(rows[:n_old]) == prev['data_hash']
+
+def fit_job(d: pd.DataFrame, features, n_splits: int, n_jobs=None, quantile_mode: str = 'independent'):
+    """
+    CV-Bewertung (p50) und finale Modelle für einen Datensatz mit Spalte 'y'. Liefert (Scores, Modelle,
+    Residuen-Offsets); im quantile_mode 'residual' nur das p50-Modell plus Offsets aus seinen Residuen.
+    """
+    X = d[features]; y = d['y']
+    tscv = TimeSeriesSplit(n_splits=n_splits)
+    preds, trues = [], []
+    for tr, te in tscv.split(X):
+        m_cv = qmodel(0.5, n_jobs).fit(X.iloc[tr], y.iloc[tr])
+        p_cv = m_cv.predict(X.iloc[te])
+        preds.append(p_cv); trues.append(y.iloc[te].values)
+    true, pred = np.concatenate(trues), np.concatenate(preds)
+    scores = skill_scores(true, pred)
+    wanted = model_quantiles(quantile_mode)
+    models = {q: qmodel(a, n_jobs).fit(X,y) for q, a in QUANTILE_ALPHAS if q in wanted}
+    return scores, models, residual_offsets(y, models['p50'].predict(X)) if quantile_mode == 'residual' else None
+
+def run_job(job):
+    """Ein Trainingsjob (station, H) im per_station-Modus. Liefert (Report-Schlüssel, Eintrag) oder None."""
+    sid, H = job
+    t0 = time.perf_counter()
+    a, b = _SPANS[sid]
+    d = _DF.iloc[a:b].copy()
+    d['y'] = d[TARGET].shift(-H)
+    key, tag, outdir = f"{sid}_{H}", f"[PER_STATION] {sid} H={H}", ART/sid/str(H)
+    d = d.dropna(subset=['y'])
+    if len(d)<120:
+        return None
+    features = features_from(_DF)
+    qmode = _OPTS.get('quantile_mode', QUANTILE_MODE)
+    rows = row_hashes([d['ts'].values] + [d[c].to_numpy() for c in features] + [d['y'].to_numpy()])
+    fp = fingerprint(rows, features, H, sid, qmode)
+    prev = read_meta(outdir)
+    if prev and not _OPTS.get('force') and prev.get('fingerprint') == fp and 'scores' in prev:
+        print(f"{tag} unverändert – übersprungen", flush=True)
+        return key, {**prev['scores'], "fit_seconds": round(time.perf_counter()-t0, 3), "skipped": True}
+
+    warm_trees = _OPTS.get('warm_trees')
+    trees = qmodel(0.5).get_params()['n_estimators']
+    warm = bool(warm_trees) and prev is not None and not _OPTS.get('force') and appended_only(prev, rows) \
+        and prev.get('trees', trees) + warm_trees <= 2*trees and prev.get('quantile_mode', 'independent') == qmode
+    if warm:
+        # nur angehängte Daten: vorhandene Booster um warm_trees Bäume weitertrainieren, CV-Scores übernehmen
+        X = d[features]; y = d['y']
+        scores, offsets = prev['scores'], None
+        models = {}
+        for q, a in QUANTILE_ALPHAS:
+            if q not in model_quantiles(qmode):
+                continue
+            init = joblib.load(outdir/f'model_{q}.lgb')
+            m = qmodel(a, _THREADS).set_params(n_estimators=warm_trees)
+            models[q] = m.fit(X, y, init_model=init.booster_)
+        if qmode == 'residual':
+            offsets = residual_offsets(y, models['p50'].predict(X))
+        n_trees = prev.get('trees', trees) + warm_trees
+    else:
+        n_splits = 3 if len(d)<500 else 5
+        scores, models, offsets = fit_job(d, features, n_splits, _THREADS, qmode)
+        n_trees = trees
+    save_models(outdir, models)
+    meta = {"features": features,"raster": CFG['raster'],"target_col": TARGET,"horizon_steps": H}
+    meta.update({"mode":"per_station","station_id":sid,"quantile_mode":qmode})
+    if offsets is not None:
+        meta["residual_offsets"] = offsets
+    meta.update({"fingerprint": fp, "data_hash": data_hash(rows), "rows": int(len(rows)),
+                 "ts_max": str(d['ts'].max()), "trees": n_trees, "warm_started": warm, "scores": scores})
+    (outdir/'meta.json').write_text(json.dumps(meta,indent=2),encoding='utf-8')
+    print(f"{tag} MAE:{scores['MAE']:.4f} RMSE:{scores['RMSE']:.4f} NSE:{scores['NSE']:.4f} KGE:{scores['KGE']:.4f}"
+          + (" (warm start)" if warm else ""), flush=True)
+    entry = {**scores, "fit_seconds": round(time.perf_counter()-t0, 3)}
+    if warm:
+        entry["warm_started"] = True
+    return key, entry
+
+def load_global_matrix(path: Path = INP) -> dict:
+    """
+    Feature-Matrix einmalig als zusammenhängendes float32-Array (nach station_id, ts sortiert),
+    dazu Ziel, Stationscodes und ts als 1-D-Arrays. Die Partitionsdateien werden einzeln gelesen
+    und direkt in das vorab angelegte Array geschrieben, ohne dass ein pandas-Frame entsteht.
+    """
+    features = features_from_names(store.schema_names(path))
+    cols = ['ts','station_id',TARGET] + features
+    n = store.num_rows(path)
+    X = np.empty((n, len(features)), dtype=np.float32)
+    ts = np.empty(n, dtype=np.int64)
+    target = np.empty(n, dtype=np.float64)
+    ids = np.empty(n, dtype=np.int64)
+    names = {}
+    off = 0
+    for _, t in store.iter_fragments(path, cols):
+        sl = slice(off, off + t.num_rows)
+        sid = t.column('station_id').combine_chunks().dictionary_encode()
+        local = np.array([names.setdefault(v, len(names)) for v in sid.dictionary.to_pylist()] + [-1])
+        ids[sl] = local[sid.indices.fill_null(len(local)-1).to_numpy()]
+        ts[sl] = t.column('ts').to_numpy().view('i8')
+        target[sl] = t.column(TARGET).to_numpy()
+        for j, c in enumerate(features):
+            X[sl, j] = t.column(c).to_numpy()
+        off = sl.stop
+    # Stationscodes in sortierter ID-Reihenfolge (wie groupby/sort_values)
+    rank = np.argsort(np.argsort(np.array(list(names), dtype=object)))
+    codes = np.where(ids >= 0, rank[ids], -1)
+    order = np.lexsort((ts, codes))
+    order = order[codes[order] >= 0]
+    if len(order) != n or (order != np.arange(n)).any():  # Einzeldatei o. Ä.: einmal umsortieren
+        X, ts, target, codes = X[order], ts[order], target[order], codes[order]
+    return {"X": X, "features": features, "codes": codes, "ts": ts, "target": target}
+
+class FileRows(lgb.Sequence):
+    """
+    Feature-Zeilen einer Partitionsdatei als lgb.Sequence (float32): die Datei wird erst gelesen, wenn
+    lgb.Dataset sie gegen die Binning-Grenzen der Referenz einsortiert, und danach wieder freigegeben.
+    """
+    def __init__(self, path: Path, features, n: int):
+        self.path, self.features, self.n, self.batch_size = path, features, n, max(n, 1)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, idx):
+        t = pq.read_table(self.path, columns=self.features)
+        return np.column_stack([t.column(c).to_numpy().astype(np.float32) for c in self.features])[idx]
+
+def _libc():
+    try:
+        return ctypes.CDLL('libc.so.6')
+    except OSError:  # kein glibc (macOS, Windows, musl)
+        return None
+
+def limit_heap(threshold: int = 1 << 20):
+    """
+    glibc: Blöcke ab ``threshold`` Bytes immer per mmap anlegen und freien Heap ab dieser Größe sofort
+    zurückgeben. Sonst hebt glibc die mmap-Schwelle nach dem ersten freigegebenen großen Array an, und
+    die Spalten der folgenden Dateien fragmentieren den Heap (gemessen ~60 MiB Peak-RSS im globalen Modus).
+    """
+    libc = _libc()
+    if libc is not None:
+        libc.mallopt(-3, threshold)  # M_MMAP_THRESHOLD
+        libc.mallopt(-1, threshold)  # M_TRIM_THRESHOLD
+
+def release_memory():
+    """Freie Blöcke des Arrow-Pools und des C-Heaps an das Betriebssystem zurückgeben."""
+    pa.default_memory_pool().release_unused()
+    libc = _libc()
+    if libc is not None:
+        libc.malloc_trim(0)
+
+def global_dataset(params: dict, path: Path = INP) -> dict:
+    """
+    Gebinntes lgb.Dataset über alle Zeilen (nach station_id, ts sortiert), ohne dass die float32-Matrix
+    je vollständig im Speicher liegt. Erster Durchlauf je Partitionsdatei: ts, Ziel, Stationscodes,
+    Zeilen-Hash über ts und Features sowie eine gleichmäßige Stichprobe (bin_construct_sample_cnt Zeilen)
+    für die Binning-Grenzen; zweiter Durchlauf: lgb.Dataset liest die Dateien einzeln (``FileRows``).
+    Einzeldatei (altes Layout): über ``load_global_matrix``, die Matrix wird nach dem Binning freigegeben.
+    Liefert die Arrays wie ``load_global_matrix`` ohne 'X', dazu 'base' (Dataset) und 'hash' je Zeile.
+    """
+    limit_heap()
+    features = features_from_names(store.schema_names(path))
+    if not store.is_partitioned(path):
+        m = load_global_matrix(path)
+        X = m.pop('X')
+        m['hash'] = row_hashes([m['ts']] + [X[:, j] for j in range(X.shape[1])])
+        m['base'] = lgb.Dataset(X, label=np.zeros(len(X)), feature_name=features, params=params).construct()
+        del X
+        release_memory()
+        return m
+    # Pfadreihenfolge nach Station (dekodiert, wie sort_values) und Monat = Zeilenreihenfolge der Matrix
+    sid = lambda f: unquote(f.parent.parent.name.split('=', 1)[1])
+    files = sorted(store.files(path), key=lambda f: (sid(f), f.parent.name))
+    n = store.num_rows(path)
+    take = np.unique(np.linspace(0, n - 1, min(n, params.get('bin_construct_sample_cnt', 200000))).astype(np.int64))
+    parts = {k: [] for k in ('ts', 'target', 'codes', 'hash', 'sample')}
+    rows, names, off = [], {}, 0
+    for f in files:
+        t = pq.read_table(f, columns=['ts', TARGET] + features)
+        k = t.num_rows
+        ts = t.column('ts').to_numpy().view('i8')
+        cols = [t.column(c).to_numpy().astype(np.float32) for c in features]
+        parts['ts'].append(ts)
+        parts['target'].append(t.column(TARGET).to_numpy().astype(np.float64))
+        parts['codes'].append(np.full(k, names.setdefault(sid(f), len(names)), dtype=np.int64))
+        parts['hash'].append(row_hashes([ts] + cols))
+        sel = take[(take >= off) & (take < off + k)] - off
+        if len(sel):
+            parts['sample'].append(np.column_stack([c[sel] for c in cols]))
+        rows.append(FileRows(f, features, k))
+        off += k
+        del t, cols
+        pa.default_memory_pool().release_unused()
+    m = {k: np.concatenate(parts.pop(k)) for k in list(parts)}
+    m['features'] = features
+    release_memory()
+    ref = lgb.Dataset(m.pop('sample'), feature_name=features, params=params).construct()
+    release_memory()
+    m['base'] = lgb.Dataset(rows, label=np.zeros(n), feature_name=features, params=params, reference=ref).construct()
+    del ref
+    release_memory()
+    return m
+
+def shifted_label(m: dict, H: int) -> np.ndarray:
+    """Ziel H Schritte voraus innerhalb jeder Station (wie groupby().shift(-H)), sonst NaN."""
+    y = np.full(len(m['target']), np.nan)
+    y[:-H] = m['target'][H:]
+    y[:-H][m['codes'][H:] != m['codes'][:-H]] = np.nan
+    return y
+
+def _subset(base: lgb.Dataset, idx: np.ndarray, y: np.ndarray) -> lgb.Dataset:
+    # Subset teilt die Binning-Grenzen des Basis-Datasets; das Label wird erst nach construct gesetzt.
+    # idx ist aufsteigend: direkt als Array übergeben, subset() legte sonst eine sortierte Python-Liste an
+    d = base.subset([])
+    d.used_indices = idx
+    d.construct()
+    d.set_label(y[idx])
+    d.used_indices = None
+    return d
+
+def _predict_rows(booster, X: np.ndarray, idx: np.ndarray, chunk: int = 1 << 16) -> np.ndarray:
+    return np.concatenate([booster.predict(X[idx[i:i+chunk]]) for i in range(0, len(idx), chunk)])
+
+def _predict_binned(booster: lgb.Booster, valid: lgb.Dataset) -> np.ndarray:
+    # Vorhersage auf den gebinnten Zeilen: die Split-Schwellen liegen auf Bin-Grenzen, das Ergebnis
+    # ist gleich predict() auf den Rohwerten, ohne dass die Matrix dafür vorgehalten werden muss
+    out = []
+    booster.add_valid(valid, 'cv')
+    booster.eval_valid(lambda pred, _: out.append(np.array(pred)) or ('cv', 0.0, False))
+    return out[0]
+
+def final_models(train_set: lgb.Dataset, rounds: int, ds_opts: dict, threads=None, quantile_mode: str = 'independent'):
+    """
+    Finale Booster je Quantil auf ``train_set``. Liefert (Modelle, Vorhersagen des p50-Modells auf den
+    Trainingszeilen im quantile_mode 'residual' – aus dem Trainingszustand, ohne predict – sonst None).
+    """
+    models, fitted = {}, None
+    for q, a in QUANTILE_ALPHAS:
+        if q not in model_quantiles(quantile_mode):
+            continue
+        params, _ = booster_params(a, threads)
+        b = lgb.train({**params, **ds_opts}, train_set, num_boost_round=rounds, keep_training_booster=True)
+        if quantile_mode == 'residual':
+            out = []
+            b.eval_train(lambda pred, _: out.append(np.array(pred)) or ('fit', 0.0, False))
+            fitted = out[0]
+        # wie lgb.train ohne keep_training_booster: Modell ohne Bindung an train_set
+        models[q] = lgb.Booster(model_str=b.model_to_string())
+        del b
+    return models, fitted
+
+def run_global(opts: dict, threads=None) -> dict:
+    """
+    Globaler Modus: ein gebinntes lgb.Dataset für alle Horizonte, Quantile und CV-Folds (``global_dataset``,
+    ohne vorgehaltene float32-Matrix); Label-Shift und Fold-Auswahl sind Zeilenindizes auf diese Basis.
+    """
     report = {}
+    qmode = opts.get('quantile_mode', QUANTILE_MODE)
+    p50_params, rounds = booster_params(0.5, threads)
+    # col-wise fest vorgeben: LightGBM testet sonst beide Histogramm-Layouts (doppelter Speicher)
+    ds_opts = {"force_col_wise": True, "bin_construct_sample_cnt": GLOBAL_BIN_SAMPLE}
+    ds_params = {**p50_params, **ds_opts}
+    m = global_dataset(ds_params, INP)
+    base, base_hash, features = m['base'], m['hash'], m['features']
+    # Größe der float32-Matrix, die der Modus nicht mehr anlegt – Bezugsgröße des RSS-Checks
+    matrix_mb = base.num_data() * len(features) * 4 / 2**20
+    for H in H_LIST:
+        t0 = time.perf_counter()
+        key, tag, outdir = f"global_{H}", f"[GLOBAL] H={H}", ART/str(H)
+        y = shifted_label(m, H)
+        idx = np.flatnonzero(~np.isnan(y)).astype(np.int32)
+        rows = row_hashes([y], base_hash)[idx]
+        fp = fingerprint(rows, features, H, None, qmode)
+        prev = read_meta(outdir)
+        if prev and not opts.get('force') and prev.get('fingerprint') == fp and 'scores' in prev:
+            print(f"{tag} unverändert – übersprungen", flush=True)
+            report[key] = {**prev['scores'], "fit_seconds": round(time.perf_counter()-t0, 3), "skipped": True}
+            continue
+
+        preds, tests = [], []
+        for tr, te in TimeSeriesSplit(n_splits=5).split(idx):
+            train, valid = _subset(base, idx[tr], y), _subset(base, idx[te], y)
+            # keep_training_booster: der Booster bleibt an train gebunden, damit add_valid möglich ist
+            b = lgb.train(ds_params, train, num_boost_round=rounds, keep_training_booster=True)
+            preds.append(_predict_binned(b, valid)); tests.append(idx[te])
+            del b, train, valid  # Booster vor seinen Datasets freigeben
+            release_memory()
+        pred = np.concatenate(preds); test = np.concatenate(tests)
+        scores = skill_scores(y[test], pred)
+        # dieselben CV-Vorhersagen je Station in einem Aufruf bewerten
+        per_station = grouped_scores(m['codes'][test], y[test], pred)
+
+        train_set = _subset(base, idx, y)
+        models, fitted = final_models(train_set, rounds, ds_opts, threads, qmode)
+        del train_set
+        release_memory()
+        save_models(outdir, models)
+        meta = {"features": features,"raster": CFG['raster'],"target_col": TARGET,"horizon_steps": H,"mode":"global",
+                "quantile_mode": qmode, "model_format": "booster", "fingerprint": fp, "data_hash": data_hash(rows),
+                "rows": int(len(idx)), "ts_max": str(pd.Timestamp(int(m['ts'][idx].max()), tz='UTC')), "trees": rounds,
+                "warm_started": False, "scores": scores}
+        if qmode == 'residual':
+            meta["residual_offsets"] = residual_offsets(y[idx], fitted)
+        (outdir/'meta.json').write_text(json.dumps(meta,indent=2),encoding='utf-8')
+        peak = peak_rss_mb()
+        print(f"{tag} MAE:{scores['MAE']:.4f} RMSE:{scores['RMSE']:.4f} NSE:{scores['NSE']:.4f} KGE:{scores['KGE']:.4f}"
+              f" | Matrix {matrix_mb:.1f} MiB, peak RSS {peak if peak is None else round(peak, 1)} MiB", flush=True)
+        report[key] = {**scores, "fit_seconds": round(time.perf_counter()-t0, 3),
+                       "stations_scored": int(len(per_station['n'])),
+                       "NSE_station_median": float(np.nanmedian(per_station['NSE'])) if len(per_station['n']) else None,
+                       "feature_matrix_mb": round(matrix_mb, 1),
+                       "peak_rss_mb": None if peak is None else round(peak, 1)}
+    return report
+
+class StackedRows(lgb.Sequence):
+    """
+    Trainingszeilen (Basiszeile, Horizont) als lgb.Sequence: jede Zeile wird erst beim Lesen aus der
+    Basismatrix genommen und um den Horizont ergänzt, es entsteht keine Feature-Kopie je Horizont.
+    lgb.Dataset liest eine Stichprobe fürs Binning und danach Blöcke von ``batch_size`` Zeilen.
+    """
+    def __init__(self, X: np.ndarray, rows: np.ndarray, hs: np.ndarray, batch_size: int = 1 << 14):
+        self.X, self.rows, self.hs, self.batch_size = X, rows, hs.astype(X.dtype), batch_size
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, np.integer)):  # Stichprobe fürs Binning (LightGBM erwartet float64)
+            return np.append(self.X[self.rows[idx]], self.hs[idx]).astype(np.float64)
+        return np.column_stack([self.X[self.rows[idx]], self.hs[idx]])
 
-    if MODE == 'global':
-        for H in H_LIST:
-            d = df.copy()
-            d['y'] = d.groupby('station_id')[TARGET].shift(-H)
-            d = d.dropna(subset=['y'])
-            X = d[features]; y = d['y']
-            tscv = TimeSeriesSplit(n_splits=5)
-            preds, trues = [], []
-            for tr, te in tscv.split(X):
-                m_cv = qmodel(0.5).fit(X.iloc[tr], y.iloc[tr])
-                p_cv = m_cv.predict(X.iloc[te])
-                preds.append(p_cv); trues.append(y.iloc[te].values)
-            pred = np.concatenate(preds); true = np.concatenate(trues)
-            mae = mean_absolute_error(true, pred)
-            rmse_val = rmse_fn(true, pred)
-            nse_val = nse(true, pred)
-            kge_val = kge(true, pred)
-            print(f"[GLOBAL] H={H} MAE:{mae:.4f} RMSE:{rmse_val:.4f} NSE:{nse_val:.4f} KGE:{kge_val:.4f}")
-            report[f"global_{H}"] = {"MAE": float(mae),"RMSE": float(rmse_val),"NSE": float(nse_val),"KGE": float(kge_val)}
-            outdir = ART/str(H); outdir.mkdir(parents=True, exist_ok=True)
-            m10 = qmodel(0.10).fit(X,y); joblib.dump(m10, outdir/'model_p10.lgb')
-            m50 = qmodel(0.50).fit(X,y); joblib.dump(m50, outdir/'model_p50.lgb')
-            m90 = qmodel(0.90).fit(X,y); joblib.dump(m90, outdir/'model_p90.lgb')
-            meta = {"features": features,"raster": CFG['raster'],"target_col": TARGET,"horizon_steps": H,"mode":"global"}
-            (outdir/'meta.json').write_text(json.dumps(meta,indent=2),encoding='utf-8')
-    elif MODE == 'per_station':
+def stacked_pairs(m: dict, horizons) -> tuple:
+    """Basiszeile, Horizont und Label aller Paare mit gültigem Ziel, nach Basiszeile und Horizont geordnet."""
+    y = np.column_stack([shifted_label(m, H) for H in horizons])
+    rows, k = np.nonzero(~np.isnan(y))
+    return rows.astype(np.int32), np.asarray(horizons, dtype=np.int32)[k], y[rows, k]
+
+def fit_stacked(X: np.ndarray, features, pairs, n_splits: int, threads=None, quantile_mode: str = 'independent'):
+    """
+    Ein Modellset für alle Horizonte: ein gebinntes lgb.Dataset aus ``StackedRows``, CV-Folds und finale
+    Fits sind Zeilenindizes darauf. Liefert (Scores, Scores je Horizont, Modelle, CV-Vorhersagen, Testpaare);
+    die Residuen-Offsets im quantile_mode 'residual' sind Listen je Horizont.
+    """
+    rows, hs, y = pairs
+    p50_params, rounds = booster_params(0.5, threads)
+    ds_opts = {"force_col_wise": True, "bin_construct_sample_cnt": GLOBAL_BIN_SAMPLE}
+    ds_params = {**p50_params, **ds_opts}
+    seq = StackedRows(X, rows, hs)
+    base = lgb.Dataset(seq, label=np.zeros(len(y)), feature_name=list(features) + [HORIZON_FEATURE],
+                       params=ds_params, free_raw_data=True).construct()
+    idx = np.arange(len(y), dtype=np.int32)
+    preds, tests = [], []
+    for tr, te in TimeSeriesSplit(n_splits=n_splits).split(idx):
+        b = lgb.train(ds_params, _subset(base, idx[tr], y), num_boost_round=rounds)
+        b.free_dataset()
+        preds.append(_predict_rows(b, seq, idx[te])); tests.append(idx[te])
+    pred = np.concatenate(preds); test = np.concatenate(tests)
+    scores = skill_scores(y[test], pred)
+    by_h = grouped_scores(hs[test], y[test], pred)
+    by_horizon = {str(H): {k: float(by_h[k][i]) for k in ('MAE', 'RMSE', 'NSE', 'KGE')}
+                  for i, H in enumerate(by_h['keys'][0])}
+
+    train_set = _subset(base, idx, y)
+    models, fitted = final_models(train_set, rounds, ds_opts, threads, quantile_mode)
+    del train_set
+    offsets = None
+    if quantile_mode == 'residual':
+        # Streuung wächst mit dem Horizont: Offsets je Horizont (artifacts.predict_array interpoliert dazwischen)
+        per_h = [residual_offsets(y[hs == H], fitted[hs == H]) for H in np.unique(hs)]
+        offsets = {q: [o[q] for o in per_h] for q in ('p10', 'p90')}
+    return scores, by_horizon, models, offsets, (pred, test)
+
+def stacked_job(m: dict, features, sid, opts: dict, threads=None):
+    """
+    horizon_layout 'stacked': ein Modellset für alle Horizonte aus H_LIST (global: ``sid`` None).
+    ``m`` wie ``load_global_matrix`` (X, target, codes, ts). Liefert (Report-Schlüssel, Eintrag) oder None.
+    """
+    t0 = time.perf_counter()
+    horizons = sorted(int(H) for H in H_LIST)
+    qmode = opts.get('quantile_mode', QUANTILE_MODE)
+    mode = 'global' if sid is None else 'per_station'
+    key = 'global_stacked' if sid is None else f"{sid}_stacked"
+    tag = f"[{mode.upper()}]{'' if sid is None else ' ' + sid} H={horizons[0]}…{horizons[-1]} (stacked)"
+    outdir = artifact_dir(ART, sid=sid, layout='stacked')
+    pairs = stacked_pairs(m, horizons)
+    if len(pairs[2]) < 120 * len(horizons):
+        return None
+    X = m['X']
+    rows = row_hashes([m['ts']] + [X[:, j] for j in range(X.shape[1])] + [m['target']])
+    fp = fingerprint(rows, features, horizons, sid, qmode)
+    prev = read_meta(outdir)
+    if prev and not opts.get('force') and prev.get('fingerprint') == fp and 'scores' in prev:
+        print(f"{tag} unverändert – übersprungen", flush=True)
+        return key, {**prev['scores'], "fit_seconds": round(time.perf_counter()-t0, 3), "skipped": True}
+
+    n_splits = 3 if len(X) < 500 else 5
+    scores, by_horizon, models, offsets, (pred, test) = fit_stacked(X, features, pairs, n_splits, threads, qmode)
+    save_models(outdir, models)
+    valid = m['ts'][pairs[0]]
+    meta = {"features": list(features) + [HORIZON_FEATURE], "raster": CFG['raster'], "target_col": TARGET,
+            "horizon_layout": "stacked", "horizons": horizons, "mode": mode}
+    if sid is not None:
+        meta["station_id"] = sid
+    meta.update({"quantile_mode": qmode, "model_format": "booster", "fingerprint": fp, "data_hash": data_hash(rows),
+                 "rows": int(len(rows)), "pairs": int(len(pairs[2])),
+                 "ts_max": str(pd.Timestamp(int(valid.max()), tz='UTC')), "trees": N_TREES,
+                 "warm_started": False, "scores": scores, "scores_by_horizon": by_horizon})
+    if offsets is not None:
+        meta["residual_offsets"] = offsets
+    (outdir/'meta.json').write_text(json.dumps(meta,indent=2),encoding='utf-8')
+    peak = peak_rss_mb()
+    print(f"{tag} MAE:{scores['MAE']:.4f} RMSE:{scores['RMSE']:.4f} NSE:{scores['NSE']:.4f} KGE:{scores['KGE']:.4f}"
+          f" | {len(pairs[2])} Paare aus {len(X)} Zeilen, peak RSS {peak if peak is None else round(peak, 1)} MiB", flush=True)
+    entry = {**scores, "fit_seconds": round(time.perf_counter()-t0, 3), "pairs": int(len(pairs[2])),
+             "by_horizon": by_horizon}
+    if sid is None:
+        # Bezugsgröße des RSS-Checks: die dichte Paar-Matrix (Features + Horizont), die StackedRows vermeidet
+        entry["feature_matrix_mb"] = round(len(pairs[2]) * (X.shape[1] + 1) * X.itemsize / 2**20, 1)
+        per_station = grouped_scores(m['codes'][pairs[0][test]], pairs[2][test], pred)
+        entry.update(stations_scored=int(len(per_station['n'])),
+                     NSE_station_median=float(np.nanmedian(per_station['NSE'])) if len(per_station['n']) else None,
+                     peak_rss_mb=None if peak is None else round(peak, 1))
+    return key, entry
+
+def run_stacked_job(sid):
+    """Stacked-Job einer Station im per_station-Modus (Basismatrix float32 wie im globalen Modus)."""
+    a, b = _SPANS[sid]
+    d = _DF.iloc[a:b]
+    features = features_from(_DF)
+    m = {"X": np.ascontiguousarray(d[features].to_numpy(dtype=np.float32)),
+         "target": d[TARGET].to_numpy(dtype=np.float64), "codes": np.zeros(len(d), dtype=np.int64),
+         "ts": d['ts'].values.view('i8')}
+    return stacked_job(m, features, sid, _OPTS, _THREADS)
+
+def make_jobs(df: pd.DataFrame) -> list:
+    if MODE == 'per_station':
         stations = df['station_id'].dropna().unique().tolist()
-        for H in H_LIST:
-            for sid in stations:
-                d = df[df['station_id']==sid].copy()
-                d['y'] = d[TARGET].shift(-H)
-                d = d.dropna(subset=['y'])
-                if len(d)<120: continue
-                X = d[features]; y = d['y']
-                tscv = TimeSeriesSplit(n_splits=3 if len(d)<500 else 5)
-                preds, trues = [], []
-                for tr, te in tscv.split(X):
-                    m_cv = qmodel(0.5).fit(X.iloc[tr], y.iloc[tr])
-                    p_cv = m_cv.predict(X.iloc[te])
-                    preds.append(p_cv); trues.append(y.iloc[te].values)
-                pred = np.concatenate(preds); true = np.concatenate(trues)
-                mae = mean_absolute_error(true, pred)
-                rmse_val = rmse_fn(true, pred)
-                nse_val = nse(true, pred)
-                kge_val = kge(true, pred)
-                print(f"[PER_STATION] {sid} H={H} MAE:{mae:.4f} RMSE:{rmse_val:.4f} NSE:{nse_val:.4f} KGE:{kge_val:.4f}")
-                report[f"{sid}_{H}"] = {"MAE": float(mae),"RMSE": float(rmse_val),"NSE": float(nse_val),"KGE": float(kge_val)}
-                outdir = ART/sid/str(H); outdir.mkdir(parents=True, exist_ok=True)
-                m10 = qmodel(0.10).fit(X,y); joblib.dump(m10,outdir/'model_p10.lgb')
-                m50 = qmodel(0.50).fit(X,y); joblib.dump(m50,outdir/'model_p50.lgb')
-                m90 = qmodel(0.90).fit(X,y); joblib.dump(m90,outdir/'model_p90.lgb')
-                meta = {"features":features,"raster":CFG['raster'],"target_col":TARGET,"horizon_steps":H,"mode":"per_station","station_id":sid}
-                (outdir/'meta.json').write_text(json.dumps(meta,indent=2),encoding='utf-8')
-    else:
-        raise SystemExit(f"Unknown training_mode {MODE}")
+        if HORIZON_LAYOUT == 'stacked':
+            return stations
+        return [(sid, H) for H in H_LIST for sid in stations]
+    raise SystemExit(f"Unknown training_mode {MODE}")
+
+def main(argv=None):
+    global _DF, _SPANS, N_TREES, HORIZON_LAYOUT
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=1, help="Parallele Trainingsprozesse (1 = sequentiell)")
+    ap.add_argument("--threads", type=int, default=None,
+                    help="LightGBM-Threads je Fit (Default: CPU-Kerne / workers)")
+    ap.add_argument("--force", action="store_true", help="Alle Jobs neu trainieren, Fingerprints ignorieren")
+    ap.add_argument("--trees", type=int, default=N_TREES, help="Bäume je Modell (weniger z. B. für Benchmarks)")
+    ap.add_argument("--warm-start", type=int, default=0, metavar="TREES",
+                    help="Bei nur angehängten Daten vorhandene Modelle um TREES Bäume weitertrainieren (0 = aus, nur per_horizon)")
+    ap.add_argument("--quantile-mode", choices=QUANTILE_MODES, default=QUANTILE_MODE,
+                    help="independent: Modell je Quantil; residual: nur p50 + Offsets aus seinen Residuen (config: quantile_mode)")
+    ap.add_argument("--horizon-layout", choices=HORIZON_LAYOUTS, default=HORIZON_LAYOUT,
+                    help="per_horizon: Modellset je Horizont; stacked: Horizont als Feature, ein Modellset (config: horizon_layout)")
+    args = ap.parse_args(argv)
+    HORIZON_LAYOUT = args.horizon_layout
+    opts = {"force": args.force, "warm_trees": args.warm_start, "trees": args.trees, "quantile_mode": args.quantile_mode}
+    N_TREES = args.trees
+
+    workers = max(1, args.workers)
+    threads = args.threads or (max(1, (os.cpu_count() or 1) // workers) if workers > 1 else None)
+    # Peak-RSS misst den Hauptprozess; Pool-Worker sind darin nicht enthalten
+    with perf.stage('train') as st:
+        if MODE == 'global':
+            # ein gemeinsames Dataset für alle Horizonte; parallelisiert über LightGBMs eigene Threads
+            print(f"Baseline RSS (vor dem Laden): {peak_rss_mb()} MiB")
+            baseline = current_rss_mb()
+            if HORIZON_LAYOUT == 'stacked':
+                m = load_global_matrix(INP)
+                pa.default_memory_pool().release_unused()
+                report = dict(filter(None, [stacked_job(m, m['features'], None, opts, args.threads)]))
+            else:
+                report = run_global(opts, args.threads)
+            # für den RSS-Check der Benchmark-Suite: Peak über der Baseline im Verhältnis zur Feature-Matrix
+            mats = [v['feature_matrix_mb'] for v in report.values() if 'feature_matrix_mb' in v]
+            st.extra.update(baseline_rss_mb=None if baseline is None else round(baseline, 1),
+                            feature_matrix_mb=max(mats) if mats else None)
+            st.add_rows(store.num_rows(INP))
+        else:
+            with st.step('read'):
+                _DF = load_frame(INP)
+                _SPANS = station_spans(_DF)
+                jobs = make_jobs(_DF)
+            st.add_rows(len(_DF))
 
-    (ART/'report.json').write_text(json.dumps(report,indent=2),encoding='utf-8')
+            job = run_stacked_job if HORIZON_LAYOUT == 'stacked' else run_job
+            with st.step('fit', rows=len(jobs)):
+                if workers == 1:
+                    _init_worker(INP, threads, opts)
+                    results = [job(j) for j in jobs]
+                else:
+                    # Frame wird je Worker einmal geerbt (fork) bzw. geladen (spawn), nicht je Job gepickelt
+                    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(INP, threads, opts)) as ex:
+                        results = list(ex.map(job, jobs))
+            report = dict(r for r in results if r is not None)
+        st.extra.update(jobs=len(report), horizon_layout=HORIZON_LAYOUT,
+                        skipped=sum(1 for k, v in report.items() if isinstance(v, dict) and v.get('skipped')))
+
+        (ART/'report.json').write_text(json.dumps(report,indent=2),encoding='utf-8')
     print("Training complete.")
+
+if __name__ == "__main__":
+    main()
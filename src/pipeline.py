@@ -0,0 +1,128 @@
+# src/pipeline.py
+"""
+Operativer Forecast-Zyklus in einem Prozess: load/merge -> qc -> features -> publish im Speicher.
+
+Zwischenstände werden nur mit ``--persist`` geschrieben (interim, clean, feat). Ohne persistierte
+Features werden je Station nur die letzten ``HISTORY + 1`` bereinigten Zeilen featurisiert – mehr
+braucht die jüngste Prognosezeile nicht. ``--stream`` verarbeitet die Stationen einzeln als
+Generator (geringerer Spitzenspeicher bei vielen Stationen). Das Training bleibt ein eigener Schritt.
+
+Beispiel:
+  python -m src.pipeline --source rivercast_100stations_raw.zip --persist feat
+"""
+
+import argparse, json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.etl.load import EXO_FILES, OUT as INTERIM, join_exogenous, list_sources, load_raw_fast, source_name
+from src.etl.qc import OUT as PROCESSED, run_qc
+from src.features.build_features import HISTORY, OUT as FEAT, SPEC, STATE, build_features, history_state
+from src.serve.publish import ART, CFG, build_messages, latest_rows, publish_mqtt
+from src.utils import perf, store
+
+PERSIST = ('interim', 'clean', 'feat')
+
+def log_timings(rec: dict):
+    for name, t in rec['steps'].items():
+        rows = f"  {t['rows']:>9} rows" if t['rows'] else ""
+        print(f"[TIME] {name:<9} {t['seconds']:7.3f} s{rows}")
+    print(f"[TIME] {'total':<9} {rec['seconds']:7.3f} s  (peak RSS {rec['peak_rss_mb']} MiB)")
+
+def station_stream(df: pd.DataFrame):
+    """Zusammenhängende Station-Blöcke eines nach (station_id, ts) sortierten Frames, ohne Kopie des Ganzen."""
+    sid = df['station_id'].to_numpy()
+    cut = np.flatnonzero(sid[1:] != sid[:-1]) + 1
+    for a, b in zip(np.r_[0, cut], np.r_[cut, len(df)]):
+        yield sid[a], df.iloc[a:b]
+
+def tail_rows(df: pd.DataFrame, n: int) -> pd.DataFrame:
+    return df.groupby('station_id', sort=False, group_keys=False).tail(n)
+
+def load_stage(source, workers: int) -> pd.DataFrame:
+    base = [s for s in list_sources(Path(source)) if source_name(s) not in EXO_FILES]
+    if not base:
+        raise SystemExit(f"No CSV files found in {source}. Add raw data CSVs first.")
+    return join_exogenous(load_raw_fast(base, workers), workers=workers)
+
+def latest_features(clean: pd.DataFrame, full: bool = False) -> pd.DataFrame:
+    """Features für alle Zeilen (full) oder nur für die Historie der jüngsten Zeile je Station."""
+    return build_features(clean if full else tail_rows(clean, HISTORY + 1), SPEC)
+
+def run_cycle(source, workers: int = 4, persist=(), stream: bool = False, publish: bool = True) -> dict:
+    with perf.stage('cycle') as st:
+        with st.step('load') as s:
+            df = load_stage(source, workers)
+            s['rows'] += len(df)
+        st.add_rows(len(df))
+        if 'interim' in persist:
+            with st.step('persist'):
+                store.write_dataset(df, INTERIM/'all')
+
+        full = 'feat' in persist
+        if stream:
+            latest, summaries, clean_parts, feat_parts = [], [], [], []
+            for sid, g in station_stream(df.sort_values(['station_id', 'ts'], ignore_index=True)):
+                with st.step('qc', rows=len(g)):
+                    clean, summary = run_qc(g)
+                with st.step('features') as s:
+                    feat = latest_features(clean, full)
+                    if len(feat):  # Station ohne gültige Zeilen nach QC: keine Prognose
+                        latest.append(feat.iloc[[-1]])
+                    s['rows'] += len(feat)
+                summaries.append(summary)
+                if 'clean' in persist or full: clean_parts.append(clean)
+                if full: feat_parts.append(feat)
+            del df
+            latest = pd.concat(latest) if latest else feat.iloc[:0]
+            summary = pd.concat(summaries, ignore_index=True)
+            clean = pd.concat(clean_parts) if clean_parts else None
+            feat = pd.concat(feat_parts) if feat_parts else None
+        else:
+            with st.step('qc', rows=len(df)):
+                clean, summary = run_qc(df)
+            del df
+            with st.step('features') as s:
+                feat = latest_features(clean, full)
+                latest = latest_rows(feat)
+                s['rows'] += len(feat)
+        summary.to_csv(PROCESSED/'qc_summary.csv', index=False)
+
+        if persist:
+            with st.step('persist'):
+                if 'clean' in persist:
+                    store.write_dataset(clean, PROCESSED/'clean')
+                if full:
+                    store.write_dataset(feat, FEAT)
+                    history_state(clean).to_parquet(STATE)
+
+        with st.step('predict', rows=len(latest)):
+            msgs = build_messages(latest)
+        with st.step('publish', rows=len(msgs)):
+            (ART/'forecast_latest.json').write_text(json.dumps(msgs,indent=2))
+            if publish and CFG.get('mqtt',{}).get('enabled',False):
+                st.extra['mqtt'] = publish_mqtt(msgs)
+        st.extra['forecasts'] = len(msgs)
+    log_timings(st.result)
+    return {"messages": len(msgs), "perf": st.result}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--source", type=str, default='data/raw', help="Rohdaten-Verzeichnis oder Zip-Archiv")
+    ap.add_argument("--workers", type=int, default=4, help="Parallele Leser")
+    ap.add_argument("--persist", type=str, default="",
+                    help=f"Kommagetrennt, welche Zwischenstände geschrieben werden: {','.join(PERSIST)}")
+    ap.add_argument("--stream", action="store_true", help="Stationen einzeln als Generator verarbeiten")
+    ap.add_argument("--no-publish", action="store_true", help="Nur forecast_latest.json schreiben, kein MQTT")
+    args = ap.parse_args(argv)
+
+    persist = {p for p in args.persist.split(',') if p}
+    if persist - set(PERSIST):
+        raise SystemExit(f"Unbekannte Zwischenstände: {sorted(persist - set(PERSIST))}")
+    res = run_cycle(args.source, args.workers, persist, args.stream, not args.no_publish)
+    print(f"Wrote {res['messages']} forecasts -> {ART/'forecast_latest.json'}")
+
+if __name__ == "__main__":
+    main()
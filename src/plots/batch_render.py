@@ -3,7 +3,8 @@
 Batch-Rendering für Fan-Charts (p10/p50/p90) über alle Stationen × Horizonte.
 
 Voraussetzungen:
-- Hindcast-Dateien existieren unter data/processed/hindcast/hindcast_{station}_{H}.parquet
+- Hindcast-Speicher unter data/processed/hindcast (src/utils/hindcast_store.py; Einzeldateien
+  hindcast_{station}_{H}.parquet im alten Layout werden ebenfalls gelesen)
   (Erstellt mit: python -m src.eval.hindcast)
 
 Nutzung:
@@ -12,63 +13,93 @@ Nutzung:
   python -m src.plots.batch_render --stations ERFT_001 ERFT_002 --horizons 24 48
 
 Erzeugt PNGs: fanchart_{station}_{H}.png
+
+Gerendert wird mit plot_fan aus plot_fanchart (Figure-API, Agg) in einem Prozesspool. PNGs, die
+neuer als ihr Hindcast sind oder deren Reihe laut render_manifest.json (SHA-256) unverändert ist,
+werden übersprungen; --force rendert alles neu.
 """
 
-import argparse
+import argparse, hashlib, json, os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import pandas as pd
-import matplotlib.pyplot as plt
-
-def plot_fan(df: pd.DataFrame, outpath: Path):
-    df = df.sort_values('ts')
-    x = pd.to_datetime(df['ts'])
-
-    fig, ax = plt.subplots()
-    ax.fill_between(x, df['p10'], df['p90'], alpha=0.3, label='p10–p90')
-    ax.plot(x, df['p50'], label='p50')
-    if 'y_true' in df.columns:
-        ax.plot(x, df['y_true'], label='true', linewidth=1)
-    sid = df['station_id'].iloc[0]
-    hz = int(df['horizon_minutes'].iloc[0]) if 'horizon_minutes' in df.columns else int(df['horizon_steps'].iloc[0])*15
-    ax.set_title(f"{sid} – {hz} min")
-    ax.set_xlabel("Zeit")
-    ax.set_ylabel("Ziel (z. B. h_cm)")
-    ax.legend()
-    fig.tight_layout()
-    fig.savefig(outpath, dpi=120)
-    plt.close(fig)
 
-if __name__ == "__main__":
+from src.plots.plot_fanchart import plot_fan
+from src.utils import hindcast_store, perf
+
+MANIFEST = 'render_manifest.json'
+
+def file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def series_hash(s: dict) -> str:
+    # konsolidierter Speicher: Hash steht im Index; altes Layout: Hash der Datei
+    return s['sha256'] or file_hash(s['path'])
+
+def is_fresh(s: dict, png: Path, entry: dict, max_points) -> bool:
+    if not png.exists() or (entry or {}).get('max_points') != max_points:
+        return False
+    if png.stat().st_mtime >= s['mtime']:
+        return True
+    if entry and entry.get('sha256') == series_hash(s):
+        # Quelle nur neu geschrieben, Inhalt gleich: PNG als aktuell markieren
+        os.utime(png)
+        return True
+    return False
+
+def render_one(job):
+    s, png, max_points = job
+    df = hindcast_store.to_columns(hindcast_store.read_series(s))
+    plot_fan(df, png, max_points)
+    return png.name, len(df['ts']), series_hash(s)
+
+def main(argv=None):
     ap = argparse.ArgumentParser()
-    ap.add_argument("--hindcast", type=str, default="data/processed/hindcast", help="Verzeichnis mit Hindcast-Parquets")
+    ap.add_argument("--hindcast", type=str, default="data/processed/hindcast", help="Hindcast-Speicher (oder Verzeichnis mit Einzeldateien)")
     ap.add_argument("--out", type=str, default="artifacts/plots", help="Ausgabeverzeichnis für PNGs")
     ap.add_argument("--stations", nargs="*", default=None, help="Filter: Stations-IDs")
     ap.add_argument("--horizons", nargs="*", type=int, default=None, help="Filter: Horizonte (15-min Schritte)")
-    args = ap.parse_args()
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parallele Render-Prozesse")
+    ap.add_argument("--max-points", type=int, default=None, help="Lange Reihen per Min-Max auf ca. N Punkte dezimieren")
+    ap.add_argument("--force", action="store_true", help="Alle PNGs neu rendern")
+    args = ap.parse_args(argv)
 
     hindir = Path(args.hindcast)
     outdir = Path(args.out); outdir.mkdir(parents=True, exist_ok=True)
 
-    files = list(hindir.glob("hindcast_*.parquet"))
-    if not files:
-        raise SystemExit(f"Keine Hindcast-Dateien in {hindir} gefunden. Bitte zuerst: python -m src.eval.hindcast")
-
-    for f in files:
-        # Dateiname: hindcast_{station}_{H}.parquet
-        try:
-            stem = f.stem  # e.g., hindcast_ERFT_001_48
-            parts = stem.split("_")
-            station = "_".join(parts[1:-1])
-            horizon = int(parts[-1])
-        except Exception:
-            continue
-
-        if args.stations and station not in args.stations:
-            continue
-        if args.horizons and horizon not in args.horizons:
-            continue
-
-        df = pd.read_parquet(f)
-        png = outdir / f"fanchart_{station}_{horizon}.png"
-        plot_fan(df, png)
-        print(f"[OK] {png}")
+    manifest_path = outdir / MANIFEST
+    manifest = json.loads(manifest_path.read_text(encoding='utf-8')) if manifest_path.exists() else {}
+
+    with perf.stage('render') as st:
+        with st.step('scan'):
+            series = hindcast_store.series_index(hindir, args.stations, args.horizons)
+            if not series:
+                raise SystemExit(f"Keine Hindcasts in {hindir} gefunden. Bitte zuerst: python -m src.eval.hindcast")
+            jobs, skipped = [], 0
+            for s in series:
+                png = outdir / f"fanchart_{s['station_id']}_{s['horizon']}.png"
+                if not args.force and is_fresh(s, png, manifest.get(png.name), args.max_points):
+                    skipped += 1
+                    continue
+                jobs.append((s, png, args.max_points))
+
+        with st.step('plot', rows=len(jobs)):
+            workers = max(1, min(args.workers, len(jobs)))
+            if workers == 1:
+                results = [render_one(j) for j in jobs]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as ex:
+                    results = list(ex.map(render_one, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+            for name, rows, digest in results:
+                manifest[name] = {"sha256": digest, "max_points": args.max_points}
+                st.add_rows(rows)
+                print(f"[OK] {outdir / name}")
+        manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding='utf-8')
+        st.extra.update(rendered=len(jobs), skipped=skipped)
+    print(f"{len(jobs)} gerendert, {skipped} aktuell (übersprungen) -> {outdir}")
+
+if __name__ == "__main__":
+    main()
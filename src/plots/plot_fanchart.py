@@ -1,6 +1,6 @@
 # src/plots/plot_fanchart.py
 """
-Erstellt Fan-Charts (p10/p50/p90) für eine Station & einen Horizont aus Hindcast-Dateien.
+Erstellt Fan-Charts (p10/p50/p90) für eine Station & einen Horizont aus dem Hindcast-Speicher (oder Einzeldateien im alten Layout).
 
 Beispiel:
   python -m src.plots.plot_fanchart --station ERFT_001 --horizon 48 \
@@ -14,44 +14,96 @@ Hinweise (Rendering-Regeln):
 
 import argparse
 from pathlib import Path
-import pandas as pd
-import matplotlib.pyplot as plt
 
-def plot_fan(df: pd.DataFrame, outpath: Path):
-    df = df.sort_values('ts')
-    x = pd.to_datetime(df['ts'])
+import numpy as np
 
-    fig, ax = plt.subplots()
-    ax.fill_between(x, df['p10'], df['p90'], alpha=0.3, label='p10–p90')
-    ax.plot(x, df['p50'], label='p50')
-    if 'y_true' in df.columns:
-        ax.plot(x, df['y_true'], label='true', linewidth=1)
+from src.utils import hindcast_store
 
-    sid = df['station_id'].iloc[0]
-    hz = int(df['horizon_minutes'].iloc[0]) if 'horizon_minutes' in df.columns else None
+def read_hindcast(path: Path) -> dict:
+    """Einzelne Hindcast-Datei (altes Layout) als Dict von NumPy-Spalten, ohne pandas."""
+    import pyarrow.parquet as pq
+    return hindcast_store.to_columns(pq.ParquetFile(path).read())
+
+def decimate(cols: list, max_points: int) -> np.ndarray:
+    """
+    Min-Max-Dezimierung: Indizes von Minimum und Maximum je Spalte in gleich großen Abschnitten
+    (plus erster/letzter Punkt). Spitzen und Bandbreite bleiben sichtbar; etwa ``max_points`` Punkte.
+    """
+    n = len(cols[0]) if cols else 0
+    if not max_points or n <= max_points:
+        return np.arange(n)
+    buckets = max(1, max_points // (2 * len(cols)))
+    size = -(-n // buckets)
+    idx = [np.array([0, n - 1])]
+    base = np.arange(buckets) * size
+    for v in cols:
+        v = np.asarray(v, dtype=np.float64)
+        pad = np.full(buckets * size, np.nan)
+        pad[:n] = v
+        pad = pad.reshape(buckets, size)
+        valid = ~np.isnan(pad).all(axis=1)
+        lo = np.where(np.isnan(pad), np.inf, pad).argmin(axis=1)
+        hi = np.where(np.isnan(pad), -np.inf, pad).argmax(axis=1)
+        idx += [(base + lo)[valid], (base + hi)[valid]]
+    return np.unique(np.concatenate(idx))
+
+def plot_fan(df, outpath: Path, max_points: int = None):
+    """
+    Fan-Chart aus einem DataFrame oder Dict von Spalten; Figure-API mit Agg, ohne pyplot
+    (auch in Prozesspools nutzbar). ``max_points`` dezimiert lange Reihen vor dem Zeichnen.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    ts = df['ts']
+    # tz-aware pandas-Spalten als UTC-datetime64 (wie pyarrow), sonst direkt
+    ts = ts.to_numpy('datetime64[ns]') if hasattr(ts, 'dt') else np.asarray(ts, dtype='datetime64[ns]')
+    order = np.argsort(ts, kind='stable')
+    lines = [c for c in ('p10', 'p50', 'p90', 'y_true') if c in df]
+    keep = order[decimate([np.asarray(df[c])[order] for c in lines], max_points)]
+    col = lambda c: np.asarray(df[c])[keep]
+    x = ts[keep]
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    ax.fill_between(x, col('p10'), col('p90'), alpha=0.3, label='p10–p90')
+    ax.plot(x, col('p50'), label='p50')
+    if 'y_true' in df:
+        ax.plot(x, col('y_true'), label='true', linewidth=1)
+
+    sid = np.asarray(df['station_id'])[0]
+    if 'horizon_minutes' in df:
+        hz = int(np.asarray(df['horizon_minutes'])[0])
+    elif 'horizon_steps' in df:
+        hz = int(np.asarray(df['horizon_steps'])[0]) * 15
+    else:
+        hz = None
     ax.set_title(f"{sid} – {hz} min" if hz else f"{sid}")
     ax.set_xlabel("Zeit")
     ax.set_ylabel("Ziel (z. B. h_cm)")
     ax.legend()
     fig.tight_layout()
     fig.savefig(outpath, dpi=120)
-    plt.close(fig)
 
-if __name__ == "__main__":
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--station", required=True, help="Stations-ID, z. B. ERFT_001")
     ap.add_argument("--horizon", type=int, required=True, help="Horizont in 15-min Schritten")
-    ap.add_argument("--hindcast", type=str, default="data/processed/hindcast", help="Verzeichnis mit Hindcast-Parquets")
+    ap.add_argument("--hindcast", type=str, default="data/processed/hindcast", help="Hindcast-Speicher (oder Verzeichnis mit Einzeldateien)")
     ap.add_argument("--out", type=str, default="artifacts/plots", help="Ausgabeverzeichnis für PNG")
-    args = ap.parse_args()
+    ap.add_argument("--max-points", type=int, default=None, help="Lange Reihen per Min-Max auf ca. N Punkte dezimieren")
+    args = ap.parse_args(argv)
 
-    hindir = Path(args.hindcast)
-    infile = hindir / f"hindcast_{args.station}_{args.horizon}.parquet"
-    if not infile.exists():
-        raise SystemExit(f"Nicht gefunden: {infile} – bitte zuerst Hindcast erzeugen.")
+    found = hindcast_store.series_index(Path(args.hindcast), [args.station], [args.horizon])
+    if not found:
+        raise SystemExit(f"Nicht gefunden: {args.station} H={args.horizon} in {args.hindcast} – bitte zuerst Hindcast erzeugen.")
 
-    df = pd.read_parquet(infile)
+    df = hindcast_store.to_columns(hindcast_store.read_series(found[0]))
     outdir = Path(args.out); outdir.mkdir(parents=True, exist_ok=True)
     outpath = outdir / f"fanchart_{args.station}_{args.horizon}.png"
-    plot_fan(df, outpath)
+    plot_fan(df, outpath, args.max_points)
     print(f"[OK] Fan-Chart -> {outpath}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# src/serve/mqtt_publisher.py
+"""
+MQTT-Publisher mit dauerhafter Verbindung für publish, server und pipeline.
+
+- eine Verbindung je Prozess (``get_publisher``), Netzwerk-Thread von paho (``loop_start``),
+  automatischer Reconnect mit exponentiellem Backoff (reconnect_min_s … reconnect_max_s)
+- asynchrones Senden mit begrenztem Fenster unbestätigter Nachrichten (``window``); ``publish``
+  kehrt erst zurück, wenn alle QoS-1/2-Nachrichten bestätigt sind oder ``timeout_s`` abläuft –
+  bei Verbindungsabbruch sendet paho offene Nachrichten nach dem Reconnect erneut
+- ``batch: station`` fasst alle Horizonte einer Station in eine Nachricht zusammen
+  (Topic ``{base}/{station}/forecast/{target}``, Payload ``{"station_id", "target", "forecasts": [...]}``)
+- liefert Latenz (Senden -> Ack) und Durchsatz je Aufruf
+
+config.yaml:
+  mqtt: {enabled: true, host: localhost, port: 1883, base_topic: /rivercast,
+         qos: 1, window: 100, batch: message, timeout_s: 30, reconnect_min_s: 1, reconnect_max_s: 60}
+"""
+
+import atexit, json, os, threading, time
+
+import numpy as np
+
+BATCH_MODES = ('message', 'station')
+
+def _client(client_id: str):
+    import paho.mqtt.client as mqtt
+    try:
+        return mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id, clean_session=True)
+    except AttributeError:  # paho-mqtt < 2.0
+        return mqtt.Client(client_id=client_id, clean_session=True)
+
+def _rc(rc) -> int:
+    return int(getattr(rc, 'value', rc))
+
+def topic_payloads(msgs: list, base_topic: str, target: str, batch: str = 'message') -> list:
+    """(Topic, JSON-Payload) je Nachricht bzw. je Station (``batch='station'``)."""
+    base = base_topic.rstrip('/')
+    if batch == 'message':
+        return [(f"{base}/{m['station_id']}/forecast/{m['horizon_minutes']}min/{target}", json.dumps(m)) for m in msgs]
+    if batch != 'station':
+        raise ValueError(f"Unbekannter mqtt.batch {batch!r} (erlaubt: {', '.join(BATCH_MODES)})")
+    by_station = {}
+    for m in msgs:
+        by_station.setdefault(m['station_id'], []).append(m)
+    return [(f"{base}/{sid}/forecast/{target}", json.dumps({"station_id": sid, "target": target, "forecasts": ms}))
+            for sid, ms in by_station.items()]
+
+class MqttPublisher:
+    def __init__(self, host: str, port: int, base_topic: str, target: str, qos: int = 1, window: int = 100,
+                 batch: str = 'message', timeout_s: float = 30.0, reconnect_min_s: float = 1,
+                 reconnect_max_s: float = 60, keepalive: int = 60, client_id: str = None):
+        self.base_topic, self.target, self.qos, self.batch = base_topic, target, int(qos), batch
+        self.timeout_s = float(timeout_s)
+        self.reconnects = -1  # erster Connect zählt nicht
+        self._cond = threading.Condition(threading.RLock())
+        self._pending = {}    # mid -> Sendezeitpunkt
+        self._early = {}      # mid -> Ack-Zeitpunkt, falls das Ack vor dem Eintragen in _pending kam
+        self._latency = []
+        self.window = max(1, int(window))
+        self._connected = threading.Event()
+
+        c = self.client = _client(client_id or f"rivercast-{os.getpid()}")
+        c.max_inflight_messages_set(self.window)
+        c.reconnect_delay_set(min_delay=max(1, int(reconnect_min_s)), max_delay=max(1, int(reconnect_max_s)))
+        c.on_connect, c.on_disconnect, c.on_publish = self._on_connect, self._on_disconnect, self._on_publish
+        c.connect_async(host, int(port), int(keepalive))
+        c.loop_start()
+
+    @classmethod
+    def from_config(cls, mqtt_cfg: dict, target: str) -> 'MqttPublisher':
+        keys = ('qos', 'window', 'batch', 'timeout_s', 'reconnect_min_s', 'reconnect_max_s', 'keepalive', 'client_id')
+        return cls(mqtt_cfg.get('host', 'localhost'), mqtt_cfg.get('port', 1883), mqtt_cfg.get('base_topic', '/rivercast'),
+                   target, **{k: mqtt_cfg[k] for k in keys if mqtt_cfg.get(k) is not None})
+
+    # -------------------------------------------------------------- paho-Callbacks (Netzwerk-Thread)
+    def _on_connect(self, client, userdata, flags, rc, *rest):
+        if _rc(rc) == 0:
+            self.reconnects += 1
+            self._connected.set()
+
+    def _on_disconnect(self, client, userdata, *rest):
+        self._connected.clear()
+
+    def _on_publish(self, client, userdata, mid, *rest):
+        with self._cond:
+            t = self._pending.pop(mid, None)
+            if t is None:
+                self._early[mid] = time.perf_counter()
+            else:
+                self._latency.append(time.perf_counter() - t)
+            self._cond.notify_all()
+
+    # -------------------------------------------------------------- Senden
+    def publish(self, msgs: list, batch: str = None) -> dict:
+        """Sendet alle Nachrichten und wartet auf die Acks; liefert Durchsatz-/Latenzstatistik."""
+        items = topic_payloads(msgs, self.base_topic, self.target, batch or self.batch)
+        t0 = time.perf_counter()
+        deadline = t0 + self.timeout_s
+        if not self._connected.wait(self.timeout_s):
+            raise ConnectionError(f"MQTT: keine Verbindung innerhalb {self.timeout_s:.0f} s")
+        with self._cond:
+            self._latency = []
+            self._early.clear()  # z. B. doppelte Acks nach einem Reconnect
+            # bei Timeout offen gebliebene Nachrichten früherer Aufrufe (dort als unacked gezählt) belegen
+            # weder das Fenster noch werden sie hier erneut gewartet oder gezählt
+            self._pending.clear()
+        mine = set()  # mids dieses Aufrufs
+        sent = nbytes = 0
+        for topic, payload in items:
+            # begrenztes Fenster: wartet, bis ältere Nachrichten bestätigt sind
+            with self._cond:
+                if not self._cond.wait_for(lambda: len(self._pending) < self.window,
+                                           timeout=max(deadline - time.perf_counter(), 0)):
+                    break
+            # paho nicht unter self._cond aufrufen: der Netzwerk-Thread hält paho-Locks, während er
+            # _on_publish aufruft (sonst Deadlock durch umgekehrte Lock-Reihenfolge)
+            t = time.perf_counter()
+            info = self.client.publish(topic, payload, qos=self.qos, retain=False)
+            with self._cond:
+                acked = self._early.pop(info.mid, None)
+                if acked is None:
+                    self._pending[info.mid] = t
+                    mine.add(info.mid)
+                else:
+                    self._latency.append(acked - t)
+            sent += 1
+            nbytes += len(payload)
+        with self._cond:
+            self._cond.wait_for(lambda: mine.isdisjoint(self._pending), timeout=max(deadline - time.perf_counter(), 0))
+            unacked = sum(1 for mid in mine if mid in self._pending)
+            lat = np.array(self._latency) * 1e3
+        dt = time.perf_counter() - t0
+        return {"messages": len(items), "sent": sent, "unacked": unacked + len(items) - sent, "bytes": nbytes,
+                "seconds": round(dt, 4), "msgs_per_s": round(sent / max(dt, 1e-9), 1),
+                "latency_ms_p50": round(float(np.percentile(lat, 50)), 3) if len(lat) else None,
+                "latency_ms_p95": round(float(np.percentile(lat, 95)), 3) if len(lat) else None,
+                "latency_ms_max": round(float(lat.max()), 3) if len(lat) else None,
+                "reconnects": max(self.reconnects, 0)}
+
+    def close(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+
+_PUBLISHERS = {}
+
+def get_publisher(mqtt_cfg: dict, target: str) -> MqttPublisher:
+    """Publisher je Prozess und Broker-Konfiguration (bleibt über Zyklen hinweg verbunden)."""
+    key = (json.dumps(mqtt_cfg, sort_keys=True, default=str), target)
+    pub = _PUBLISHERS.get(key)
+    if pub is None:
+        pub = _PUBLISHERS[key] = MqttPublisher.from_config(mqtt_cfg, target)
+        atexit.register(pub.close)
+    return pub
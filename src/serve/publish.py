@@ -1,68 +1,110 @@
 # src/serve/publish.py (mode-aware)
-import pandas as pd, joblib, json, yaml
+import argparse, json
+import numpy as np
+import pandas as pd
 from pathlib import Path
 
-CFG = yaml.safe_load(open('config/config.yaml'))
+from src.config import load_config
+from src.models.artifacts import artifact_dir, load_artifact, predict_horizons, predict_quantiles
+from src.utils import perf, store
+
+CFG = load_config()
 ART = Path('artifacts')
 TARGET = CFG.get('target_col','q_cms')
 H_LIST = CFG.get('horizon_steps_list',[24,48,96])
 MODE = CFG.get('training_mode','global')
+LAYOUT = CFG.get('horizon_layout','per_horizon')
+FEAT = Path('data/processed/feat')
 
-feat = pd.read_parquet('data/processed/feat.parquet').sort_values(['station_id','ts'])
-latest = feat.groupby('station_id',group_keys=False).tail(1).copy()
+def latest_rows(feat: pd.DataFrame) -> pd.DataFrame:
+    feat = feat.sort_values(['station_id','ts'])
+    return feat.groupby('station_id',group_keys=False).tail(1).copy()
 
-msgs=[]
+def make_msg(ts, sid, H, p10, p50, p90) -> dict:
+    return {
+      "ts":str(ts),"station_id":sid,
+      "target":TARGET,"horizon_steps":int(H),"horizon_minutes":int(H)*15,
+      "p10":float(p10),"p50":float(p50),"p90":float(p90)
+    }
 
-def load_meta_features(path):
-    meta = json.loads((path/'meta.json').read_text())
-    return meta['features']
+def build_messages(latest: pd.DataFrame, load=load_artifact) -> list:
+    """
+    Forecast-Nachrichten für die jeweils letzte Zeile je Station.
 
-if MODE=='global':
-    for H in H_LIST:
-        outdir=ART/str(H)
-        features=load_meta_features(outdir)
-        m10=joblib.load(outdir/'model_p10.lgb')
-        m50=joblib.load(outdir/'model_p50.lgb')
-        m90=joblib.load(outdir/'model_p90.lgb')
-        for idx,row in latest.iterrows():
-            x=latest.loc[[idx],features]
-            msg={
-              "ts":str(row['ts']),"station_id":row['station_id'],
-              "target":TARGET,"horizon_steps":int(H),"horizon_minutes":int(H)*15,
-              "p10":float(m10.predict(x)[0]),"p50":float(m50.predict(x)[0]),"p90":float(m90.predict(x)[0])
-            }
-            msgs.append(msg)
-elif MODE=='per_station':
-    for sid,group in latest.groupby('station_id'):
+    global: eine Feature-Matrix aller Stationen je Horizont, ein Modellaufruf je Quantil.
+    per_station: je Station eine Zeile, die für alle Horizonte wiederverwendet wird.
+    horizon_layout 'stacked': die ganze Trajektorie (alle Horizonte) in einem Modellaufruf je Quantil –
+    global für alle Stationen zusammen, per_station je Station.
+    """
+    if LAYOUT=='stacked':
+        return stacked_messages(latest, load)
+    msgs=[]
+    if MODE=='global':
+        ts=latest['ts'].tolist(); sids=latest['station_id'].tolist()
         for H in H_LIST:
-            outdir=ART/sid/str(H)
-            if not outdir.exists(): continue
-            features=load_meta_features(outdir)
-            m10=joblib.load(outdir/'model_p10.lgb')
-            m50=joblib.load(outdir/'model_p50.lgb')
-            m90=joblib.load(outdir/'model_p90.lgb')
-            x=group[features].iloc[[-1]]
-            msg={
-              "ts":str(group['ts'].iloc[-1]),"station_id":sid,
-              "target":TARGET,"horizon_steps":int(H),"horizon_minutes":int(H)*15,
-              "p10":float(m10.predict(x)[0]),"p50":float(m50.predict(x)[0]),"p90":float(m90.predict(x)[0])
-            }
-            msgs.append(msg)
-else:
-    raise SystemExit(f"Unknown training_mode {MODE}")
+            pq=predict_quantiles(load(ART/str(H)),latest)
+            for i in range(len(latest)):
+                msgs.append(make_msg(ts[i],sids[i],H,pq['p10'][i],pq['p50'][i],pq['p90'][i]))
+    elif MODE=='per_station':
+        for sid,group in latest.groupby('station_id'):
+            x=group.iloc[[-1]]
+            for H in H_LIST:
+                outdir=ART/sid/str(H)
+                if not outdir.exists(): continue
+                pq=predict_quantiles(load(outdir),x)
+                msgs.append(make_msg(group['ts'].iloc[-1],sid,H,pq['p10'][0],pq['p50'][0],pq['p90'][0]))
+    else:
+        raise SystemExit(f"Unknown training_mode {MODE}")
+    return msgs
+
+def stacked_messages(latest: pd.DataFrame, load=load_artifact) -> list:
+    ts=latest['ts'].tolist(); sids=latest['station_id'].tolist()
+    if MODE=='global':
+        groups=[(artifact_dir(ART,layout='stacked'),np.arange(len(latest)))]
+    elif MODE=='per_station':
+        groups=[(artifact_dir(ART,sid=sid,layout='stacked'),[i]) for i,sid in enumerate(sids)]
+        groups=[(mdir,idx) for mdir,idx in groups if mdir.exists()]
+    else:
+        raise SystemExit(f"Unknown training_mode {MODE}")
+    msgs=[]
+    for mdir,idx in groups:
+        art=load(mdir)
+        X=latest.iloc[idx][art['features'][:-1]].to_numpy(dtype=np.float64)
+        pq=predict_horizons(art,X,H_LIST)
+        for k,i in enumerate(idx):
+            for j,H in enumerate(H_LIST):
+                msgs.append(make_msg(ts[i],sids[i],H,pq['p10'][k,j],pq['p50'][k,j],pq['p90'][k,j]))
+    return msgs
+
+def publish_mqtt(msgs) -> dict:
+    """Sendet über die dauerhafte Verbindung des Prozesses (src/serve/mqtt_publisher.py) und wartet auf die Acks."""
+    from src.serve.mqtt_publisher import get_publisher
+    stats=get_publisher(CFG['mqtt'],TARGET).publish(msgs)
+    print(f"MQTT: {stats['sent']}/{stats['messages']} Nachrichten in {stats['seconds']:.2f} s "
+          f"({stats['msgs_per_s']:.0f}/s, Ack p50 {stats['latency_ms_p50']} ms, p95 {stats['latency_ms_p95']} ms, "
+          f"offen {stats['unacked']}, Reconnects {stats['reconnects']})")
+    return stats
+
+def main(argv=None):
+    argparse.ArgumentParser(description="Aktuelle Vorhersagen aller Stationen (JSON, optional MQTT)").parse_args(argv)
+    with perf.stage('publish') as st:
+        # je Station nur die jüngste Monatsdatei lesen
+        with st.step('read'):
+            latest = latest_rows(store.read_latest(FEAT))
+        with st.step('predict', rows=len(latest)):
+            msgs = build_messages(latest)
+        st.add_rows(len(msgs))
+
+        with st.step('write'):
+            (ART/'forecast_latest.json').write_text(json.dumps(msgs,indent=2))
+        print(f"Wrote {len(msgs)} forecasts -> {ART/'forecast_latest.json'}")
 
-(ART/'forecast_latest.json').write_text(json.dumps(msgs,indent=2))
-print(f"Wrote {len(msgs)} forecasts -> {ART/'forecast_latest.json'}")
+        if CFG.get('mqtt',{}).get('enabled',False):
+            with st.step('mqtt', rows=len(msgs)):
+                st.extra['mqtt'] = publish_mqtt(msgs)
+            print("Published to MQTT.")
+        else:
+            print("MQTT disabled in config. Only wrote JSON file.")
 
-if CFG.get('mqtt',{}).get('enabled',False):
-    import paho.mqtt.client as mqtt
-    client=mqtt.Client()
-    client.connect(CFG['mqtt']['host'],int(CFG['mqtt']['port']),60)
-    base_topic=CFG['mqtt']['base_topic'].rstrip('/')
-    for msg in msgs:
-        topic=f"{base_topic}/{msg['station_id']}/forecast/{msg['horizon_minutes']}min/{TARGET}"
-        client.publish(topic,json.dumps(msg),qos=1,retain=False)
-    client.disconnect()
-    print("Published to MQTT.")
-else:
-    print("MQTT disabled in config. Only wrote JSON file.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# src/serve/registry.py
+"""
+In-Memory-Modellregistry für den Serving-Prozess.
+
+Hält je Artefakt-Ordner (``artifacts/{H}/``, ``artifacts/{station}/{H}/`` bzw. ``…/stacked/``) die
+geladenen Quantil-Modelle und lädt nur Ordner neu, deren ``meta.json``/``model_*.lgb`` sich geändert haben
+(mtime + Größe). Die Registry ist als ``load``-Funktion für ``publish.build_messages`` verwendbar.
+
+``refresh`` registriert nur Ordner der aktiven Konfiguration (training_mode, quantile_mode,
+horizon_layout, horizon_steps_list): übrig gebliebene Artefakte eines anderen Modus werden weder
+geladen noch behalten.
+"""
+
+import threading
+from pathlib import Path
+
+from src.models.artifacts import artifact_dir, load_artifact, load_meta
+
+def signature(mdir: Path) -> tuple:
+    """Änderungssignatur eines Artefakt-Ordners: (Name, mtime_ns, Größe) je Datei."""
+    files = sorted([mdir/'meta.json', *mdir.glob('model_*.lgb')])
+    sig = []
+    for f in files:
+        try:
+            st = f.stat()
+        except FileNotFoundError:
+            continue
+        sig.append((f.name, st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+def active_config(cfg: dict = None) -> dict:
+    """Modus-Schlüssel der Konfiguration, gegen die meta.json beim Registrieren geprüft wird."""
+    if cfg is None:
+        from src.config import load_config
+        cfg = load_config()
+    return {"mode": cfg.get('training_mode', 'global'), "quantile_mode": cfg.get('quantile_mode', 'independent'),
+            "horizon_layout": cfg.get('horizon_layout', 'per_horizon'),
+            "horizons": [int(H) for H in cfg.get('horizon_steps_list', [24, 48, 96])]}
+
+def is_active(root: Path, mdir: Path, meta: dict, active: dict) -> bool:
+    """True, wenn ``mdir`` ein Artefakt-Ordner der aktiven Konfiguration ist (Pfad und meta.json)."""
+    defaults = {"mode": active['mode'], "quantile_mode": 'independent', "horizon_layout": 'per_horizon'}
+    if any(meta.get(k, d) != active[k] for k, d in defaults.items()):
+        return False
+    layout, H = active['horizon_layout'], meta.get('horizon_steps')
+    if layout == 'per_horizon' and H not in active['horizons']:
+        return False
+    if layout == 'stacked' and not set(active['horizons']) <= set(meta.get('horizons', [])):
+        return False
+    sid = meta.get('station_id') if active['mode'] == 'per_station' else None
+    return mdir == artifact_dir(root, H, sid, layout)
+
+class ModelRegistry:
+    def __init__(self, root: Path = Path('artifacts'), load=load_artifact, active: dict = None):
+        self.root = Path(root)
+        self._load = load
+        self.active = active or active_config()
+        self._entries = {}  # Ordner -> (Signatur, Artefakt)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __call__(self, mdir: Path) -> dict:
+        return self.get(mdir)
+
+    def get(self, mdir: Path) -> dict:
+        """Artefakt aus dem Cache; (neu) laden, falls unbekannt oder geändert."""
+        mdir = Path(mdir)
+        sig = signature(mdir)
+        with self._lock:
+            hit = self._entries.get(mdir)
+            if hit is not None and hit[0] == sig:
+                return hit[1]
+        art = self._load(mdir)
+        with self._lock:
+            self._entries[mdir] = (sig, art)
+        return art
+
+    def refresh(self) -> dict:
+        """
+        Scannt ``root`` nach Artefakt-Ordnern der aktiven Konfiguration, lädt geänderte neu und entfernt
+        gelöschte sowie inaktive (``stats['inactive']``: übersprungene Ordner anderer Modi).
+        """
+        found = set()
+        stats = {"loaded": 0, "unchanged": 0, "removed": 0, "failed": 0, "inactive": 0}
+        for mdir in sorted(p.parent for p in self.root.rglob('meta.json')):
+            try:
+                meta = load_meta(mdir)
+            except (OSError, ValueError) as e:  # halb geschriebene meta.json: alten Stand behalten
+                print(f"[WARN] meta.json nicht lesbar {mdir}: {e}")
+                if mdir in self._entries:
+                    found.add(mdir)
+                stats["failed"] += 1
+                continue
+            if not is_active(self.root, mdir, meta, self.active):
+                stats["inactive"] += 1
+                continue
+            found.add(mdir)
+            sig = signature(mdir)
+            hit = self._entries.get(mdir)
+            if hit is not None and hit[0] == sig:
+                stats["unchanged"] += 1
+                continue
+            try:
+                art = self._load(mdir)
+            except Exception as e:  # halb geschriebene Artefakte: alten Stand behalten
+                print(f"[WARN] Laden fehlgeschlagen {mdir}: {e}")
+                stats["failed"] += 1
+                continue
+            with self._lock:
+                self._entries[mdir] = (sig, art)
+            stats["loaded"] += 1
+        with self._lock:
+            for mdir in set(self._entries) - found:
+                del self._entries[mdir]
+                stats["removed"] += 1
+        return stats
@@ -0,0 +1,149 @@
+# src/serve/server.py
+"""
+Residenter Forecast-Server mit In-Memory-Modellregistry.
+
+Statt bei jedem Lauf Config, feat.parquet und alle Modelle neu zu laden (python -m src.serve.publish),
+hält dieser Prozess die Modelle im Speicher, lädt nur geänderte Artefakt-Ordner nach und rechnet
+alle ``interval`` Sekunden einen Zyklus (JSON-Datei + optional MQTT wie bisher).
+Anfragen werden aus dem letzten Zyklus im Speicher beantwortet.
+
+Nutzung:
+  python -m src.serve.server --host 127.0.0.1 --port 8080 --interval 900
+
+Endpunkte:
+  GET  /forecast?station=ERFT_001&horizon=720&target=h_cm   # alle Filter optional, horizon in Minuten
+  GET  /health
+  POST /reload                                              # sofortiger Zyklus
+"""
+
+import argparse, json, threading, time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+
+from src.serve.publish import CFG, ART, FEAT, build_messages, latest_rows, publish_mqtt
+from src.serve.registry import ModelRegistry
+from src.utils import perf, store
+
+class ForecastService:
+    def __init__(self, registry: ModelRegistry, feat_path: Path = FEAT):
+        self.registry = registry
+        self.feat_path = Path(feat_path)
+        self._feat_sig = None
+        self._latest = None
+        self._lock = threading.Lock()
+        self.msgs, self.by_station = [], {}
+        self.last_cycle = None
+
+    def _latest_rows(self) -> pd.DataFrame:
+        # Features nur neu lesen, wenn der Store sich geändert hat
+        sig = store.signature(self.feat_path)
+        if sig != self._feat_sig:
+            self._latest = latest_rows(store.read_latest(self.feat_path))
+            self._feat_sig = sig
+        return self._latest
+
+    def cycle(self, publish: bool = True) -> dict:
+        """Registry-Refresh, Vorhersage aller Stationen/Horizonte, JSON schreiben, optional MQTT."""
+        with self._lock, perf.stage('serve_cycle') as st:
+            t0 = time.perf_counter()
+            with st.step('refresh'):
+                stats = self.registry.refresh()
+            with st.step('read'):
+                latest = self._latest_rows()
+            with st.step('predict', rows=len(latest)):
+                msgs = build_messages(latest, load=self.registry)
+            st.add_rows(len(msgs))
+            by_station = {}
+            for m in msgs:
+                by_station.setdefault(m['station_id'], []).append(m)
+            self.msgs, self.by_station = msgs, by_station
+            self.last_cycle = datetime.now(timezone.utc).isoformat()
+            (ART/'forecast_latest.json').write_text(json.dumps(msgs,indent=2))
+            if publish and CFG.get('mqtt',{}).get('enabled',False):
+                with st.step('mqtt', rows=len(msgs)):
+                    st.extra['mqtt'] = publish_mqtt(msgs)
+            st.extra['registry'] = dict(stats)
+            stats.update(forecasts=len(msgs), seconds=round(time.perf_counter()-t0, 3))
+            return stats
+
+    def query(self, station=None, horizon_minutes=None, target=None) -> list:
+        msgs = self.by_station.get(station, []) if station else self.msgs
+        if horizon_minutes is not None:
+            msgs = [m for m in msgs if m['horizon_minutes'] == horizon_minutes]
+        if target:
+            msgs = [m for m in msgs if m['target'] == target]
+        return msgs
+
+    def health(self) -> dict:
+        return {"models": len(self.registry), "stations": len(self.by_station),
+                "forecasts": len(self.msgs), "last_cycle": self.last_cycle}
+
+def make_handler(service: ForecastService):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code: int, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path == '/forecast':
+                try:
+                    hz = int(q['horizon']) if 'horizon' in q else None
+                except ValueError:
+                    return self._send(400, {"error": "horizon muss eine Zahl (Minuten) sein"})
+                return self._send(200, service.query(q.get('station'), hz, q.get('target')))
+            if url.path == '/health':
+                return self._send(200, service.health())
+            self._send(404, {"error": f"unbekannter Pfad {url.path}"})
+
+        def do_POST(self):
+            if urlparse(self.path).path == '/reload':
+                try:
+                    return self._send(200, service.cycle())
+                except Exception as e:  # wie im Hintergrund-Zyklus: melden, Server läuft weiter
+                    print(f"[WARN] Zyklus (/reload) fehlgeschlagen: {e}")
+                    return self._send(500, {"error": f"Zyklus fehlgeschlagen: {e}"})
+            self._send(404, {"error": f"unbekannter Pfad {self.path}"})
+
+        def log_message(self, fmt, *args):
+            pass
+    return Handler
+
+def run_cycles(service: ForecastService, interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            print(f"[CYCLE] {service.cycle()}")
+        except Exception as e:  # Server läuft weiter, nächster Zyklus versucht es erneut
+            print(f"[WARN] Zyklus fehlgeschlagen: {e}")
+
+def main(argv=None):
+    scfg = CFG.get('serve', {})
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", type=str, default=scfg.get('host', '127.0.0.1'))
+    ap.add_argument("--port", type=int, default=int(scfg.get('port', 8080)))
+    ap.add_argument("--interval", type=float, default=float(scfg.get('interval_s', 900)), help="Sekunden zwischen Zyklen")
+    args = ap.parse_args(argv)
+
+    service = ForecastService(ModelRegistry(ART))
+    print(f"[CYCLE] {service.cycle()}")
+    threading.Thread(target=run_cycles, args=(service, args.interval), daemon=True).start()
+
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"Serving forecasts on http://{args.host}:{args.port}/forecast")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
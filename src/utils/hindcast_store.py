@@ -0,0 +1,219 @@
+# src/utils/hindcast_store.py
+"""
+Konsolidierter Hindcast-Speicher: eine Parquet-Datei je Horizont statt einer je Station × Horizont.
+
+Layout (Hive-Partitionierung nach Horizont, eine Row Group je Station, nach ts sortiert):
+  data/processed/hindcast/horizon=48/part-0.parquet
+
+Der Footer jeder Datei enthält einen Index (Station -> Row Group, Zeilen, SHA-256 der Reihe), so
+dass Stations-/Horizont-Ausschnitte ohne Verzeichnis-Globbing und ohne Lesen fremder Row Groups
+geladen werden. Leser kommen ohne pandas aus (schneller Kaltstart für Plots); das alte Layout
+``hindcast_{station}_{H}.parquet`` wird weiterhin gelesen und lässt sich mit ``export_files``
+erzeugen.
+
+  from src.utils import hindcast_store as hs
+  hs.read_frame('data/processed/hindcast', stations=['ERFT_001'], horizons=[48], start='2025-09-01')
+  for s in hs.series_index('data/processed/hindcast'): t = hs.read_series(s)
+"""
+
+import hashlib, json, os
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PART_FILE = 'part-0.parquet'
+INDEX_KEY = b'rivercast.hindcast_index'
+COLUMNS = ['ts', 'station_id', 'horizon_steps', 'horizon_minutes', 'p10', 'p50', 'p90', 'y_true']
+
+def _horizon_file(root: Path, H: int) -> Path:
+    return Path(root) / f"horizon={int(H)}" / PART_FILE
+
+def is_store(root: Path) -> bool:
+    return any(Path(root).glob(f'horizon=*/{PART_FILE}'))
+
+def list_horizons(root: Path) -> list:
+    return sorted(int(p.parent.name.split('=', 1)[1]) for p in Path(root).glob(f'horizon=*/{PART_FILE}'))
+
+def _buffer(a, dtype) -> np.ndarray:
+    dtype = np.dtype(dtype)
+    return np.frombuffer(a.buffers()[1], dtype=dtype, count=len(a), offset=a.offset * dtype.itemsize)
+
+def to_numpy(a) -> np.ndarray:
+    """Arrow-Spalte als NumPy-Array; pyarrows to_numpy() importiert pandas, daher direkt aus dem Datenpuffer."""
+    import pyarrow.compute as pc
+    a = a.combine_chunks() if isinstance(a, pa.ChunkedArray) else a
+    if pa.types.is_timestamp(a.type):
+        return _buffer(a.cast(pa.int64()), np.int64).view(f'datetime64[{a.type.unit}]')
+    if pa.types.is_integer(a.type) and a.null_count == 0:
+        return _buffer(a, str(a.type))
+    if pa.types.is_integer(a.type) or pa.types.is_floating(a.type):
+        a = a.cast(pa.float64())
+        return _buffer(pc.fill_null(a, float('nan')) if a.null_count else a, np.float64)
+    return np.array(a.to_pylist(), dtype=object)
+
+def to_columns(t: pa.Table) -> dict:
+    """Tabelle als Dict von NumPy-Spalten (ohne pandas-Index-Spalten)."""
+    return {c: to_numpy(t.column(c)) for c in t.column_names if not c.startswith('__index_level_')}
+
+def series_hash(t: pa.Table) -> str:
+    h = hashlib.sha256()
+    for c in ('ts', 'p10', 'p50', 'p90', 'y_true'):
+        if c in t.column_names:
+            h.update(np.ascontiguousarray(to_numpy(t.column(c))).tobytes())
+    return h.hexdigest()
+
+# ---------------------------------------------------------------- Schreiben
+
+def write_horizon(df, root: Path, H: int):
+    """
+    Schreibt alle Reihen eines Horizonts (ersetzt die Datei atomar). Stationen, die schon in der
+    Datei stehen, aber nicht in ``df`` vorkommen, bleiben erhalten.
+    """
+    import pandas as pd
+    path = _horizon_file(root, H)
+    df = df[[c for c in COLUMNS if c in df.columns]]
+    if path.exists():
+        old = pq.read_table(path).to_pandas()
+        old = old[~old['station_id'].isin(df['station_id'].unique())]
+        df = pd.concat([old[df.columns], df], ignore_index=True)
+    df = df.sort_values(['station_id', 'ts'], kind='stable', ignore_index=True)
+
+    if not len(df):
+        return path
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tables, index = [], {}
+    sid = df['station_id'].to_numpy()
+    cut = np.flatnonzero(sid[1:] != sid[:-1]) + 1
+    for i, (a, b) in enumerate(zip(np.r_[0, cut], np.r_[cut, len(df)])):
+        t = table.slice(a, b - a)
+        index[str(sid[a])] = {"row_group": i, "rows": int(b - a), "sha256": series_hash(t)}
+        tables.append(t)
+
+    schema = table.schema.with_metadata({**(table.schema.metadata or {}), INDEX_KEY: json.dumps(index).encode('utf-8')})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(PART_FILE + '.tmp')
+    with pq.ParquetWriter(tmp, schema) as w:
+        for t in tables:
+            w.write_table(t.replace_schema_metadata(schema.metadata), row_group_size=max(t.num_rows, 1))
+    os.replace(tmp, path)
+    return path
+
+def write_hindcast(df, root: Path) -> list:
+    """Schreibt einen Frame mit beliebig vielen Horizonten (Spalte horizon_steps)."""
+    return [write_horizon(g, root, H) for H, g in df.groupby('horizon_steps', sort=True)]
+
+def export_files(root: Path, outdir: Path, stations=None, horizons=None) -> list:
+    """Kompatibilitäts-Export in das alte Layout hindcast_{station}_{H}.parquet."""
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for s in series_index(root, stations, horizons):
+        fout = outdir / f"hindcast_{s['station_id']}_{s['horizon']}.parquet"
+        t = read_series(s)
+        t = t.replace_schema_metadata({k: v for k, v in (t.schema.metadata or {}).items() if k != INDEX_KEY})
+        pq.write_table(t, fout)
+        written.append(fout)
+    return written
+
+# ---------------------------------------------------------------- Lesen
+
+@lru_cache(maxsize=16)
+def _open(path: Path, mtime_ns: int) -> pq.ParquetFile:
+    # Footer (inkl. Index) je Datei einmal parsen; mtime_ns invalidiert nach Neuschreiben
+    return pq.ParquetFile(path)
+
+def _parquet(path: Path) -> pq.ParquetFile:
+    return _open(Path(path), Path(path).stat().st_mtime_ns)
+
+def _index(path: Path) -> dict:
+    pf = _parquet(path)
+    meta = pf.schema_arrow.metadata or {}
+    if INDEX_KEY in meta:
+        return json.loads(meta[INDEX_KEY])
+    # Datei ohne Index: Stationen aus den Row-Group-Statistiken
+    md = pf.metadata
+    col = md.schema.names.index('station_id')
+    out = {}
+    for i in range(md.num_row_groups):
+        st = md.row_group(i).column(col).statistics
+        out[str(st.min)] = {"row_group": i, "rows": md.row_group(i).num_rows, "sha256": None}
+    return out
+
+def _legacy_files(root: Path) -> list:
+    out = []
+    for f in sorted(Path(root).glob('hindcast_*.parquet')):
+        parts = f.stem.split('_')
+        try:
+            out.append(("_".join(parts[1:-1]), int(parts[-1]), f))
+        except ValueError:
+            continue
+    return out
+
+def series_index(root: Path, stations=None, horizons=None) -> list:
+    """
+    Verfügbare Reihen als Liste von Dicts (station_id, horizon, path, row_group, rows, sha256, mtime),
+    sortiert nach Horizont und Station. Für das alte Layout sind row_group/rows/sha256 None.
+    """
+    root = Path(root)
+    wanted = None if stations is None else {str(s) for s in stations}
+    hz = None if horizons is None else {int(h) for h in horizons}
+    out = []
+    if is_store(root):
+        for H in list_horizons(root):
+            if hz is not None and H not in hz:
+                continue
+            path = _horizon_file(root, H)
+            mtime = path.stat().st_mtime
+            for sid, e in sorted(_index(path).items()):
+                if wanted is None or sid in wanted:
+                    out.append({"station_id": sid, "horizon": H, "path": path, "mtime": mtime, **e})
+    else:
+        for sid, H, f in _legacy_files(root):
+            if (wanted is None or sid in wanted) and (hz is None or H in hz):
+                out.append({"station_id": sid, "horizon": H, "path": f, "mtime": f.stat().st_mtime,
+                            "row_group": None, "rows": None, "sha256": None})
+        out.sort(key=lambda s: (s['horizon'], s['station_id']))
+    return out
+
+def read_series(s: dict, columns=None) -> pa.Table:
+    """Eine Reihe aus ``series_index`` (nur deren Row Group bzw. Datei)."""
+    pf = _parquet(s['path']) if s.get('row_group') is not None else pq.ParquetFile(s['path'])
+    if columns is not None:
+        columns = [c for c in columns if c in pf.schema_arrow.names]
+    if s.get('row_group') is None:
+        return pf.read(columns=columns)
+    return pf.read_row_group(s['row_group'], columns=columns)
+
+def _ts_scalar(t, typ):
+    if not isinstance(t, datetime):
+        t = datetime.fromisoformat(str(t))
+    if t.tzinfo is None and typ.tz is not None:
+        t = t.replace(tzinfo=timezone.utc)
+    return pa.scalar(t, type=typ)
+
+def read_table(root: Path, stations=None, horizons=None, start=None, end=None, columns=None) -> pa.Table:
+    """Ausschnitt als Arrow-Tabelle (start inklusiv, end exklusiv); liest nur die betroffenen Row Groups."""
+    import pyarrow.compute as pc
+    need = None if columns is None else list(dict.fromkeys([*columns, *(['ts'] if start or end else [])]))
+    parts = [read_series(s, need) for s in series_index(root, stations, horizons)]
+    if not parts:
+        return pa.table({c: [] for c in (columns or COLUMNS)})
+    t = pa.concat_tables([p.drop([c for c in p.column_names if c.startswith('__index_level_')]) for p in parts])
+    if start is not None or end is not None:
+        typ = t.schema.field('ts').type
+        mask = None
+        if start is not None:
+            mask = pc.greater_equal(t['ts'], _ts_scalar(start, typ))
+        if end is not None:
+            m = pc.less(t['ts'], _ts_scalar(end, typ))
+            mask = m if mask is None else pc.and_(mask, m)
+        t = t.filter(mask)
+    return t.select(columns) if columns is not None else t
+
+def read_frame(root: Path, stations=None, horizons=None, start=None, end=None, columns=None):
+    """Wie ``read_table``, als DataFrame (nach Horizont, Station, ts sortiert)."""
+    return read_table(root, stations, horizons, start, end, columns).to_pandas()
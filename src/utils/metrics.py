@@ -1,15 +1,133 @@
+# src/utils/metrics.py
+"""
+Skill-Metriken (MAE, RMSE, NSE, KGE, Coverage p10–p90, Pinball-Loss) als Segment-Reduktionen.
+
+``grouped_scores`` bewertet beliebig viele Gruppen (z. B. Station × Horizont) in einem Aufruf: die
+Zeilen werden einmal nach den Schlüsseln sortiert, alle Summen entstehen per ``np.add.reduceat``.
+Paare mit NaN werden ignoriert; NSE/KGE sind NaN bei Varianz 0 bzw. Mittelwert 0 (statt inf und
+Laufzeitwarnungen). ``rmse``/``nse``/``kge``/``mae``/``coverage``/``pinball`` sind die Ein-Gruppen-Fälle.
+
+  from src.utils.metrics import score_frame
+  score_frame(hindcast_df)   # eine Zeile je station_id × horizon_steps
+"""
+
 import numpy as np
 
-def rmse(y_true, y_pred):
-    return float(np.sqrt(np.mean((np.array(y_true) - np.array(y_pred))**2)))
+QUANTILE_ALPHAS = {'p10': 0.10, 'p50': 0.50, 'p90': 0.90}
+NOMINAL_COVERAGE = QUANTILE_ALPHAS['p90'] - QUANTILE_ALPHAS['p10']
+# Relative Toleranz, unterhalb der eine (zentrierte) Quadratsumme als Varianz 0 gilt
+ZERO_VAR_RTOL = 1e-12
+
+def _segments(keys, n: int):
+    """Sortierreihenfolge (None = bereits gruppiert), Gruppenstarts, Gruppen-ID je Zeile und Schlüssel je Gruppe."""
+    if keys is None:
+        return None, np.zeros(1 if n else 0, dtype=np.intp), np.zeros(n, dtype=np.intp), []
+    keys = [np.asarray(k) for k in (keys if isinstance(keys, (list, tuple)) else [keys])]
+    change = np.zeros(n, dtype=bool)
+    change[:1] = True
+    for k in keys:
+        change[1:] |= k[1:] != k[:-1]
+    order, starts = None, np.flatnonzero(change)
+    if len(starts) > 1:
+        # Läufe gleicher Schlüssel sortieren; kommt ein Schlüssel in mehreren Läufen vor, ist die
+        # stabile Zeilenreihenfolge die der sortierten Läufe (kein Sortieren aller Zeilen nötig)
+        run = np.lexsort([k[starts] for k in keys[::-1]])
+        dup = np.ones(len(run) - 1, dtype=bool)
+        for k in keys:
+            rk = k[starts[run]]
+            dup &= rk[1:] == rk[:-1]
+        if dup.any():
+            lens = np.diff(np.append(starts, n))[run]
+            order = np.repeat(starts[run] - (np.cumsum(lens) - lens), lens) + np.arange(n)
+            keys = [k[order] for k in keys]
+            change[1:] = False
+            for k in keys:
+                change[1:] |= k[1:] != k[:-1]
+    starts = np.flatnonzero(change)
+    return order, starts, np.cumsum(change) - 1, [k[starts] for k in keys]
+
+def grouped_scores(keys, y, p50, p10=None, p90=None) -> dict:
+    """
+    Metriken je Gruppe. ``keys``: Array oder Liste von Arrays (z. B. [station_id, horizon_steps]),
+    None = eine Gruppe. Liefert {'keys': [...], 'n', 'MAE', 'RMSE', 'NSE', 'KGE', 'pinball_p50'} und,
+    falls p10/p90 gegeben, 'coverage', 'crossing', 'pinball_p10', 'pinball_p90' – jeweils ein Array je Gruppe.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    order, starts, gid, group_keys = _segments(keys, n)
+    take = lambda a: np.asarray(a, dtype=np.float64) if order is None else np.asarray(a, dtype=np.float64)[order]
+    y, f = take(y), take(p50)
+    valid = ~(np.isnan(y) | np.isnan(f))
+
+    def seg(a, mask=valid):
+        return np.add.reduceat(np.where(mask, a, 0.0), starts) if len(starts) else np.zeros(0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cnt = seg(np.ones(n))
+        my, mf = seg(y) / cnt, seg(f) / cnt
+        # zentriert gegen Auslöschung in Σy² − (Σy)²/n
+        yc, fc = y - my[gid], f - mf[gid]
+        vy, vf, cov = seg(yc * yc), seg(fc * fc), seg(yc * fc)
+        err = y - f
+        zero_y = vy <= ZERO_VAR_RTOL * seg(y * y)
+        zero_f = vf <= ZERO_VAR_RTOL * seg(f * f)
+        r = np.clip(np.where(zero_y | zero_f | (cnt < 2), np.nan, cov / np.sqrt(vy * vf)), -1.0, 1.0)
+        alpha = np.where(zero_y, np.nan, np.sqrt(vf / vy))
+        beta = np.where(my == 0, np.nan, mf / my)
+        out = {
+            "keys": group_keys, "n": cnt.astype(np.int64),
+            "MAE": seg(np.abs(err)) / cnt,
+            "RMSE": np.sqrt(seg(err * err) / cnt),
+            "NSE": np.where(zero_y, np.nan, 1 - seg(err * err) / vy),
+            "KGE": 1 - np.sqrt((r - 1) ** 2 + (alpha - 1) ** 2 + (beta - 1) ** 2),
+        }
+        quantiles = {'p50': f}
+        if p10 is not None and p90 is not None:
+            lo, hi = take(p10), take(p90)
+            ok = valid & ~(np.isnan(lo) | np.isnan(hi))
+            out["coverage"] = seg((y >= lo) & (y <= hi), ok) / seg(np.ones(n), ok)
+            # Anteil gekreuzter Quantile (p10 > p50 oder p50 > p90)
+            out["crossing"] = seg((lo > f) | (f > hi), ok) / seg(np.ones(n), ok)
+            quantiles.update(p10=lo, p90=hi)
+        for q, pred in quantiles.items():
+            ok = valid & ~np.isnan(pred)
+            d = y - pred
+            a = QUANTILE_ALPHAS[q]
+            out[f"pinball_{q}"] = seg(np.maximum(a * d, (a - 1) * d), ok) / seg(np.ones(n), ok)
+    return out
+
+def scores(y, yhat) -> dict:
+    """MAE/RMSE/NSE/KGE eines Datensatzes als floats (z. B. CV-Bewertung im Training)."""
+    s = grouped_scores(None, y, yhat)
+    return {k: float(s[k][0]) if len(s[k]) else float('nan') for k in ('MAE', 'RMSE', 'NSE', 'KGE')}
+
+def score_frame(df, by=('station_id', 'horizon_steps'), y='y_true'):
+    """Metriken je Gruppe eines Hindcast-Frames (Spalten p50, optional p10/p90) in einem Aufruf."""
+    import pandas as pd
+    by = [c for c in by if c in df.columns]
+    s = grouped_scores([df[c].to_numpy() for c in by] or None, df[y].to_numpy(), df['p50'].to_numpy(),
+                       df['p10'].to_numpy() if 'p10' in df.columns else None,
+                       df['p90'].to_numpy() if 'p90' in df.columns else None)
+    keys = s.pop('keys')
+    return pd.DataFrame({**dict(zip(by, keys)), **s})
+
+def _one(y, yhat, key) -> float:
+    v = grouped_scores(None, y, yhat)[key]
+    return float(v[0]) if len(v) else float('nan')
+
+def mae(y_true, y_pred): return _one(y_true, y_pred, 'MAE')
+def rmse(y_true, y_pred): return _one(y_true, y_pred, 'RMSE')
+def nse(y_true, y_pred): return _one(y_true, y_pred, 'NSE')
+def kge(y_true, y_pred): return _one(y_true, y_pred, 'KGE')
 
-def nse(y_true, y_pred):
-    y_true, y_pred = np.array(y_true), np.array(y_pred)
-    return 1 - np.sum((y_true - y_pred)**2) / np.sum((y_true - np.mean(y_true))**2)
+def coverage(y, p10, p90) -> float:
+    """Anteil der Beobachtungen in [p10, p90]."""
+    y, lo, hi = (np.asarray(a, dtype=np.float64) for a in (y, p10, p90))
+    ok = ~(np.isnan(y) | np.isnan(lo) | np.isnan(hi))
+    return float(np.mean((y[ok] >= lo[ok]) & (y[ok] <= hi[ok]))) if ok.any() else float('nan')
 
-def kge(y_true, y_pred):
-    y_true, y_pred = np.array(y_true), np.array(y_pred)
-    r = np.corrcoef(y_true, y_pred)[0,1]
-    alpha = np.std(y_pred)/np.std(y_true)
-    beta = np.mean(y_pred)/np.mean(y_true)
-    return 1 - np.sqrt((r-1)**2 + (alpha-1)**2 + (beta-1)**2)
+def pinball(y_true, q_pred, alpha: float) -> float:
+    """Mittlerer Quantil-(Pinball-)Verlust zum Niveau ``alpha``."""
+    d = np.asarray(y_true, dtype=np.float64) - np.asarray(q_pred, dtype=np.float64)
+    ok = ~np.isnan(d)
+    return float(np.mean(np.maximum(alpha * d[ok], (alpha - 1) * d[ok]))) if ok.any() else float('nan')
@@ -0,0 +1,192 @@
+# src/utils/perf.py
+"""
+Leichtgewichtige Instrumentierung der Pipeline-Stufen.
+
+  with perf.stage('qc') as st:          # oder @perf.timed('qc')
+      with st.step('read'):
+          df = ...
+      st.add_rows(len(df))
+
+Je Stufe entsteht ``<perf.dir>/perf_<stage>.json`` mit Wall-/CPU-Zeit, Zeilen, Durchsatz, Peak-RSS
+(Abtastung von /proc/self/statm im Hintergrund, sonst ru_maxrss), optional tracemalloc-Peak und
+cProfile-Dump (``perf_<stage>.prof``). Mit ``perf.prometheus`` wird zusätzlich eine Datei im
+Prometheus-Textformat aus allen perf_*.json erzeugt (z. B. für den node_exporter-Textfile-Collector).
+Optionen stehen unter ``perf:`` in config/config.yaml.
+"""
+
+import functools, json, os, sys, threading, time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+DEFAULTS = {"dir": "artifacts", "tracemalloc": False, "profile": False, "prometheus": None}
+_SAMPLE_S = 0.05
+
+def peak_rss_mb():
+    """Peak Resident Set Size des Prozesses in MiB (None, wenn nicht ermittelbar, z. B. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KiB, macOS: Bytes
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+def current_rss_mb():
+    """Aktuelle RSS in MiB (Linux /proc), sonst None."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+def options() -> dict:
+    from src.config import load_config
+    try:
+        cfg = load_config()
+    except OSError:
+        cfg = {}
+    return {**DEFAULTS, **(cfg.get('perf') or {})}
+
+class _RssSampler(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = current_rss_mb()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(_SAMPLE_S):
+            rss = current_rss_mb()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        rss = current_rss_mb()
+        return max(self.peak, rss) if rss is not None else self.peak
+
+class Stage:
+    """Messung einer Stufe; schreibt beim Verlassen perf_<name>.json (siehe Modul-Docstring)."""
+
+    def __init__(self, name: str, **opts):
+        self.name = name
+        self.opts = {**options(), **{k: v for k, v in opts.items() if v is not None}}
+        self.rows = 0
+        self.steps = {}
+        self.extra = {}
+        self.result = None
+
+    def add_rows(self, n: int):
+        self.rows += int(n)
+
+    @contextmanager
+    def step(self, name: str, rows: int = 0):
+        """Teilzeit innerhalb der Stufe; wiederholte Aufrufe summieren sich (``s['rows'] += n`` im Block)."""
+        s = self.steps.setdefault(name, {"seconds": 0.0, "rows": 0})
+        s['rows'] += int(rows)
+        t0 = time.perf_counter()
+        try:
+            yield s
+        finally:
+            s['seconds'] += time.perf_counter() - t0
+
+    def __enter__(self):
+        self._started = datetime.now(timezone.utc)
+        self._sampler = _RssSampler() if current_rss_mb() is not None else None
+        if self._sampler:
+            self._sampler.start()
+        self._trace = False
+        if self.opts['tracemalloc']:
+            import tracemalloc
+            # verschachtelte Stufen messen innerhalb der äußeren Messung mit
+            self._trace = not tracemalloc.is_tracing()
+            if self._trace:
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+        self._prof = None
+        if self.opts['profile']:
+            import cProfile
+            self._prof = cProfile.Profile()
+            self._prof.enable()
+        self._cpu0, self._t0 = time.process_time(), time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._t0
+        cpu = time.process_time() - self._cpu0
+        out = Path(self.opts['dir'])
+        out.mkdir(parents=True, exist_ok=True)
+        rec = {
+            "stage": self.name, "started": self._started.isoformat(), "ok": exc_type is None,
+            "seconds": round(seconds, 6), "cpu_seconds": round(cpu, 6), "rows": self.rows,
+            "rows_per_s": round(self.rows / seconds, 1) if self.rows and seconds > 0 else None,
+            "peak_rss_mb": round(self._sampler.stop(), 1) if self._sampler else peak_rss_mb(),
+            "steps": {k: {"seconds": round(v['seconds'], 6), "rows": v['rows']} for k, v in self.steps.items()},
+        }
+        if self._prof is not None:
+            self._prof.disable()
+            prof = out/f"perf_{self.name}.prof"
+            self._prof.dump_stats(prof)
+            rec['profile'] = str(prof)
+        if self.opts['tracemalloc']:
+            import tracemalloc
+            rec['tracemalloc_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+            if self._trace:
+                tracemalloc.stop()
+        rec.update(self.extra)
+        self.result = rec
+        (out/f"perf_{self.name}.json").write_text(json.dumps(rec, indent=2), encoding='utf-8')
+        if self.opts['prometheus']:
+            write_prometheus(out, Path(self.opts['prometheus']))
+        return False
+
+def stage(name: str, **opts) -> Stage:
+    return Stage(name, **opts)
+
+def timed(name: str, **opts):
+    """Dekorator: misst den Aufruf als Stufe ``name``; Zeilen = len(Rückgabe), falls vorhanden."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with Stage(name, **opts) as st:
+                res = fn(*args, **kwargs)
+                if hasattr(res, '__len__'):
+                    st.add_rows(len(res))
+                return res
+        return wrapper
+    return deco
+
+PROM_METRICS = (
+    ("seconds", "rivercast_stage_seconds", "Wall-clock seconds of the last run"),
+    ("cpu_seconds", "rivercast_stage_cpu_seconds", "CPU seconds of the last run"),
+    ("rows", "rivercast_stage_rows", "Rows processed in the last run"),
+    ("peak_rss_mb", "rivercast_stage_peak_rss_bytes", "Peak resident set size during the last run"),
+    ("started", "rivercast_stage_last_run_timestamp_seconds", "Start of the last run (unix time)"),
+)
+
+def write_prometheus(perf_dir: Path, path: Path):
+    """Alle perf_*.json eines Verzeichnisses als Gauges im Prometheus-Textformat (atomar ersetzt)."""
+    recs = []
+    for f in sorted(Path(perf_dir).glob('perf_*.json')):
+        try:
+            recs.append(json.loads(f.read_text(encoding='utf-8')))
+        except (OSError, ValueError):
+            continue
+    lines = []
+    for key, metric, help_ in PROM_METRICS:
+        lines += [f"# HELP {metric} {help_}", f"# TYPE {metric} gauge"]
+        for r in recs:
+            v = r.get(key)
+            if v is None:
+                continue
+            if key == 'peak_rss_mb':
+                v = int(v * 2**20)
+            elif key == 'started':
+                v = datetime.fromisoformat(v).timestamp()
+            lines.append(f'{metric}{{stage="{r["stage"]}"}} {v}')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    tmp.write_text("\n".join(lines) + "\n", encoding='utf-8')
+    os.replace(tmp, path)
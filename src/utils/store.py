@@ -0,0 +1,183 @@
+# src/utils/store.py
+"""
+Partitionierter Parquet-Speicher für die Pipeline-Stufen (all / clean / feat).
+
+Layout (Hive-Partitionierung nach Station und Monat, Dateien nach ts sortiert):
+  data/processed/feat/station=ERFT_001/month=2025-09/part-0.parquet
+
+Leser unterstützen Spaltenprojektion, Stationsfilter und Zeitbereiche; Station und Monat
+werden über die Verzeichnisse ausgewählt, der Zeitbereich zusätzlich über die
+Row-Group-Statistiken der Dateien. Einzeldateien (``*.parquet``, altes Layout) werden
+weiterhin gelesen.
+"""
+
+import shutil
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+PARTITIONING = ds.partitioning(pa.schema([('station', pa.string()), ('month', pa.string())]), flavor='hive')
+PART_FILE = 'part-0.parquet'
+
+def _month(ts: pd.Series) -> pd.Series:
+    return ts.dt.strftime('%Y-%m')
+
+def _part_dir(root: Path, sid: str, month: str) -> Path:
+    return root / f"station={quote(str(sid), safe='')}" / f"month={month}"
+
+def _write_part(g: pd.DataFrame, path: Path):
+    path.mkdir(parents=True, exist_ok=True)
+    tmp = path / (PART_FILE + '.tmp')
+    pq.write_table(pa.Table.from_pandas(g.sort_values('ts'), preserve_index=False), tmp)
+    tmp.replace(path / PART_FILE)
+
+def write_dataset(df: pd.DataFrame, root: Path):
+    """Schreibt den Frame vollständig neu (Station × Monat); ersetzt einen vorhandenen Stand."""
+    root = Path(root)
+    tmp = root.with_name(root.name + '.tmp')
+    shutil.rmtree(tmp, ignore_errors=True)
+    df = df[df['station_id'].notna()]
+    for (sid, month), g in df.groupby([df['station_id'], _month(df['ts'])], sort=True):
+        _write_part(g, _part_dir(tmp, sid, month))
+    tmp.mkdir(parents=True, exist_ok=True)
+    shutil.rmtree(root, ignore_errors=True)
+    tmp.replace(root)
+
+def append_dataset(df: pd.DataFrame, root: Path):
+    """
+    Fügt Zeilen in die betroffenen Partitionen ein (gleicher ts je Station: neue Zeile gewinnt).
+    Nur die berührten Station-Monats-Dateien werden neu geschrieben.
+    """
+    root = Path(root)
+    df = df[df['station_id'].notna()]
+    for (sid, month), g in df.groupby([df['station_id'], _month(df['ts'])], sort=True):
+        path = _part_dir(root, sid, month)
+        if (path / PART_FILE).exists():
+            old = pq.read_table(path / PART_FILE).to_pandas()
+            g = pd.concat([old, g[old.columns]], ignore_index=True).drop_duplicates('ts', keep='last')
+        _write_part(g, path)
+
+def replace_stations(df: pd.DataFrame, root: Path, stations):
+    """Ersetzt alle Partitionen der Stationen ``stations`` durch deren Zeilen aus ``df``."""
+    root = Path(root)
+    for sid in stations:
+        shutil.rmtree(root / f"station={quote(str(sid), safe='')}", ignore_errors=True)
+    append_dataset(df, root)
+
+def is_partitioned(root: Path) -> bool:
+    return Path(root).is_dir()
+
+def list_stations(root: Path) -> list:
+    root = Path(root)
+    if not is_partitioned(root):
+        return pd.read_parquet(root, columns=['station_id'])['station_id'].dropna().unique().tolist()
+    return sorted(unquote(p.name.split('=', 1)[1]) for p in root.glob('station=*') if p.is_dir())
+
+def files(root: Path) -> list:
+    return sorted(Path(root).glob(f'station=*/month=*/{PART_FILE}'))
+
+def signature(root: Path) -> tuple:
+    """Änderungssignatur (Anzahl Dateien, jüngste mtime) – für Caches in langlebigen Prozessen."""
+    root = Path(root)
+    fs = files(root) if is_partitioned(root) else [root]
+    return (len(fs), max((f.stat().st_mtime_ns for f in fs), default=0))
+
+def schema_names(root: Path) -> list:
+    """Spaltennamen der gespeicherten Dateien (ohne Partitionsfelder)."""
+    root = Path(root)
+    fs = files(root) if is_partitioned(root) else [root]
+    if not fs:
+        return []
+    return [c for c in pq.read_schema(fs[0]).names if not c.startswith('__index_level_')]
+
+def num_rows(root: Path) -> int:
+    """Zeilenzahl aus den Parquet-Footern, ohne Daten zu lesen."""
+    root = Path(root)
+    fs = files(root) if is_partitioned(root) else [root]
+    return sum(pq.ParquetFile(f).metadata.num_rows for f in fs)
+
+def _dataset(root: Path):
+    return ds.dataset(Path(root), format='parquet', partitioning=PARTITIONING)
+
+def _ts_scalar(dataset, t):
+    return pa.scalar(pd.Timestamp(t).to_pydatetime(), type=dataset.schema.field('ts').type)
+
+def _filter(dataset, stations=None, start=None, end=None, partitioned=True):
+    expr = None
+    def add(e):
+        nonlocal expr
+        expr = e if expr is None else expr & e
+    if stations is not None:
+        add(ds.field('station' if partitioned else 'station_id').isin([str(s) for s in stations]))
+    if start is not None:
+        if partitioned:
+            add(ds.field('month') >= pd.Timestamp(start).strftime('%Y-%m'))
+        add(ds.field('ts') >= _ts_scalar(dataset, start))
+    if end is not None:
+        if partitioned:
+            add(ds.field('month') <= pd.Timestamp(end).strftime('%Y-%m'))
+        add(ds.field('ts') < _ts_scalar(dataset, end))
+    return expr
+
+def read_table(root: Path, columns=None, stations=None, start=None, end=None) -> pa.Table:
+    """Arrow-Tabelle mit Projektion und Filtern (start inklusiv, end exklusiv)."""
+    root = Path(root)
+    partitioned = is_partitioned(root)
+    dataset = _dataset(root) if partitioned else ds.dataset(root, format='parquet')
+    if columns is None:
+        columns = [c for c in dataset.schema.names if c not in ('station', 'month') and not c.startswith('__index_level_')]
+    return dataset.to_table(columns=list(columns), filter=_filter(dataset, stations, start, end, partitioned))
+
+def read_dataset(root: Path, columns=None, stations=None, start=None, end=None) -> pd.DataFrame:
+    """Wie ``read_table``, als DataFrame nach (station_id, ts) sortiert."""
+    df = read_table(root, columns, stations, start, end).to_pandas()
+    if {'station_id', 'ts'} <= set(df.columns):
+        key = df['station_id'].astype(str)
+        sorted_ = (key.to_numpy()[1:] >= key.to_numpy()[:-1]).all() if len(df) > 1 else True
+        if not sorted_ or not df.groupby(key, sort=False)['ts'].is_monotonic_increasing.all():
+            df = df.sort_values(['station_id', 'ts'], kind='stable')
+    return df.reset_index(drop=True)
+
+def read_latest(root: Path, n: int = 1, columns=None, stations=None) -> pd.DataFrame:
+    """
+    Die letzten ``n`` Zeilen je Station. Es werden nur die jüngsten Monatsdateien jeder Station
+    gelesen (rückwärts, bis ``n`` Zeilen zusammen sind).
+    """
+    root = Path(root)
+    if not is_partitioned(root):
+        df = read_dataset(root, columns=columns, stations=stations)
+        return df.groupby('station_id', group_keys=False).tail(n).reset_index(drop=True)
+    wanted = None if stations is None else {str(s) for s in stations}
+    parts = []
+    for sdir in sorted(p for p in root.glob('station=*') if p.is_dir()):
+        sid = unquote(sdir.name.split('=', 1)[1])
+        if wanted is not None and sid not in wanted:
+            continue
+        got, chunks = 0, []
+        for f in sorted(sdir.glob(f'month=*/{PART_FILE}'), reverse=True):
+            pf = pq.ParquetFile(f)
+            chunks.insert(0, pf.read(columns=columns).to_pandas())
+            got += pf.metadata.num_rows
+            if got >= n:
+                break
+        if chunks:
+            parts.append(pd.concat(chunks, ignore_index=True).tail(n))
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(parts, ignore_index=True)
+
+def iter_fragments(root: Path, columns=None, stations=None):
+    """(Station, Tabelle) je Datei in Pfadreihenfolge (Station, Monat) – für spaltenweises Einlesen."""
+    root = Path(root)
+    if not is_partitioned(root):
+        yield None, pq.read_table(root, columns=columns)
+        return
+    wanted = None if stations is None else {str(s) for s in stations}
+    for f in files(root):
+        sid = unquote(f.parent.parent.name.split('=', 1)[1])
+        if wanted is None or sid in wanted:
+            yield sid, pq.read_table(f, columns=columns)
@@ -0,0 +1,46 @@
+# tests/test_compiled.py
+"""compiled --check: Parität je Artefakt auf den passenden Features (per_station, global und stacked gemischt)."""
+
+import json
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from src.models import compiled
+from src.utils import store
+
+FEATURES = ['f0', 'f1']
+
+def _artifact(mdir, X, y, features, meta):
+    mdir.mkdir(parents=True)
+    for q, a in (('p10', 0.1), ('p50', 0.5), ('p90', 0.9)):
+        b = lgb.train({'objective': 'quantile', 'alpha': a, 'num_leaves': 4, 'min_data_in_leaf': 5, 'verbose': -1},
+                      lgb.Dataset(X, label=y, feature_name=features), num_boost_round=3)
+        joblib.dump(b, mdir/f'model_{q}.lgb')
+    (mdir/'meta.json').write_text(json.dumps({"features": features, **meta}), encoding='utf-8')
+
+def test_check_reloads_features_per_artifact(tmp_path, monkeypatch, capsys):
+    rng = np.random.default_rng(0)
+    rows = {'S1': 300, 'S2': 200}
+    feat = pd.concat([pd.DataFrame({
+        'ts': pd.date_range('2025-01-01', periods=n, freq='15min', tz='UTC'), 'station_id': sid,
+        'h_cm': rng.normal(100, 5, n), **{f: rng.normal(size=n) for f in FEATURES}}) for sid, n in rows.items()])
+    monkeypatch.chdir(tmp_path)
+    store.write_dataset(feat, tmp_path/'data/processed/feat')
+
+    X, y = feat[FEATURES].to_numpy(), feat['h_cm'].to_numpy()
+    for sid in rows:
+        m = (feat['station_id'] == sid).to_numpy()
+        _artifact(tmp_path/'artifacts'/sid/'24', X[m], y[m], FEATURES, {"mode": "per_station", "station_id": sid})
+    # global/stacked sortieren nach den Stationsordnern ein
+    hs = np.resize([4, 8], len(X))
+    _artifact(tmp_path/'artifacts/stacked', np.column_stack([X, hs]), y, FEATURES + ['horizon_steps'],
+              {"mode": "global", "horizon_layout": "stacked", "horizons": [4, 8]})
+
+    compiled.main(['--artifacts', 'artifacts', '--check'])
+    out = {line.split()[1]: line for line in capsys.readouterr().out.splitlines() if line.startswith('[OK]')}
+    assert '(300 Zeilen)' in out['artifacts/S1/24']
+    assert '(200 Zeilen)' in out['artifacts/S2/24']
+    assert '(500 Zeilen)' in out['artifacts/stacked']
@@ -0,0 +1,30 @@
+# tests/test_features.py
+"""build_features --incremental: gleiche Features wie der Vollaufbau, auch wenn QC Randzeilen nachträglich ändert."""
+
+import numpy as np
+import pandas as pd
+
+from src.etl.qc import run_qc
+from src.features import build_features as bf
+from src.utils import store
+
+def test_incremental_matches_full_build_after_trailing_gap(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    n, k = 300, 12
+    rng = np.random.default_rng(0)
+    ts = pd.date_range('2025-01-01', periods=n + k, freq='15min', tz='UTC')
+    raw = pd.concat([pd.DataFrame({'ts': ts, 'station_id': sid, 'q_cms': rng.uniform(1, 2, n + k),
+                                   'h_cm': rng.normal(100, 5, n + k)}) for sid in ('S1', 'S2')], ignore_index=True)
+    # S1 endet im ersten Lauf mit einer Lücke: QC schreibt den letzten Wert fort, im zweiten Lauf wird interpoliert
+    raw.loc[(raw['station_id'] == 'S1') & raw['ts'].between(ts[n - 4], ts[n - 1]), 'q_cms'] = np.nan
+
+    store.write_dataset(run_qc(raw[raw['ts'] < ts[n]])[0], bf.INP)
+    bf.main([])
+    clean, _ = run_qc(raw)
+    store.write_dataset(clean, bf.INP)
+    bf.main(['--incremental'])
+
+    got = store.read_dataset(bf.OUT)
+    want = bf.build_features(clean, bf.SPEC)
+    want = want.sort_values(['station_id', 'ts'], ignore_index=True)[got.columns]
+    pd.testing.assert_frame_equal(got, want, check_dtype=False)
@@ -0,0 +1,23 @@
+# tests/test_metrics.py
+"""grouped_scores: gleiche Gruppen und Werte für sortierte, verschränkte und gemischte Schlüssel."""
+
+import numpy as np
+
+from src.utils.metrics import grouped_scores
+
+def test_grouped_scores_independent_of_row_order():
+    rng = np.random.default_rng(0)
+    n = 5000
+    sid = np.repeat(np.array(['S1', 'S2', 'S3', 'S4']), n // 4)
+    hs = np.resize(np.array([4, 8, 24], dtype=np.int32), n)  # verschränkt wie im stacked-Layout
+    y = rng.normal(size=n)
+    p50, p10, p90 = y + rng.normal(size=n), y - 1, y + rng.normal(1, 0.5, n)
+    p50[::97] = np.nan
+
+    ref = np.lexsort((hs, sid))
+    want = grouped_scores([sid[ref], hs[ref]], y[ref], p50[ref], p10[ref], p90[ref])
+    for order in (np.arange(n), rng.permutation(n)):
+        got = grouped_scores([sid[order], hs[order]], y[order], p50[order], p10[order], p90[order])
+        assert [k.tolist() for k in got['keys']] == [k.tolist() for k in want['keys']]
+        for key in ('n', 'MAE', 'NSE', 'KGE', 'coverage', 'pinball_p10'):
+            np.testing.assert_allclose(got[key], want[key], rtol=1e-9)
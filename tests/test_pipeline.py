@@ -0,0 +1,25 @@
+# tests/test_pipeline.py
+"""run_cycle --stream: Stationen ohne gültige Zeilen nach QC werden übersprungen."""
+
+import numpy as np
+import pandas as pd
+
+from src import pipeline
+
+def test_stream_skips_station_without_clean_rows(tmp_path, monkeypatch):
+    n = 200
+    rng = np.random.default_rng(0)
+    ts = pd.date_range('2025-01-01', periods=n, freq='15min', tz='UTC')
+    df = pd.concat([pd.DataFrame({'ts': ts, 'station_id': sid, 'q_cms': q, 'h_cm': rng.normal(100, 5, n)})
+                    for sid, q in (('S1', rng.uniform(1, 2, n)), ('S2', np.full(n, -1.0)))], ignore_index=True)
+    got = {}
+    def build_messages(latest):
+        got['latest'] = latest
+        return []
+    monkeypatch.setattr(pipeline, 'load_stage', lambda source, workers: df)
+    monkeypatch.setattr(pipeline, 'build_messages', build_messages)
+    monkeypatch.setattr(pipeline, 'PROCESSED', tmp_path)
+    monkeypatch.setattr(pipeline, 'ART', tmp_path)
+
+    pipeline.run_cycle('unused', stream=True, publish=False)
+    assert got['latest']['station_id'].tolist() == ['S1']
@@ -0,0 +1,42 @@
+# tests/test_registry.py
+"""ModelRegistry.refresh registriert nur Artefakt-Ordner der aktiven Konfiguration."""
+
+import json
+
+from src.serve.registry import ModelRegistry
+
+def _meta(mdir, **meta):
+    mdir.mkdir(parents=True)
+    (mdir/'meta.json').write_text(json.dumps({"features": ["f0"], **meta}), encoding='utf-8')
+
+def test_refresh_skips_other_modes(tmp_path):
+    root = tmp_path/'artifacts'
+    for H in (24, 48):
+        _meta(root/'S1'/str(H), mode='per_station', station_id='S1', horizon_steps=H)
+        _meta(root/str(H), mode='global', horizon_steps=H)                      # anderer training_mode
+    _meta(root/'S2'/'24', mode='per_station', station_id='S2', horizon_steps=24, quantile_mode='residual')
+    _meta(root/'S1'/'96', mode='per_station', station_id='S1', horizon_steps=96)  # Horizont nicht konfiguriert
+    _meta(root/'S1'/'stacked', mode='per_station', station_id='S1', horizon_layout='stacked', horizons=[24, 48])
+    _meta(root/'stacked', mode='global', horizon_layout='stacked', horizons=[24, 48])
+
+    def active(**kw):
+        return {"mode": 'per_station', "quantile_mode": 'independent', "horizon_layout": 'per_horizon',
+                "horizons": [24, 48], **kw}
+    load = lambda mdir: {"dir": mdir}
+
+    reg = ModelRegistry(root, load=load, active=active())
+    stats = reg.refresh()
+    assert sorted(reg._entries) == [root/'S1'/'24', root/'S1'/'48']
+    assert stats['inactive'] == 6
+
+    reg.active = active(horizon_layout='stacked')
+    stats = reg.refresh()
+    assert sorted(reg._entries) == [root/'S1'/'stacked'] and stats['removed'] == 2
+
+    reg.active = active(mode='global', horizon_layout='stacked', horizons=[24, 48, 96])
+    reg.refresh()
+    assert not reg._entries  # stacked-Modell ohne H=96
+
+    reg.active = active(mode='global')
+    reg.refresh()
+    assert sorted(reg._entries) == [root/'24', root/'48']
@@ -0,0 +1,22 @@
+# tests/test_rolling_metrics.py
+"""rolling_skill: Fenster mit kleiner, echter Varianz spät in langen Reihen gegen die Einzelfenster-Referenz."""
+
+import numpy as np
+
+from src.eval.rolling_metrics import rolling_skill
+from src.utils.metrics import kge, nse
+
+def test_low_variance_window_late_in_long_series():
+    rng = np.random.default_rng(0)
+    n, w = 200_000, 96
+    y = 500 + 400 * np.sin(np.arange(n) / 500) + rng.normal(0, 5, n)
+    y[-3 * w:] = 20 + rng.normal(0, 1e-3, 3 * w)        # Niedrigwasser mit kleiner Streuung
+    y[-6 * w:-4 * w] = 37.5                               # konstant: Varianz 0
+    yhat = y + rng.normal(0, 1e-3, n)
+    out = rolling_skill(y, yhat, window=w)
+
+    for end in (n - 1, n - w // 2, n - 5 * w, n - 4 * w - 1, 10 * w):
+        ref_nse, ref_kge = nse(y[end - w + 1:end + 1], yhat[end - w + 1:end + 1]), kge(y[end - w + 1:end + 1], yhat[end - w + 1:end + 1])
+        np.testing.assert_allclose(out['nse'][end], ref_nse, rtol=1e-6, atol=1e-9)
+        np.testing.assert_allclose(out['kge'][end], ref_kge, rtol=1e-6, atol=1e-9)
+    assert np.isnan(out['nse'][n - 5 * w]) and np.isnan(out['nse'][n - 4 * w - 1])
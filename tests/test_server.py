@@ -0,0 +1,34 @@
+# tests/test_server.py
+"""POST /reload: ein fehlgeschlagener Zyklus liefert 500 mit JSON-Fehler, der Server bleibt erreichbar."""
+
+import json, threading
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+from src.serve.server import make_handler
+
+class FailingService:
+    def cycle(self):
+        raise RuntimeError("meta.json unlesbar")
+
+    def health(self):
+        return {"models": 0}
+
+def test_reload_failure_returns_500(capsys):
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(FailingService()))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    try:
+        with pytest.raises(HTTPError) as e:
+            urlopen(Request(base + '/reload', method='POST'), timeout=5)
+        assert e.value.code == 500
+        assert 'meta.json unlesbar' in json.loads(e.value.read())['error']
+        with urlopen(base + '/health', timeout=5) as r:
+            assert json.loads(r.read()) == {"models": 0}
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    assert '[WARN]' in capsys.readouterr().out
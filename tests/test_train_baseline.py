@@ -0,0 +1,50 @@
+# tests/test_train_baseline.py
+"""Globaler Modus: gestreamtes Dataset entspricht der Feature-Matrix; quantile_mode residual: Offsets aus p50-Residuen."""
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models import train_baseline as tb
+from src.utils import store
+
+PARAMS = {'objective': 'quantile', 'alpha': 0.5, 'num_leaves': 4, 'min_data_in_leaf': 5,
+          'force_col_wise': True, 'verbose': -1}
+
+def test_global_dataset_matches_matrix(tmp_path):
+    rng = np.random.default_rng(0)
+    # kodiert sortiert 'S%3D1' vor 'S.1', dekodiert (wie sort_values) 'S.1' vor 'S=1'; Monatswechsel je Station
+    rows = {'S=1': 300, 'S.1': 250}
+    feat = pd.concat([pd.DataFrame({
+        'ts': pd.date_range('2025-01-31 20:00', periods=n, freq='15min', tz='UTC'), 'station_id': sid,
+        'h_cm': rng.normal(100, 5, n), 'f0': np.where(rng.random(n) < 0.1, np.nan, rng.normal(size=n)),
+        'f1': rng.normal(size=n)}) for sid, n in rows.items()], ignore_index=True)
+    store.write_dataset(feat, tmp_path/'feat')
+
+    m = tb.global_dataset(PARAMS, tmp_path/'feat')
+    ref = tb.load_global_matrix(tmp_path/'feat')
+    for k in ('ts', 'target', 'codes'):
+        np.testing.assert_array_equal(m[k], ref[k])
+    X = ref['X']
+    np.testing.assert_array_equal(m['hash'], tb.row_hashes([ref['ts']] + [X[:, j] for j in range(X.shape[1])]))
+    assert m['base'].num_data() == len(X)
+
+    # Vorhersage auf den gebinnten Testzeilen = predict auf den Rohwerten
+    y = tb.shifted_label(m, 4)
+    idx = np.flatnonzero(~np.isnan(y)).astype(np.int32)
+    train, valid = tb._subset(m['base'], idx[:400], y), tb._subset(m['base'], idx[400:], y)
+    b = lgb.train(PARAMS, train, num_boost_round=5, keep_training_booster=True)
+    np.testing.assert_array_equal(tb._predict_binned(b, valid), b.predict(X[idx[400:]]))
+
+def test_residual_offsets_from_fitted_p50():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(400, 2))
+    y = X[:, 0] + rng.normal(scale=0.5, size=400)
+    train = lgb.Dataset(X, label=y, params={'force_col_wise': True, 'verbose': -1}).construct()
+    models, fitted = tb.final_models(train, 5, {'force_col_wise': True, 'verbose': -1}, quantile_mode='residual')
+    assert list(models) == ['p50']
+    # Trainingszustand = predict auf denselben Zeilen; Offsets treffen dort die nominale Abdeckung
+    np.testing.assert_allclose(fitted, models['p50'].predict(X), rtol=0, atol=1e-9)
+    off = tb.residual_offsets(y, fitted)
+    assert np.mean((y >= fitted + off['p10']) & (y <= fitted + off['p90'])) == pytest.approx(0.8, abs=0.01)